@@ -6,6 +6,7 @@ from apscheduler.schedulers.background import BackgroundScheduler
 
 sys.path.append('./')
 from redditrepostsleuth.core.notification.notification_service import NotificationService
+from redditrepostsleuth.core.services.image_download_cache import configure_image_download_cache
 from redditrepostsleuth.adminsvc.misc_admin_tasks import remove_expired_bans, update_banned_sub_wiki, \
     send_reports_to_meme_voting, update_top_image_reposts, \
     update_monitored_sub_data, check_meme_template_potential_votes, update_ban_list, queue_config_updates, \
@@ -27,6 +28,7 @@ def event_callback(event):
 
 if __name__ == '__main__':
     config = Config()
+    configure_image_download_cache(config)
     uowm = SqlAlchemyUnitOfWorkManager(get_db_engine(config))
     reddit = get_reddit_instance(config)
     reddit_manager = RedditManager(reddit)
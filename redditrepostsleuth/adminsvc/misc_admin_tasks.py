@@ -17,6 +17,7 @@ from redditrepostsleuth.core.db.uow.sqlalchemyunitofworkmanager import SqlAlchem
 from redditrepostsleuth.core.db.uow.unitofworkmanager import UnitOfWorkManager
 from redditrepostsleuth.core.logging import log
 from redditrepostsleuth.core.notification.notification_service import NotificationService
+from redditrepostsleuth.core.services.image_download_cache import get_image_download_cache
 from redditrepostsleuth.core.util.helpers import build_markdown_table, \
     chunk_list, get_redis_client
 from redditrepostsleuth.core.util.imagehashing import get_image_hashes
@@ -169,11 +170,13 @@ def send_reports_to_meme_voting(uowm: UnitOfWorkManager) -> NoReturn:
             post = uow.posts.get_by_post_id(report.post_id)
             if not post:
                 continue
-            try:
-                if not requests.head(post.searched_url).status_code == 200:
+            image_cache = get_image_download_cache()
+            if not image_cache or not image_cache.is_fresh(post.searched_url):
+                try:
+                    if not requests.head(post.searched_url).status_code == 200:
+                        continue
+                except Exception:
                     continue
-            except Exception:
-                continue
 
             potential_template = MemeTemplatePotential(
                 post_id=report.post_id,
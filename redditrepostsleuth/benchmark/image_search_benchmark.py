@@ -0,0 +1,356 @@
+"""
+Offline benchmark for the local image index engines and the DuplicateImageService.check_image pipeline.
+
+Builds a synthetic dhash corpus with clusters of near duplicates, measures each index engine's build time, search
+latency and recall against an exact brute force scan, then runs check_image end to end against an in memory SQLite
+database and reports latency percentiles per ImageSearchTimes stage.  Nothing touches the network.
+
+Usage: python -m redditrepostsleuth.benchmark.image_search_benchmark --size 1000000 --searches 500
+"""
+import argparse
+import json
+import logging
+import sys
+from datetime import datetime, timedelta
+from time import perf_counter
+from typing import List, Dict, Text, NoReturn
+
+import numpy as np
+from sqlalchemy import create_engine, event
+from sqlalchemy.pool import StaticPool
+
+from redditrepostsleuth.core.config import Config
+from redditrepostsleuth.core.db.databasemodels import Base, Post, RedditImagePost, RedditImagePostCurrent, \
+    ImageSearch, MemeTemplate
+from redditrepostsleuth.core.db.uow.sqlalchemyunitofworkmanager import SqlAlchemyUnitOfWorkManager
+from redditrepostsleuth.core.index.index_class_maps import INDEX_MAP
+from redditrepostsleuth.core.index.local_index_searcher import LocalIndexSearcher, INDEX_HASH_LENGTH
+from redditrepostsleuth.core.logging import log
+from redditrepostsleuth.core.model.image_index_api_result import ImageIndexApiResult
+from redditrepostsleuth.core.model.image_search_settings import ImageSearchSettings
+from redditrepostsleuth.core.services.duplicateimageservice import DuplicateImageService
+from redditrepostsleuth.core.util.hamming import bytes_to_matrix, hex_to_words, hamming_distances
+from redditrepostsleuth.core.util.helpers import get_hamming_from_percent
+
+HASH_BYTES = INDEX_HASH_LENGTH // 2
+
+
+class SyntheticCorpus:
+    """
+    Random dhashes plus clusters of near duplicates.  Cluster members differ from their cluster's center in at most
+    cluster_distance hex characters.  Random hashes are ~60 characters apart so they never match each other
+    """
+    def __init__(self, size: int, clusters: int, cluster_size: int, cluster_distance: int, seed: int = 1):
+        if clusters * cluster_size > size:
+            raise ValueError('Corpus is too small for the requested clusters')
+        self.rand = np.random.RandomState(seed)
+        self.cluster_distance = cluster_distance
+        raw = np.frombuffer(self.rand.bytes(size * HASH_BYTES), dtype=np.uint8).reshape(size, HASH_BYTES).copy()
+        self.centers = raw[:clusters].copy()
+        for cluster in range(clusters):
+            for member in range(1, cluster_size):
+                row = clusters + cluster * (cluster_size - 1) + member - 1
+                raw[row] = self.perturb(self.centers[cluster], cluster_distance)
+        self.clustered_rows = clusters * cluster_size
+        self.raw = raw
+        # IDs start at 1 like the database
+        self.ids = list(range(1, size + 1))
+        self.matrix = bytes_to_matrix(raw.tobytes(), size)
+
+    def perturb(self, raw_hash: np.ndarray, max_changes: int) -> np.ndarray:
+        """
+        Change up to max_changes random hex characters of a raw hash
+        """
+        result = raw_hash.copy()
+        changes = self.rand.randint(1, max_changes + 1) if max_changes else 0
+        for nibble in self.rand.choice(INDEX_HASH_LENGTH, changes, replace=False):
+            value = self.rand.randint(1, 16)
+            result[nibble // 2] ^= value << 4 if nibble % 2 == 0 else value
+        return result
+
+    def hex_hash(self, row: int) -> Text:
+        return self.raw[row].tobytes().hex()
+
+    def queries(self, count: int, max_changes: int = 2) -> List[Text]:
+        """
+        Build search hashes close to random cluster centers
+        """
+        return [
+            self.perturb(self.centers[self.rand.randint(len(self.centers))], max_changes).tobytes().hex()
+            for _ in range(count)
+        ]
+
+    def brute_force(self, image_hash: Text, max_distance: int) -> set:
+        distances = hamming_distances(hex_to_words(image_hash), self.matrix)
+        return {self.ids[row] for row in np.nonzero(distances <= max_distance)[0]}
+
+    def __len__(self):
+        return len(self.ids)
+
+
+class BenchmarkIndexSearcher(LocalIndexSearcher):
+    """
+    LocalIndexSearcher over a prebuilt index so check_image can be run without loading the corpus into a database
+    """
+    def __init__(self, index):
+        self.index = index
+
+    def search(self, image_hash: Text, target_hamming_distance: float, max_matches: int = None) -> ImageIndexApiResult:
+        start = perf_counter()
+        matches = self.index.search(image_hash, target_hamming_distance, max_results=max_matches)
+        return ImageIndexApiResult(
+            current_matches=[],
+            historical_matches=[self._build_match(m) for m in matches],
+            index_search_time=round(perf_counter() - start, 5),
+            total_searched=len(self.index),
+            used_current_index=False,
+            used_historical_index=True,
+            target_result={}
+        )
+
+    def get_meme_template_id(self, image_hash: Text):
+        return
+
+
+class CollectingEventLogger:
+    """
+    Stand in for EventLogging that keeps search times instead of sending them to Influx
+    """
+    def __init__(self):
+        self.search_times = []
+
+    def save_event(self, event) -> NoReturn:
+        if hasattr(event, 'search_times'):
+            self.search_times.append(event.search_times.to_dict())
+
+
+def percentiles(values: List[float]) -> Dict[Text, float]:
+    if not values:
+        return {'p50': 0, 'p95': 0, 'p99': 0}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {'p50': round(float(p50), 6), 'p95': round(float(p95), 6), 'p99': round(float(p99), 6)}
+
+
+def build_index(engine: Text, corpus: SyntheticCorpus):
+    index = INDEX_MAP[engine](name=engine)
+    index.build_packed(corpus.ids, corpus.matrix, INDEX_HASH_LENGTH)
+    return index
+
+
+def benchmark_engine(engine: Text, corpus: SyntheticCorpus, queries: List[Text], max_distance: int) -> Dict:
+    """
+    Measure build time, search latency and recall of an index engine
+    :param engine: Engine name from INDEX_MAP
+    :param corpus: Corpus to index
+    :param queries: Hashes to search
+    :param max_distance: Hamming distance to search with
+    """
+    start = perf_counter()
+    index = build_index(engine, corpus)
+    build_time = perf_counter() - start
+
+    latencies = []
+    found_total = 0
+    expected_total = 0
+    for query in queries:
+        start = perf_counter()
+        results = index.search(query, max_distance)
+        latencies.append(perf_counter() - start)
+        expected = corpus.brute_force(query, max_distance)
+        found_total += len(expected & {r[0] for r in results})
+        expected_total += len(expected)
+
+    return {
+        'engine': engine,
+        'build_time': round(build_time, 4),
+        'search_time': percentiles(latencies),
+        'recall': round(found_total / expected_total, 6) if expected_total else 1.0
+    }
+
+
+def get_sqlite_uowm(corpus: SyntheticCorpus) -> SqlAlchemyUnitOfWorkManager:
+    """
+    Create an in memory database holding a post for every clustered hash.  Random hashes never match a search so
+    they don't need a post
+    """
+    # Every session has to share the one connection or they each get their own empty database
+    engine = create_engine('sqlite://', poolclass=StaticPool, connect_args={'check_same_thread': False})
+
+    @event.listens_for(engine, 'connect')
+    def _register_mysql_functions(dbapi_connection, connection_record):
+        # Stand ins for the MySQL collation and functions our models use
+        dbapi_connection.create_collation('utf8mb4_general_ci', lambda a, b: (a > b) - (a < b))
+        dbapi_connection.create_function('utc_timestamp', 0, lambda: datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S.%f'))
+
+    Base.metadata.create_all(engine, tables=[
+        Post.__table__, RedditImagePost.__table__, RedditImagePostCurrent.__table__, ImageSearch.__table__,
+        MemeTemplate.__table__
+    ])
+    uowm = SqlAlchemyUnitOfWorkManager(engine)
+    created_at = datetime.utcnow() - timedelta(days=30)
+    with uowm.start() as uow:
+        for row in range(corpus.clustered_rows):
+            dhash = corpus.hex_hash(row)
+            post_id = f'b{corpus.ids[row]}'
+            uow.posts.add(Post(
+                post_id=post_id,
+                url=f'https://i.example.com/{post_id}.jpg',
+                dhash_h=dhash,
+                dhash_v=dhash,
+                post_type='image',
+                author=f'author{row}',
+                subreddit='benchmark',
+                title='benchmark post',
+                created_at=created_at + timedelta(seconds=row)
+            ))
+            uow.image_post.add(RedditImagePost(id=corpus.ids[row], post_id=post_id, dhash_h=dhash, created_at=created_at))
+        uow.commit()
+    return uowm
+
+
+def benchmark_check_image(
+        engine: Text,
+        corpus: SyntheticCorpus,
+        queries: List[Text],
+        search_settings: ImageSearchSettings
+) -> Dict:
+    """
+    Run check_image end to end for each query and report latency percentiles of each search stage
+    :param engine: Engine name from INDEX_MAP
+    :param corpus: Corpus to search
+    :param queries: Hashes to search
+    :param search_settings: Settings used for every search
+    """
+    uowm = get_sqlite_uowm(corpus)
+    event_logger = CollectingEventLogger()
+    config = Config(image_index_engine='benchmark', default_meme_filter_hash_size=32, util_api='')
+    dup = DuplicateImageService(uowm, event_logger, None, config=config)
+    dup.local_index = BenchmarkIndexSearcher(build_index(engine, corpus))
+
+    match_counts = []
+    checked_at = datetime.utcnow()
+    for i, query in enumerate(queries):
+        post = Post(
+            post_id=f'q{i}',
+            url=f'https://i.example.com/q{i}.jpg',
+            dhash_h=query,
+            post_type='image',
+            author='searcher',
+            subreddit='benchmark',
+            title='benchmark search',
+            created_at=checked_at
+        )
+        results = dup.check_image(post.url, post=post, source='benchmark', search_settings=search_settings)
+        match_counts.append(len(results.matches))
+
+    stages = {}
+    for times in event_logger.search_times:
+        for stage, value in times.items():
+            stages.setdefault(stage, []).append(value)
+    return {
+        'engine': engine,
+        'searches': len(queries),
+        'avg_matches': round(float(np.mean(match_counts)), 2) if match_counts else 0,
+        'stages': {stage: percentiles(values) for stage, values in sorted(stages.items()) if any(values)}
+    }
+
+
+def get_search_settings(target_match_percent: float) -> ImageSearchSettings:
+    return ImageSearchSettings(
+        target_match_percent,
+        0.265,
+        max_matches=250,
+        max_depth=-1,
+        filter_dead_matches=False,
+        filter_removed_matches=False,
+        only_older_matches=True,
+        filter_same_author=True,
+        filter_crossposts=False
+    )
+
+
+def run(args) -> Dict:
+    log.info('Generating corpus of %s hashes', args.size)
+    corpus = SyntheticCorpus(args.size, args.clusters, args.cluster_size, args.cluster_distance, seed=args.seed)
+    queries = corpus.queries(args.searches)
+    max_distance = int(get_hamming_from_percent(args.target_match, INDEX_HASH_LENGTH))
+    result = {
+        'corpus_size': len(corpus),
+        'max_distance': max_distance,
+        'engines': [benchmark_engine(engine, corpus, queries, max_distance) for engine in args.engines],
+        'check_image': benchmark_check_image(
+            args.check_image_engine,
+            corpus,
+            queries,
+            get_search_settings(args.target_match)
+        )
+    }
+    return result
+
+
+def check_gates(result: Dict, min_recall: float = None, max_p99: float = None) -> List[Text]:
+    """
+    Check results against regression gates
+    :param result: Result from run
+    :param min_recall: Min recall every engine must reach
+    :param max_p99: Max p99 of check_image total_search_time in seconds
+    :return: List of failures
+    """
+    failures = []
+    if min_recall is not None:
+        for engine in result['engines']:
+            if engine['recall'] < min_recall:
+                failures.append(f'{engine["engine"]} recall {engine["recall"]} is below {min_recall}')
+    if max_p99 is not None:
+        p99 = result['check_image']['stages'].get('total_search_time', {}).get('p99', 0)
+        if p99 > max_p99:
+            failures.append(f'check_image p99 {p99}s is above {max_p99}s')
+    return failures
+
+
+def print_result(result: Dict) -> NoReturn:
+    print(f'Corpus: {result["corpus_size"]} hashes - Max distance: {result["max_distance"]}')
+    print(f'{"engine":<10}{"build":>10}{"p50":>12}{"p95":>12}{"p99":>12}{"recall":>10}')
+    for r in result['engines']:
+        t = r['search_time']
+        print(f'{r["engine"]:<10}{r["build_time"]:>10}{t["p50"]:>12}{t["p95"]:>12}{t["p99"]:>12}{r["recall"]:>10}')
+    check = result['check_image']
+    print(f'\ncheck_image ({check["engine"]}) - {check["searches"]} searches - Avg matches: {check["avg_matches"]}')
+    print(f'{"stage":<30}{"p50":>12}{"p95":>12}{"p99":>12}')
+    for stage, p in check['stages'].items():
+        print(f'{stage:<30}{p["p50"]:>12}{p["p95"]:>12}{p["p99"]:>12}')
+
+
+def get_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description='Offline image search benchmark')
+    parser.add_argument('--size', type=int, default=1000000, help='Hashes in the corpus')
+    parser.add_argument('--clusters', type=int, default=1000, help='Clusters of near duplicates')
+    parser.add_argument('--cluster-size', type=int, default=10, help='Hashes per cluster')
+    parser.add_argument('--cluster-distance', type=int, default=4, help='Max hex chars a member differs from its center')
+    parser.add_argument('--searches', type=int, default=500, help='Searches to run')
+    parser.add_argument('--target-match', type=float, default=92, help='Target match percent')
+    parser.add_argument('--engines', nargs='+', default=list(INDEX_MAP.keys()), choices=list(INDEX_MAP.keys()))
+    parser.add_argument('--check-image-engine', default='mih', choices=list(INDEX_MAP.keys()))
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', help='Write results to this file')
+    parser.add_argument('--min-recall', type=float, help='Fail if any engine recall is below this')
+    parser.add_argument('--max-p99', type=float, help='Fail if check_image p99 total time in seconds is above this')
+    return parser
+
+
+def main(argv: List[Text] = None) -> int:
+    args = get_parser().parse_args(argv)
+    log.setLevel(logging.WARNING)
+    result = run(args)
+    print_result(result)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(result, f, indent=2)
+    failures = check_gates(result, min_recall=args.min_recall, max_p99=args.max_p99)
+    for failure in failures:
+        print(f'FAILED: {failure}')
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
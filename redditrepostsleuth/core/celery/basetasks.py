@@ -1,4 +1,5 @@
 from celery import Task
+from celery.signals import worker_process_init
 
 from redditrepostsleuth.core import logging
 from redditrepostsleuth.core.config import Config
@@ -12,6 +13,9 @@ from redditrepostsleuth.core.util.helpers import get_reddit_instance
 from redditrepostsleuth.core.db.uow.sqlalchemyunitofworkmanager import SqlAlchemyUnitOfWorkManager
 
 from redditrepostsleuth.core.services.eventlogging import EventLogging
+from redditrepostsleuth.core.services.image_download_cache import configure_image_download_cache
+from redditrepostsleuth.core.services.hot_url_counter import get_hot_url_counter
+from redditrepostsleuth.core.services.ingest_telemetry import get_ingest_telemetry
 
 
 class EventLoggerTask(Task):
@@ -22,30 +26,60 @@ class EventLoggerTask(Task):
 class SqlAlchemyTask(Task):
     def __init__(self):
         self.config = Config()
+        configure_image_download_cache(self.config)
         self.uowm = SqlAlchemyUnitOfWorkManager(get_db_engine(self.config))
         self.event_logger = EventLogging()
+        self.ingest_telemetry = get_ingest_telemetry(self.config, self.event_logger)
+        self.hot_url_counter = get_hot_url_counter(self.config)
+
+class AsyncIngestTask(SqlAlchemyTask):
+    def __init__(self):
+        super().__init__()
+        from redditrepostsleuth.ingestsvc.async_image_fetcher import AsyncIngestPipeline, AsyncImageFetcher
+        self.ingest_pipeline = AsyncIngestPipeline(
+            fetcher=AsyncImageFetcher(max_connections=int(self.config.ingest_async_max_connections or 200)),
+            hash_workers=int(self.config.ingest_async_hash_workers or 4),
+            meme_hash_size=self.config.default_meme_filter_hash_size,
+            telemetry=self.ingest_telemetry
+        )
 
 class RepostTask(SqlAlchemyTask):
     def __init__(self):
         super().__init__()
         self.notification_svc = NotificationService(self.config)
-        self.link_blacklist = [] # Temp fix.  People were spamming onlyfans links 10s of thousands of times
+        # Only used when the shared hot URL counter isn't enabled.  People were spamming onlyfans links 10s of thousands of times
+        self.link_blacklist = set()
         self.reddit = get_reddit_instance(self.config)
 
 
 class AnnoyTask(Task):
     def __init__(self):
         self.config = Config()
+        configure_image_download_cache(self.config)
         from redditrepostsleuth.core.services.duplicateimageservice import DuplicateImageService
+        from redditrepostsleuth.core.services.search_result_cache import get_search_result_cache
+        from redditrepostsleuth.core.services.search_latency_recorder import get_search_latency_recorder
         self.uowm = SqlAlchemyUnitOfWorkManager(get_db_engine(self.config))
         self.notification_svc = NotificationService(self.config)
         self.event_logger = EventLogging()
         self.reddit = get_reddit_instance(self.config)
-        self.dup_service = DuplicateImageService(self.uowm, self.event_logger, self.reddit)
+        self.dup_service = DuplicateImageService(
+            self.uowm,
+            self.event_logger,
+            self.reddit,
+            search_cache=get_search_result_cache(self.config),
+            latency_recorder=get_search_latency_recorder(self.config, self.event_logger)
+        )
+        # Load the local index in each worker process as it starts rather than on its first search
+        worker_process_init.connect(self._load_index, weak=False)
+
+    def _load_index(self, **kwargs):
+        self.dup_service.load_index()
 
 class RedditTask(Task):
     def __init__(self):
         self.config = Config()
+        configure_image_download_cache(self.config)
         self.reddit = RedditManager(get_reddit_instance(self.config))
         self.uowm = SqlAlchemyUnitOfWorkManager(get_db_engine(self.config))
         self.event_logger = EventLogging(config=self.config)
@@ -55,6 +89,7 @@ class RedditTask(Task):
 class AdminTask(Task):
     def __init__(self):
         self.config = Config()
+        configure_image_download_cache(self.config)
         self.reddit = RedditManager(get_reddit_instance(self.config))
         self.uowm = SqlAlchemyUnitOfWorkManager(get_db_engine(self.config))
         self.event_logger = EventLogging(config=self.config)
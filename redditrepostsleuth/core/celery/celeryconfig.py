@@ -12,8 +12,11 @@ accept_content = ['pickle', 'json']
 result_expires = 60
 task_routes = {
     'redditrepostsleuth.core.celery.ingesttasks.save_new_post': {'queue': 'postingest'},
+    'redditrepostsleuth.core.celery.ingesttasks.save_new_posts': {'queue': 'postingest'},
+    'redditrepostsleuth.core.celery.ingesttasks.save_new_posts_async': {'queue': 'postingest_async'},
     'redditrepostsleuth.core.celery.ingesttasks.ingest_repost_check': {'queue': 'repost2'},
     'redditrepostsleuth.core.celery.reposttasks.check_image_repost_save': {'queue': 'repost_image'},
+    'redditrepostsleuth.core.celery.reposttasks.check_image_repost_save_batch': {'queue': 'repost_image'},
     'redditrepostsleuth.core.celery.reposttasks.process_repost_annoy': {'queue': 'process_repost'},
     'redditrepostsleuth.core.celery.tasks.link_repost_check': {'queue': 'repost_link'},
     'redditrepostsleuth.core.celery.tasks.log_repost': {'queue': 'logrepost'},
@@ -99,6 +99,78 @@ def save_image_repost_result(
         log.exception('Failed to save image repost', exc_info=True)
 
 
+def save_image_repost_results(
+        search_results: List[ImageSearchResults],
+        uowm: UnitOfWorkManager,
+        high_match_check: bool = False,
+        source: Text = 'unknown'
+) -> List[Post]:
+    """
+    Batch version of save_image_repost_result.  All reposts and checked posts are saved in one transaction.  If the
+    batch hits an integrity error it's retried one result at a time so a single bad row doesn't sink the rest.
+    If the high match meme check creates a template for a post, that post is skipped and returned so it can be
+    rechecked with the new template instead of failing the whole batch
+    :param search_results: Search results for each checked post
+    :param uowm: Unit of Work Manager
+    :param high_match_check: Perform a high match meme check
+    :param source: What triggered these searches
+    :return: Posts that need to be rechecked
+    """
+    recheck = []
+    to_save = []
+    for result in search_results:
+        if result.matches and high_match_check:
+            try:
+                check_for_high_match_meme(result, uowm)
+            except IngestHighMatchMeme:
+                recheck.append(result.checked_post)
+                continue
+        to_save.append(result)
+
+    if not to_save:
+        return recheck
+
+    with uowm.start() as uow:
+        for result in to_save:
+            _add_image_repost_result(uow, result, source)
+        try:
+            uow.commit()
+            return recheck
+        except IntegrityError:
+            log.info('Bulk save of %s image repost results failed, saving individually', len(to_save))
+            uow.rollback()
+
+    for result in to_save:
+        with uowm.start() as uow:
+            _add_image_repost_result(uow, result, source)
+            try:
+                uow.commit()
+            except IntegrityError:
+                log.exception('Post %s: Failed to save image repost', result.checked_post.post_id, exc_info=False)
+                uow.rollback()
+
+    return recheck
+
+
+def _add_image_repost_result(uow, result: ImageSearchResults, source: Text) -> None:
+    result.checked_post.checked_repost = True
+    uow.posts.update(result.checked_post)
+    if not result.matches:
+        return
+    log.info('Creating repost. Post %s is a repost of %s', result.checked_post.url, result.matches[0].post.url)
+    uow.image_repost.add(
+        ImageRepost(post_id=result.checked_post.post_id,
+                    repost_of=result.matches[0].post.post_id,
+                    hamming_distance=result.matches[0].hamming_distance,
+                    annoy_distance=result.matches[0].annoy_distance,
+                    author=result.checked_post.author,
+                    search_id=result.logged_search.id if result.logged_search else None,
+                    subreddit=result.checked_post.subreddit,
+                    source=source
+                    )
+    )
+
+
 def check_for_post_watch(matches: List[SearchMatch], uowm: UnitOfWorkManager) -> List[Dict]:
     results = []
     with uowm.start() as uow:
@@ -1,12 +1,19 @@
-from time import perf_counter
+from time import perf_counter, time
+from typing import List, Optional
 
 from redditrepostsleuth.core.celery import celery
-from redditrepostsleuth.core.celery.basetasks import SqlAlchemyTask
-from redditrepostsleuth.core.db.databasemodels import RedditImagePostCurrent
+from redditrepostsleuth.core.celery.basetasks import SqlAlchemyTask, AsyncIngestTask
+from redditrepostsleuth.core.config import Config
+from redditrepostsleuth.core.db.databasemodels import RedditImagePostCurrent, Post
 from redditrepostsleuth.core.exception import InvalidImageUrlException
 from redditrepostsleuth.core.logging import log
-from redditrepostsleuth.core.util.objectmapping import pushshift_to_post
-from redditrepostsleuth.ingestsvc.util import pre_process_post
+from redditrepostsleuth.core.services.hot_url_counter import HotUrlCounter
+from redditrepostsleuth.core.services.ingest_telemetry import IngestTelemetry
+from redditrepostsleuth.core.util.helpers import chunk_list
+from redditrepostsleuth.ingestsvc.util import pre_process_post, pre_process_posts, get_new_pushshift_posts, \
+    save_prepared_posts
+
+PUSHSHIFT_BATCH_SIZE = 100
 
 
 @celery.task(bind=True, base=SqlAlchemyTask, ignore_reseults=True, serializer='pickle', autoretry_for=(ConnectionError,InvalidImageUrlException), retry_kwargs={'max_retries': 20, 'countdown': 300})
@@ -16,12 +23,97 @@ def save_new_post(self, post):
         if existing:
             return
         log.debug('Post %s: Ingesting', post.post_id)
-        post = pre_process_post(post, self.uowm, self.config.image_hash_api)
+        post = pre_process_post(
+            post,
+            self.uowm,
+            self.config.image_hash_api,
+            meme_hash_size=self.config.default_meme_filter_hash_size,
+            telemetry=self.ingest_telemetry
+        )
         if post:
+            if self.ingest_telemetry:
+                self.ingest_telemetry.record_saved([post])
+            count_shared_urls(self.hot_url_counter, [post])
             ingest_repost_check.apply_async((post,self.config), queue='repost')
             log.debug('Post %s: Sent post to repost queue', post.post_id)
 
 
+@celery.task(bind=True, base=SqlAlchemyTask, ignore_results=True, serializer='pickle')
+def save_new_posts(self, posts: List[Post], enqueued_at: float = None):
+    """
+    Batch version of save_new_post.  Known posts are dropped with one query and the rest are saved in bulk
+    :param posts: Posts to save
+    :param enqueued_at: Epoch time the batch was sent, for queue wait telemetry
+    """
+    record_queue_wait(self.ingest_telemetry, posts, enqueued_at)
+    with self.uowm.start() as uow:
+        existing = set(uow.posts.get_existing_post_ids([p.post_id for p in posts]))
+    new_posts = [p for p in posts if p.post_id not in existing]
+    log.debug('Ingesting %s of %s posts', len(new_posts), len(posts))
+    saved = pre_process_posts(
+        new_posts,
+        self.uowm,
+        self.config.image_hash_api,
+        meme_hash_size=self.config.default_meme_filter_hash_size,
+        telemetry=self.ingest_telemetry
+    )
+    if self.ingest_telemetry:
+        self.ingest_telemetry.record_saved(saved)
+    count_shared_urls(self.hot_url_counter, saved)
+    send_repost_checks(saved, self.config)
+    log.debug('Saved %s posts and sent them to repost queue', len(saved))
+
+
+@celery.task(bind=True, base=AsyncIngestTask, ignore_results=True, serializer='pickle')
+def save_new_posts_async(self, posts: List[Post], enqueued_at: float = None):
+    """
+    Same as save_new_posts but images are downloaded on an event loop so one worker process can keep many downloads in
+    flight.  Run these workers with the solo pool and scale by adding workers
+    :param posts: Posts to save
+    :param enqueued_at: Epoch time the batch was sent, for queue wait telemetry
+    """
+    record_queue_wait(self.ingest_telemetry, posts, enqueued_at)
+    with self.uowm.start() as uow:
+        existing = set(uow.posts.get_existing_post_ids([p.post_id for p in posts]))
+    new_posts = [p for p in posts if p.post_id not in existing]
+    log.debug('Ingesting %s of %s posts', len(new_posts), len(posts))
+    saved = save_prepared_posts(self.ingest_pipeline.prepare_posts(new_posts), self.uowm)
+    if self.ingest_telemetry:
+        self.ingest_telemetry.record_saved(saved)
+    count_shared_urls(self.hot_url_counter, saved)
+    send_repost_checks(saved, self.config)
+    log.debug('Saved %s posts and sent them to repost queue', len(saved))
+
+
+def record_queue_wait(telemetry: Optional[IngestTelemetry], posts: List[Post], enqueued_at: Optional[float]) -> None:
+    if telemetry and enqueued_at:
+        telemetry.record_queue_wait(posts, time() - enqueued_at)
+
+
+def count_shared_urls(counter: Optional[HotUrlCounter], posts: List[Post]) -> None:
+    if counter:
+        counter.add([p.url_hash for p in posts if p.post_type == 'link'])
+
+
+def send_repost_checks(posts: List[Post], config: Config) -> None:
+    """
+    Send saved posts for repost checking.  With repost_image_check_batch_size set, image posts are checked in batches
+    :param posts: Saved posts
+    :param config: Config
+    """
+    batch_size = int(config.repost_image_check_batch_size or 0)
+    if batch_size <= 1 or not config.repost_image_check_on_ingest:
+        for post in posts:
+            ingest_repost_check.apply_async((post, config), queue='repost')
+        return
+
+    for batch in chunk_list([p for p in posts if p.post_type == 'image'], batch_size):
+        celery.send_task('redditrepostsleuth.core.celery.reposttasks.check_image_repost_save_batch', args=[batch], queue='repost_image')
+    for post in posts:
+        if post.post_type != 'image':
+            ingest_repost_check.apply_async((post, config), queue='repost')
+
+
 @celery.task(ignore_results=True)
 def ingest_repost_check(post, config):
     if post.post_type == 'image' and config.repost_image_check_on_ingest:
@@ -31,27 +123,17 @@ def ingest_repost_check(post, config):
 
 @celery.task(bind=True, base=SqlAlchemyTask, ignore_results=True)
 def save_pushshift_results(self, data):
-    with self.uowm.start() as uow:
-        for submission in data:
-            existing = uow.posts.get_by_post_id(submission['id'])
-            if existing:
-                log.debug('Skipping pushshift post: %s', submission['id'])
-                continue
-            post = pushshift_to_post(submission)
-            log.debug('Saving pushshift post: %s', submission['id'])
-            save_new_post.apply_async((post,), queue='postingest')
+    posts = get_new_pushshift_posts(data, self.uowm)
+    log.debug('Saving %s of %s pushshift posts', len(posts), len(data))
+    for batch in chunk_list(posts, PUSHSHIFT_BATCH_SIZE):
+        save_new_posts.apply_async((batch,), {'enqueued_at': time()}, queue='postingest')
 
 @celery.task(bind=True, base=SqlAlchemyTask, ignore_results=True)
 def save_pushshift_results_archive(self, data):
-    with self.uowm.start() as uow:
-        for submission in data:
-            existing = uow.posts.get_by_post_id(submission['id'])
-            if existing:
-                log.debug('Skipping pushshift post: %s', submission['id'])
-                continue
-            post = pushshift_to_post(submission)
-            log.debug('Saving pushshift post: %s', submission['id'])
-            save_new_post.apply_async((post,), queue='pushshift_ingest')
+    posts = get_new_pushshift_posts(data, self.uowm)
+    log.debug('Saving %s of %s pushshift posts', len(posts), len(data))
+    for batch in chunk_list(posts, PUSHSHIFT_BATCH_SIZE):
+        save_new_posts.apply_async((batch,), {'enqueued_at': time()}, queue='pushshift_ingest')
 
 
 @celery.task(bind=True, base=SqlAlchemyTask, ignore_results=True)
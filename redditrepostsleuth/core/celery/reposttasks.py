@@ -9,7 +9,7 @@ from sqlalchemy.exc import IntegrityError
 from redditrepostsleuth.core.celery import celery
 from redditrepostsleuth.core.celery.basetasks import AnnoyTask, RedditTask, RepostTask
 from redditrepostsleuth.core.celery.helpers.repost_image import save_image_repost_result, \
-    repost_watch_notify, check_for_post_watch
+    repost_watch_notify, check_for_post_watch, save_image_repost_results
 from redditrepostsleuth.core.db.databasemodels import Post, LinkRepost, RepostWatch
 from redditrepostsleuth.core.exception import NoIndexException, IngestHighMatchMeme
 from redditrepostsleuth.core.logging import log
@@ -59,26 +59,76 @@ def check_image_repost_save(self, post: Post) -> NoReturn:
     if watches and self.config.enable_repost_watch:
         notify_watch.apply_async((watches, post), queue='watch_notify')
 
+
+@celery.task(bind=True, base=AnnoyTask, serializer='pickle', ignore_results=True, autoretry_for=(RedLockError,NoIndexException), retry_kwargs={'max_retries': 20, 'countdown': 300})
+def check_image_repost_save_batch(self, posts: List[Post]) -> NoReturn:
+    """
+    Batch version of check_image_repost_save.  One index request and one hydrate query per index for the whole batch
+    and all results are saved in one transaction
+    :param posts: Image posts to check
+    """
+    search_settings = get_default_image_search_settings(self.config)
+    search_settings.max_matches = 75
+    all_search_results = self.dup_service.check_images(
+        posts,
+        search_settings=search_settings,
+        source='ingest_repost'
+    )
+
+    recheck = save_image_repost_results(all_search_results, self.uowm, source='ingest', high_match_check=True)
+    if recheck:
+        log.info('Rechecking %s posts with new meme templates', len(recheck))
+        check_image_repost_save_batch.apply_async((recheck,), queue='repost_image', countdown=300)
+
+    recheck_ids = {post.post_id for post in recheck}
+    found = 0
+    for search_results in all_search_results:
+        if not search_results.matches or search_results.checked_post.post_id in recheck_ids:
+            continue
+        found += 1
+        self.event_logger.save_event(RepostEvent(
+            event_type='repost_found',
+            status='success',
+            post_type='image',
+            repost_of=search_results.matches[0].post.post_id,
+        ))
+        watches = check_for_post_watch(search_results.matches, self.uowm)
+        if watches and self.config.enable_repost_watch:
+            notify_watch.apply_async((watches, search_results.checked_post), queue='watch_notify')
+
+    self.event_logger.save_event(
+        BatchedEvent(event_type='repost_check', status='success', count=len(posts), post_type='image'))
+    log.info('Checked %s image posts.  Found %s reposts', len(posts), found)
+
 @celery.task(bind=True, base=RepostTask, ignore_results=True, serializer='pickle')
 def link_repost_check(self, posts, ):
+    if self.hot_url_counter:
+        hot_urls = self.hot_url_counter.get_hot([post.url_hash for post in posts])
+    else:
+        hot_urls = self.link_blacklist
     with self.uowm.start() as uow:
         for post in posts:
             """
             if post.url_hash == '540f1167d27dcca2ea2772443beb5c79':
                 continue
             """
-            if post.url_hash in self.link_blacklist:
-                log.info('Skipping blacklisted URL hash %s', post.url_hash)
+            if post.url_hash in hot_urls:
+                log.info('Skipping hot URL hash %s', post.url_hash)
                 continue
 
             log.debug('Checking URL for repost: %s', post.url_hash)
             search_results = get_link_reposts(post.url, self.uowm, get_default_link_search_settings(self.config),
-                                              post=post)
-
-            if len(search_results.matches) > 10000:
-                log.info('Link hash %s shared %s times. Adding to blacklist', post.url_hash, len(search_results.matches))
-                self.link_blacklist.append(post.url_hash)
-                self.notification_svc.send_notification(f'URL has been shared {len(search_results.matches)} times. Adding to blacklist. \n\n {post.url}')
+                                              post=post, max_matches=100,
+                                              use_url_stats=self.config.link_url_stats_ready)
+
+            match_count = search_results.total_matches or len(search_results.matches)
+            if match_count > 10000:
+                log.info('Link hash %s shared %s times. Adding to blacklist', post.url_hash, match_count)
+                if self.hot_url_counter:
+                    self.hot_url_counter.mark_hot(post.url_hash, match_count)
+                else:
+                    self.link_blacklist.add(post.url_hash)
+                self.notification_svc.send_notification(f'URL has been shared {match_count} times. Adding to blacklist. \n\n {post.url}')
 
             search_results = filter_search_results(
                 search_results,
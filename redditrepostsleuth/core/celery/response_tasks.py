@@ -12,7 +12,7 @@ from requests.exceptions import ConnectionError
 
 from redditrepostsleuth.core.celery import celery
 from redditrepostsleuth.core.config import Config
-from redditrepostsleuth.core.db.databasemodels import MonitoredSub
+from redditrepostsleuth.core.db.databasemodels import MonitoredSub, Post
 from redditrepostsleuth.core.db.db_utils import get_db_engine
 from redditrepostsleuth.core.db.uow.sqlalchemyunitofworkmanager import SqlAlchemyUnitOfWorkManager
 from redditrepostsleuth.core.exception import LoadSubredditException
@@ -22,6 +22,7 @@ from redditrepostsleuth.core.model.repostresponse import SummonsResponse
 from redditrepostsleuth.core.notification.notification_service import NotificationService
 from redditrepostsleuth.core.services.duplicateimageservice import DuplicateImageService
 from redditrepostsleuth.core.services.eventlogging import EventLogging
+from redditrepostsleuth.core.services.ingest_scheduler import get_ingest_scheduler, PRIORITY_LANE
 from redditrepostsleuth.core.services.reddit_manager import RedditManager
 from redditrepostsleuth.core.services.response_handler import ResponseHandler
 from redditrepostsleuth.core.services.responsebuilder import ResponseBuilder
@@ -61,6 +62,15 @@ class SubMonitorTask(Task):
         dup_image_svc = DuplicateImageService(self.uowm, event_logger, self.reddit, config=self.config)
         response_builder = ResponseBuilder(self.uowm)
         self.sub_monitor = SubMonitor(dup_image_svc, self.uowm, self.reddit_manager, response_builder, response_handler, event_logger=event_logger, config=self.config)
+        self.ingest_scheduler = get_ingest_scheduler(self.config)
+
+    def send_to_ingest(self, post: Post) -> None:
+        # A mod is waiting on this post so it skips the firehose
+        if self.ingest_scheduler:
+            self.ingest_scheduler.submit([post], PRIORITY_LANE)
+        else:
+            celery.send_task('redditrepostsleuth.core.celery.ingesttasks.save_new_post', args=[post],
+                             queue='postingest_priority')
 
 
 @celery.task(bind=True, base=SubMonitorTask, serializer='pickle')
@@ -74,8 +84,7 @@ def sub_monitor_check_post(self, submission: Dict, monitored_sub: MonitoredSub):
         if not post:
             log.info('Post %s does exist, sending to ingest queue', submission['id'])
             post = pushshift_to_post(submission, source='reddit_json')
-            celery.send_task('redditrepostsleuth.core.celery.ingesttasks.save_new_post', args=[post],
-                             queue='postingest')
+            self.send_to_ingest(post)
             return
 
     title_keywords = []
@@ -104,8 +113,7 @@ def sub_monitor_check_post_old(self, submission, monitored_sub):
         if not post:
             log.info('Post %s does exist, sending to ingest queue', submission.id)
             post = submission_to_post(submission)
-            celery.send_task('redditrepostsleuth.core.celery.ingesttasks.save_new_post', args=[post],
-                             queue='postingest')
+            self.send_to_ingest(post)
             return
 
     title_keywords = []
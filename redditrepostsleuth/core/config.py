@@ -148,6 +148,8 @@ class Config:
             'influx_database',
             'influx_verify_ssl',
             'log_level',
+            # index_*_max_age values are in seconds.  Local image indexes past their max age are rebuilt in the
+            # background while the old index keeps serving searches
             'index_current_max_age',
             'index_current_skip_load_age',
             'index_current_file',
@@ -159,7 +161,11 @@ class Config:
             'index_historical_max_age',
             'default_hamming_distance',
             'repost_image_check_on_ingest',
+            'repost_image_check_batch_size',
             'repost_link_check_on_ingest',
+            'hot_url_counter',
+            'hot_url_threshold',
+            'link_url_stats_ready',
             'enable_repost_watch',
             'image_hash_api',
             'summons_subreddits',
@@ -175,6 +181,30 @@ class Config:
             'sub_monitor_exposed_config_options',
             'wiki_config_name',
             'index_api',
+            'image_index_engine',
+            'image_index_meme_distance',
+            'image_index_hot_refresh',
+            'image_index_compact_size',
+            # Only local index engines advance the search cache generation when new posts are indexed.  With the
+            # external index_api, search_cache_ttl is the only bound on how stale a cached result can be, so it's
+            # capped at a short value in that mode
+            'search_cache_ttl',
+            'search_cache_local_size',
+            'search_latency_flush_interval',
+            'hash_service_workers',
+            'hash_service_max_downloads',
+            'ingest_dedup_shared',
+            'ingest_dedup_local_size',
+            'ingest_dedup_capacity',
+            'ingest_async_fetch',
+            'ingest_async_max_connections',
+            'ingest_async_hash_workers',
+            'ingest_scheduler',
+            'ingest_scheduler_max_queue_depth',
+            'ingest_telemetry_flush_interval',
+            'image_cache_dir',
+            'image_cache_max_size_mb',
+            'image_cache_revalidate_after',
             'util_api',
             'live_responses',
             'top_post_offer_watch',
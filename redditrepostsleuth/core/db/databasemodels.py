@@ -1,11 +1,25 @@
-from sqlalchemy import Column, Integer, String, DateTime, func, Boolean, Text, ForeignKey, Float, Index
+from typing import Optional
+
+from sqlalchemy import Column, Integer, String, DateTime, func, Boolean, Text, ForeignKey, Float, Index, BINARY
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, validates
 
 Base = declarative_base()
 
 
+def _hash_to_bytes(value: Optional[str]) -> Optional[bytes]:
+    """
+    Convert a hex hash to the raw bytes stored in the binary hash columns
+    """
+    if not value:
+        return None
+    try:
+        return bytes.fromhex(value)
+    except ValueError:
+        return None
+
+
 class Post(Base):
 
     def __lt__(self, other):
@@ -38,6 +52,11 @@ class Post(Base):
     dhash_v = Column(String(64))
     dhash_h = Column(String(64))
     ahash = Column(String(64))
+    # Raw bytes of the hex hashes.  Kept in sync by _set_binary_hash while we move index builds off the hex columns
+    dhash_v_bin = Column(BINARY(32))
+    dhash_h_bin = Column(BINARY(32))
+    ahash_bin = Column(BINARY(32))
+    dhash_meme = Column(String(256)) # dhash at the meme filter hash size so searches don't re-download matches
     checked_repost = Column(Boolean, default=False)
     crosspost_checked = Column(Boolean, default=False)
     last_deleted_check = Column(DateTime, default=func.utc_timestamp())
@@ -49,6 +68,11 @@ class Post(Base):
     repost_count = Column(Integer, default=0)
     #fullname = Column(String(30))
 
+    @validates('dhash_h', 'dhash_v', 'ahash')
+    def _set_binary_hash(self, key, value):
+        setattr(self, f'{key}_bin', _hash_to_bytes(value))
+        return value
+
     def to_dict(self):
         return {
             'post_id': self.post_id,
@@ -74,6 +98,13 @@ class RedditImagePost(Base):
     post_id = Column(String(100), nullable=False, unique=True)
     dhash_v = Column(String(64))
     dhash_h = Column(String(64))
+    dhash_v_bin = Column(BINARY(32))
+    dhash_h_bin = Column(BINARY(32))
+
+    @validates('dhash_h', 'dhash_v')
+    def _set_binary_hash(self, key, value):
+        setattr(self, f'{key}_bin', _hash_to_bytes(value))
+        return value
 
 class RedditImagePostCurrent(Base):
     __tablename__ = 'reddit_image_post_current'
@@ -83,6 +114,13 @@ class RedditImagePostCurrent(Base):
     post_id = Column(String(100), nullable=False, unique=True)
     dhash_v = Column(String(64))
     dhash_h = Column(String(64))
+    dhash_v_bin = Column(BINARY(32))
+    dhash_h_bin = Column(BINARY(32))
+
+    @validates('dhash_h', 'dhash_v')
+    def _set_binary_hash(self, key, value):
+        setattr(self, f'{key}_bin', _hash_to_bytes(value))
+        return value
 
 
 class Summons(Base):
@@ -225,6 +263,29 @@ class LinkRepost(Base):
             'source': self.source,
         }
 
+class LinkUrlStats(Base):
+    """
+    Running totals for every link URL so link repost checks don't have to load every post that shared it
+    """
+    __tablename__ = 'link_url_stats'
+    id = Column(Integer, primary_key=True)
+    url_hash = Column(String(32), nullable=False, unique=True)
+    first_post_id = Column(String(100), nullable=False)
+    first_seen = Column(DateTime, nullable=False)
+    last_post_id = Column(String(100), nullable=False)
+    last_seen = Column(DateTime, nullable=False)
+    share_count = Column(Integer, nullable=False, default=1)
+
+    def to_dict(self):
+        return {
+            'url_hash': self.url_hash,
+            'first_post_id': self.first_post_id,
+            'first_seen': self.first_seen.timestamp() if self.first_seen else None,
+            'last_post_id': self.last_post_id,
+            'last_seen': self.last_seen.timestamp() if self.last_seen else None,
+            'share_count': self.share_count
+        }
+
 class VideoHash(Base):
     __tablename__ = 'reddit_video_hashes'
     id = Column(Integer, primary_key=True)
@@ -1,8 +1,10 @@
 from datetime import datetime
-from typing import List
+from typing import List, Tuple
+
+from sqlalchemy import func
 
 from redditrepostsleuth.core.logging import log
-from redditrepostsleuth.core.db.databasemodels import RedditImagePostCurrent
+from redditrepostsleuth.core.db.databasemodels import RedditImagePostCurrent, Post
 
 
 class ImagePostCurrentRepository:
@@ -18,12 +20,42 @@ class ImagePostCurrentRepository:
     def get_by_id(self, id: int) -> RedditImagePostCurrent:
         return self.db_session.query(RedditImagePostCurrent).filter(RedditImagePostCurrent.id == id).first()
 
+    def get_posts_by_ids(self, ids: List[int]) -> List[Tuple[int, Post]]:
+        """
+        Resolve a batch of current image post IDs to their reddit_post rows in a single join
+        :param ids: List of reddit_image_post_current IDs
+        :return: List of (image post ID, Post) tuples
+        """
+        return self.db_session.query(RedditImagePostCurrent.id, Post).join(Post, Post.post_id == RedditImagePostCurrent.post_id).filter(RedditImagePostCurrent.id.in_(ids)).all()
+
     def get_by_post_id(self, id: str) -> RedditImagePostCurrent:
         return self.db_session.query(RedditImagePostCurrent).filter(RedditImagePostCurrent.post_id == id).first()
 
     def page_by_id(self, id: int, limit: int = None):
         return self.db_session.query(RedditImagePostCurrent).filter(RedditImagePostCurrent.id > id).order_by(RedditImagePostCurrent.id).limit(limit).all()
 
+    def find_all_images_with_hash_return_id_hash(self, limit: int = None, id: int = 0):
+        return self.db_session.query(RedditImagePostCurrent).filter(RedditImagePostCurrent.id > id).with_entities(RedditImagePostCurrent.id, RedditImagePostCurrent.dhash_h).order_by(RedditImagePostCurrent.id).limit(limit).all()
+
+    def find_all_images_with_binary_hash(self, limit: int = None, id: int = 0) -> List[Tuple[int, bytes, str]]:
+        """
+        Page (id, raw dhash, hex dhash) rows for index builds.  The hex hash is only needed for rows that have not been
+        backfilled with the binary hash yet
+        :param limit: Page size
+        :param id: Last ID of the previous page
+        """
+        return self.db_session.query(RedditImagePostCurrent).filter(RedditImagePostCurrent.id > id).with_entities(RedditImagePostCurrent.id, RedditImagePostCurrent.dhash_h_bin, RedditImagePostCurrent.dhash_h).order_by(RedditImagePostCurrent.id).limit(limit).all()
+
+    def backfill_binary_hashes(self, start_id: int, end_id: int) -> int:
+        """
+        Set the binary hash columns from the hex columns for a range of IDs
+        :return: Rows updated
+        """
+        return self.db_session.query(RedditImagePostCurrent).filter(RedditImagePostCurrent.id >= start_id, RedditImagePostCurrent.id < end_id, RedditImagePostCurrent.dhash_h_bin == None).update(
+            {RedditImagePostCurrent.dhash_h_bin: func.unhex(RedditImagePostCurrent.dhash_h), RedditImagePostCurrent.dhash_v_bin: func.unhex(RedditImagePostCurrent.dhash_v)},
+            synchronize_session=False
+        )
+
     def bulk_save(self, items: List[RedditImagePostCurrent]):
         self.db_session.bulk_save_objects(items)
 
@@ -1,8 +1,10 @@
 from datetime import datetime
-from typing import List
+from typing import List, Tuple
+
+from sqlalchemy import func
 
 from redditrepostsleuth.core.logging import log
-from redditrepostsleuth.core.db.databasemodels import RedditImagePost
+from redditrepostsleuth.core.db.databasemodels import RedditImagePost, Post
 
 
 class ImagePostRepository:
@@ -21,6 +23,14 @@ class ImagePostRepository:
     def get_by_id(self, id: int) -> RedditImagePost:
         return self.db_session.query(RedditImagePost).filter(RedditImagePost.id == id).first()
 
+    def get_posts_by_ids(self, ids: List[int]) -> List[Tuple[int, Post]]:
+        """
+        Resolve a batch of image post IDs to their reddit_post rows in a single join
+        :param ids: List of reddit_image_post IDs
+        :return: List of (image post ID, Post) tuples
+        """
+        return self.db_session.query(RedditImagePost.id, Post).join(Post, Post.post_id == RedditImagePost.post_id).filter(RedditImagePost.id.in_(ids)).all()
+
     def get_by_post_id(self, id: str) -> RedditImagePost:
         return self.db_session.query(RedditImagePost).filter(RedditImagePost.post_id == id).first()
 
@@ -44,4 +54,23 @@ class ImagePostRepository:
         self.db_session.delete(item)
 
     def find_all_images_with_hash_return_id_hash(self, limit: int = None, id: int = 0):
-        return self.db_session.query(RedditImagePost).filter(RedditImagePost.id > id).with_entities(RedditImagePost.id, RedditImagePost.dhash_h).limit(limit).all()
\ No newline at end of file
+        return self.db_session.query(RedditImagePost).filter(RedditImagePost.id > id).with_entities(RedditImagePost.id, RedditImagePost.dhash_h).order_by(RedditImagePost.id).limit(limit).all()
+
+    def find_all_images_with_binary_hash(self, limit: int = None, id: int = 0) -> List[Tuple[int, bytes, str]]:
+        """
+        Page (id, raw dhash, hex dhash) rows for index builds.  The hex hash is only needed for rows that have not been
+        backfilled with the binary hash yet
+        :param limit: Page size
+        :param id: Last ID of the previous page
+        """
+        return self.db_session.query(RedditImagePost).filter(RedditImagePost.id > id).with_entities(RedditImagePost.id, RedditImagePost.dhash_h_bin, RedditImagePost.dhash_h).order_by(RedditImagePost.id).limit(limit).all()
+
+    def backfill_binary_hashes(self, start_id: int, end_id: int) -> int:
+        """
+        Set the binary hash columns from the hex columns for a range of IDs
+        :return: Rows updated
+        """
+        return self.db_session.query(RedditImagePost).filter(RedditImagePost.id >= start_id, RedditImagePost.id < end_id, RedditImagePost.dhash_h_bin == None).update(
+            {RedditImagePost.dhash_h_bin: func.unhex(RedditImagePost.dhash_h), RedditImagePost.dhash_v_bin: func.unhex(RedditImagePost.dhash_v)},
+            synchronize_session=False
+        )
@@ -0,0 +1,80 @@
+from datetime import datetime
+from typing import List, Text, Optional
+
+from sqlalchemy import func, literal_column
+from sqlalchemy.dialects.mysql import insert
+
+from redditrepostsleuth.core.db.databasemodels import LinkUrlStats, Post
+
+
+class LinkUrlStatsRepo:
+    def __init__(self, db_session):
+        self.db_session = db_session
+
+    def get_by_url_hash(self, url_hash: Text) -> Optional[LinkUrlStats]:
+        return self.db_session.query(LinkUrlStats).filter(LinkUrlStats.url_hash == url_hash).first()
+
+    def add_shares(self, posts: List[Post]) -> int:
+        """
+        Add a batch of link posts to the stats for their URLs with a single upsert.  Runs in the current transaction
+        so the stats are only saved if the posts are
+        :param posts: Posts with a url_hash.  Anything with post_id, url_hash and created_at works
+        :return: Number of URLs updated
+        """
+        stats = {}
+        for post in posts:
+            if not post.url_hash:
+                continue
+            created_at = post.created_at or datetime.utcnow()
+            url_stats = stats.get(post.url_hash)
+            if not url_stats:
+                stats[post.url_hash] = {
+                    'url_hash': post.url_hash,
+                    'first_post_id': post.post_id,
+                    'first_seen': created_at,
+                    'last_post_id': post.post_id,
+                    'last_seen': created_at,
+                    'share_count': 1
+                }
+                continue
+            url_stats['share_count'] += 1
+            if created_at < url_stats['first_seen']:
+                url_stats['first_post_id'] = post.post_id
+                url_stats['first_seen'] = created_at
+            if created_at >= url_stats['last_seen']:
+                url_stats['last_post_id'] = post.post_id
+                url_stats['last_seen'] = created_at
+
+        if not stats:
+            return 0
+
+        # Backfilled posts can be older than what we've already seen so the first post is only replaced if it's older.
+        # MySQL applies these in order so the post IDs have to be set before the dates they're compared against.
+        # Rows are sorted so concurrent upserts lock the same unique keys in the same order and can't deadlock
+        stmt = insert(LinkUrlStats).values([stats[url_hash] for url_hash in sorted(stats)])
+        stmt = stmt.on_duplicate_key_update([
+            ('first_post_id', func.if_(
+                literal_column('VALUES(first_seen)') < LinkUrlStats.first_seen,
+                literal_column('VALUES(first_post_id)'),
+                LinkUrlStats.first_post_id
+            )),
+            ('first_seen', func.least(LinkUrlStats.first_seen, literal_column('VALUES(first_seen)'))),
+            ('last_post_id', func.if_(
+                literal_column('VALUES(last_seen)') >= LinkUrlStats.last_seen,
+                literal_column('VALUES(last_post_id)'),
+                LinkUrlStats.last_post_id
+            )),
+            ('last_seen', func.greatest(LinkUrlStats.last_seen, literal_column('VALUES(last_seen)'))),
+            ('share_count', LinkUrlStats.share_count + literal_column('VALUES(share_count)')),
+        ])
+        self.db_session.execute(stmt)
+        return len(stats)
+
+    def backfill(self, start_id: int, end_id: int) -> int:
+        """
+        Add the link posts in a range of post IDs to the stats
+        :return: Number of URLs updated
+        """
+        rows = self.db_session.query(Post).filter(Post.id >= start_id, Post.id < end_id, Post.post_type == 'link', Post.url_hash != None).with_entities(
+            Post.post_id, Post.url_hash, Post.created_at).all()
+        return self.add_shares(rows)
@@ -19,6 +19,9 @@ class MemeTemplateRepository:
     def get_all(self, limit: int = 100, offset: int = 0) -> List[MemeTemplate]:
         return self.db_session.query(MemeTemplate).limit(limit).offset(offset).all()
 
+    def page_by_id(self, id: int, limit: int = None) -> List[MemeTemplate]:
+        return self.db_session.query(MemeTemplate).filter(MemeTemplate.id > id).order_by(MemeTemplate.id).limit(limit).all()
+
     def update(self, item: MemeTemplate):
         self.db_session.merge(item)
 
@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Dict, Text
 
 from sqlalchemy import func
 from datetime import datetime, timedelta
@@ -17,12 +17,32 @@ class PostRepository:
         #log.debug('Inserting: %s', item)
         self.db_session.add(item)
 
-    def bulk_save(self, items: List[Post]):
-        self.db_session.bulk_save_objects(items)
+    def bulk_save(self, items: List[Post], return_defaults: bool = False):
+        """
+        :param return_defaults: Set the IDs of the saved posts.  Slower since rows are inserted one at a time
+        """
+        self.db_session.bulk_save_objects(items, return_defaults=return_defaults)
 
     def update(self, item: Post):
         self.db_session.merge(item)
 
+    def backfill_binary_hashes(self, start_id: int, end_id: int) -> int:
+        """
+        Set the binary hash columns from the hex columns for a range of IDs
+        :return: Rows updated
+        """
+        return self.db_session.query(Post).filter(Post.id >= start_id, Post.id < end_id, Post.dhash_h != None, Post.dhash_h_bin == None).update(
+            {Post.dhash_h_bin: func.unhex(Post.dhash_h), Post.dhash_v_bin: func.unhex(Post.dhash_v), Post.ahash_bin: func.unhex(Post.ahash)},
+            synchronize_session=False
+        )
+
+    def update_meme_hashes(self, meme_hashes: Dict[int, Text]):
+        """
+        Set the meme hash on a batch of posts
+        :param meme_hashes: Dict of Post.id to meme hash
+        """
+        self.db_session.bulk_update_mappings(Post, [{'id': k, 'dhash_meme': v} for k, v in meme_hashes.items()])
+
     def page_by_id(self, id: int, limit: int = None):
         return self.db_session.query(Post).filter(Post.id > id).order_by(Post.id).limit(limit).all()
 
@@ -38,6 +58,16 @@ class PostRepository:
     def get_by_id(self, id: int) -> Post:
         return self.db_session.query(Post).filter(Post.id == id).first()
 
+    def get_existing_post_ids(self, post_ids: List[Text]) -> List[Text]:
+        """
+        Check which of a batch of post IDs we already have with a single query
+        :param post_ids: Reddit post IDs
+        :return: The post IDs that exist
+        """
+        if not post_ids:
+            return []
+        return [r[0] for r in self.db_session.query(Post.post_id).filter(Post.post_id.in_(post_ids)).all()]
+
     def get_by_post_id(self, id: str) -> Post:
         #log.debug('Looking up post with ID %s', id)
         return self.db_session.query(Post).filter(Post.post_id == id).first()
@@ -19,6 +19,7 @@ from redditrepostsleuth.core.db.repository.imagerepostrepository import ImageRep
 from redditrepostsleuth.core.db.repository.indexbuildtimesrepository import IndexBuildTimesRepository
 from redditrepostsleuth.core.db.repository.investigatepostrepo import InvestigatePostRepo
 from redditrepostsleuth.core.db.repository.link_repost_repo import LinkPostRepo
+from redditrepostsleuth.core.db.repository.link_url_stats_repo import LinkUrlStatsRepo
 from redditrepostsleuth.core.db.repository.memetemplaterepository import MemeTemplateRepository
 from redditrepostsleuth.core.db.repository.monitored_sub_config_change_repo import MonitoredSubConfigChangeRepo
 from redditrepostsleuth.core.db.repository.monitored_sub_config_revision_repo import MonitoredSubConfigRevisionRepo
@@ -76,6 +77,10 @@ class SqlAlchemyUnitOfWork(UnitOfWork):
     def link_repost(self) -> LinkPostRepo:
         return LinkPostRepo(self.session)
 
+    @property
+    def link_url_stats(self) -> LinkUrlStatsRepo:
+        return LinkUrlStatsRepo(self.session)
+
     @property
     def video_hash(self) -> VideoHashRepository:
         return VideoHashRepository(self.session)
@@ -0,0 +1,39 @@
+from datetime import datetime
+from typing import Text, List, Tuple, NoReturn, Optional
+
+import numpy as np
+
+
+class ImageIndex:
+    """
+    Base class for in process image indexes.  Indexes are built from (id, dhash) pairs and answer exact Hamming
+    radius queries
+    """
+    def __init__(self, name: Text):
+        self.name = name
+        self.built_at: Optional[datetime] = None
+
+    def build(self, ids: List[int], hashes: List[Text]) -> NoReturn:
+        raise NotImplementedError
+
+    def build_packed(self, ids: List[int], hashes: np.ndarray, hash_length: int) -> NoReturn:
+        """
+        Build from hashes that are already packed into uint64 words
+        :param ids: IDs of each hash
+        :param hashes: 2D uint64 array with one row per hash
+        :param hash_length: Length of the hashes as hex
+        """
+        raise NotImplementedError
+
+    def search(self, image_hash: Text, max_distance: int, max_results: int = None) -> List[Tuple[int, int]]:
+        """
+        Find all items within max_distance of the provided hash
+        :param image_hash: Hex hash to search for
+        :param max_distance: Max Hamming distance of a match
+        :param max_results: Return at most this many of the closest matches
+        :return: List of (id, hamming distance) sorted by distance
+        """
+        raise NotImplementedError
+
+    def __len__(self):
+        raise NotImplementedError
@@ -0,0 +1,7 @@
+from redditrepostsleuth.core.index.linear_image_index import LinearImageIndex
+from redditrepostsleuth.core.index.mih_image_index import MultiIndexHashImageIndex
+
+INDEX_MAP = {
+    'linear': LinearImageIndex,
+    'mih': MultiIndexHashImageIndex
+}
@@ -0,0 +1,58 @@
+from datetime import datetime
+from typing import Text, List, Tuple, NoReturn
+
+import numpy as np
+
+from redditrepostsleuth.core.index.image_index import ImageIndex
+from redditrepostsleuth.core.logging import log
+from redditrepostsleuth.core.util.hamming import hashes_to_matrix, hex_to_words, hamming_distances
+
+
+class LinearImageIndex(ImageIndex):
+    """
+    Exact index that scans every packed hash on each search.  Slowest engine but has no per item overhead beyond
+    the packed hashes themselves
+    """
+    def __init__(self, name: Text = 'linear'):
+        super().__init__(name)
+        self.hash_length = None
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._hashes = np.zeros((0, 0), dtype=np.uint64)
+
+    def build(self, ids: List[int], hashes: List[Text]) -> NoReturn:
+        self.build_packed(ids, hashes_to_matrix(hashes), len(hashes[0]) if hashes else None)
+
+    def build_packed(self, ids: List[int], hashes: np.ndarray, hash_length: int) -> NoReturn:
+        if len(ids) != len(hashes):
+            raise ValueError('ID and hash counts do not match')
+        self.hash_length = hash_length
+        self._ids = np.array(ids, dtype=np.int64)
+        self._hashes = hashes
+        self.built_at = datetime.utcnow()
+        log.info('Built %s index with %s items', self.name, len(self))
+
+    def search(self, image_hash: Text, max_distance: int, max_results: int = None) -> List[Tuple[int, int]]:
+        if not len(self):
+            return []
+        if len(image_hash) != self.hash_length:
+            log.error('Hash length %s does not match index hash length %s', len(image_hash), self.hash_length)
+            return []
+        target = hex_to_words(image_hash)
+        distances = hamming_distances(target, self._hashes)
+        rows = np.nonzero(distances <= max_distance)[0]
+        return self._ranked_results(rows, distances[rows], max_results)
+
+    def _ranked_results(self, rows: np.ndarray, distances: np.ndarray, max_results: int = None) -> List[Tuple[int, int]]:
+        """
+        Take candidate rows that passed the distance check and return the closest as (id, distance)
+        :param rows: Row numbers of the matches
+        :param distances: Distance of each match
+        :param max_results: Max results to return
+        """
+        order = np.argsort(distances, kind='stable')
+        if max_results:
+            order = order[:max_results]
+        return [(int(self._ids[rows[i]]), int(distances[i])) for i in order]
+
+    def __len__(self):
+        return len(self._ids)
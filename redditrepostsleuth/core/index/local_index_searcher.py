@@ -0,0 +1,246 @@
+import threading
+from datetime import datetime
+from time import perf_counter
+from typing import Text, Optional, List, Tuple, Callable, Set
+
+from redditrepostsleuth.core.config import Config
+from redditrepostsleuth.core.db.uow.unitofworkmanager import UnitOfWorkManager
+from redditrepostsleuth.core.index.image_index import ImageIndex
+from redditrepostsleuth.core.index.index_class_maps import INDEX_MAP
+from redditrepostsleuth.core.logging import log
+from redditrepostsleuth.core.model.image_index_api_result import ImageIndexApiResult
+from redditrepostsleuth.core.util.hamming import bytes_to_matrix
+
+# dhash_h is stored from a hash size of 16 which gives 64 hex chars
+INDEX_HASH_LENGTH = 64
+DEFAULT_MEME_DISTANCE = 3
+
+
+class LocalIndexSearcher:
+    """
+    Searches in process indexes built from reddit_image_post and reddit_image_post_current so workers can search
+    without calling the index API.  Indexes are loaded on first use and rebuilt once they are older than the
+    configured max age (in seconds).  Rebuilds run in a background thread and the old index keeps serving searches
+    until the new one is fully built and swapped in
+    """
+    def __init__(
+            self,
+            uowm: UnitOfWorkManager,
+            config: Config,
+            page_size: int = 100000,
+            on_current_rebuild: Callable = None,
+            background: bool = True
+    ):
+        """
+        :param uowm: Unit of work manager
+        :param config: Config
+        :param page_size: Rows to load per query when building an index
+        :param on_current_rebuild: Called after the current index is rebuilt with newer posts
+        :param background: Rebuild expired indexes in a background thread.  If False they're rebuilt inline
+        """
+        self.uowm = uowm
+        self.on_current_rebuild = on_current_rebuild
+        self.config = config
+        self.page_size = page_size
+        self.background = background
+        self._load_lock = threading.Lock()
+        self._rebuild_lock = threading.Lock()
+        self._rebuilding: Set[Text] = set()
+        self.index_class = INDEX_MAP[config.image_index_engine]
+        self.historical_index: Optional[ImageIndex] = None
+        self.current_index: Optional[ImageIndex] = None
+        self.meme_index: Optional[ImageIndex] = None
+
+    def start(self) -> None:
+        """
+        Load the indexes now instead of on the first search.  Call once per process after any fork.  In background
+        mode the load runs in a thread and searches made before it finishes wait for it
+        """
+        if not self.background:
+            self._load()
+            return
+        threading.Thread(target=self._load, name='index-load', daemon=True).start()
+
+    def _load(self) -> None:
+        try:
+            self._refresh_indexes()
+            self._refresh_index('meme_index', 'meme', self._page_meme_templates, self.config.index_meme_max_age)
+        except Exception as e:
+            log.exception('Failed to load image indexes: %s', str(e))
+
+    def search(
+            self,
+            image_hash: Text,
+            target_hamming_distance: float,
+            max_matches: int = None
+    ) -> ImageIndexApiResult:
+        """
+        Search the historical and current indexes for all items within the target distance
+        :param image_hash: Hash to search
+        :param target_hamming_distance: Max Hamming distance of a match
+        :param max_matches: Max matches to return from each index
+        :rtype: ImageIndexApiResult
+        """
+        self._refresh_indexes()
+        start = perf_counter()
+        historical_matches = self.historical_index.search(image_hash, target_hamming_distance, max_results=max_matches)
+        current_matches = self.current_index.search(image_hash, target_hamming_distance, max_results=max_matches)
+        return ImageIndexApiResult(
+            current_matches=[self._build_match(m) for m in current_matches],
+            historical_matches=[self._build_match(m) for m in historical_matches],
+            index_search_time=round(perf_counter() - start, 5),
+            total_searched=len(self.historical_index) + len(self.current_index),
+            used_current_index=True,
+            used_historical_index=True,
+            target_result={}
+        )
+
+    def get_meme_template_id(self, image_hash: Text) -> Optional[int]:
+        """
+        Get the ID of the closest meme template to the provided hash
+        :param image_hash: Hash to check
+        :return: Meme template ID if one is in range
+        """
+        self._refresh_index('meme_index', 'meme', self._page_meme_templates, self.config.index_meme_max_age)
+        max_distance = self.config.image_index_meme_distance
+        if max_distance is None:
+            max_distance = DEFAULT_MEME_DISTANCE
+        results = self.meme_index.search(image_hash, int(max_distance), max_results=1)
+        if not results:
+            return
+        return results[0][0]
+
+    def _refresh_indexes(self):
+        self._refresh_index(
+            'historical_index',
+            'historical',
+            self._page_historical,
+            self.config.index_historical_max_age
+        )
+        self._refresh_index(
+            'current_index',
+            'current',
+            self._page_current,
+            self.config.index_current_max_age,
+            on_rebuild=self.on_current_rebuild
+        )
+
+    def _refresh_index(
+            self,
+            attr: Text,
+            name: Text,
+            page_func: Callable,
+            max_age: Optional[int],
+            on_rebuild: Callable = None
+    ) -> None:
+        """
+        Load the index if it's missing or start a rebuild if it's expired
+        :param attr: Attribute holding the index
+        :param name: Index name
+        :param page_func: Function to page rows into the index
+        :param max_age: Max age of the index in seconds
+        :param on_rebuild: Called after an existing index is replaced
+        """
+        index = getattr(self, attr)
+        if index is None:
+            # Nothing to search yet so the first load has to block
+            with self._load_lock:
+                if getattr(self, attr) is None:
+                    setattr(self, attr, self._build_index(name, page_func))
+            return
+        if not self._is_expired(index, max_age):
+            return
+        if not self.background:
+            self._rebuild_index(attr, name, page_func, on_rebuild)
+            return
+        with self._rebuild_lock:
+            if attr in self._rebuilding:
+                return
+            self._rebuilding.add(attr)
+        threading.Thread(
+            target=self._rebuild_index,
+            args=(attr, name, page_func, on_rebuild),
+            name=f'{name}-index-rebuild',
+            daemon=True
+        ).start()
+
+    def _rebuild_index(self, attr: Text, name: Text, page_func: Callable, on_rebuild: Callable = None) -> None:
+        try:
+            setattr(self, attr, self._build_index(name, page_func))
+            if on_rebuild:
+                on_rebuild()
+        except Exception as e:
+            log.exception('Failed to rebuild %s image index: %s', name, str(e))
+        finally:
+            with self._rebuild_lock:
+                self._rebuilding.discard(attr)
+
+    @staticmethod
+    def _is_expired(index: Optional[ImageIndex], max_age: Optional[int]) -> bool:
+        if index is None:
+            return True
+        if not max_age:
+            return False
+        return (datetime.utcnow() - index.built_at).total_seconds() > int(max_age)
+
+    @staticmethod
+    def _build_match(result: Tuple[int, int]) -> dict:
+        """
+        Convert a raw index result into the match dict the index API returns.
+        Distance is the normalized Hamming distance so the existing annoy distance filter keeps the same 0 to 1 scale
+        :param result: (id, hamming distance)
+        """
+        return {'id': result[0], 'distance': result[1] / INDEX_HASH_LENGTH}
+
+    def _build_index(self, name: Text, page_func: Callable) -> ImageIndex:
+        log.info('Loading %s image index', name)
+        start = perf_counter()
+        ids, raw_hashes, _ = self._load_hashes(page_func)
+        index = self.index_class(name=name)
+        index.build_packed(ids, bytes_to_matrix(b''.join(raw_hashes), len(ids)), INDEX_HASH_LENGTH)
+        log.info('Loaded %s image index with %s items in %s seconds', name, len(index), round(perf_counter() - start, 2))
+        return index
+
+    def _load_hashes(self, page_func: Callable, last_id: int = 0) -> Tuple[List[int], List[bytes], int]:
+        """
+        Page through (id, raw dhash, hex dhash) rows until exhausted.  The raw hash is used as is and the hex hash is
+        only decoded for rows missing the raw hash
+        :param page_func: Function taking a UoW and the last seen ID and returning the next page of rows
+        :param last_id: Only load rows after this ID
+        :return: IDs, raw hashes and the ID of the last row read
+        """
+        ids, raw_hashes = [], []
+        skipped = 0
+        decoded = 0
+        while True:
+            with self.uowm.start() as uow:
+                rows = page_func(uow, last_id)
+            if not rows:
+                break
+            for row_id, raw_hash, dhash in rows:
+                if not raw_hash and dhash and len(dhash) == INDEX_HASH_LENGTH:
+                    try:
+                        raw_hash = bytes.fromhex(dhash)
+                        decoded += 1
+                    except ValueError:
+                        pass
+                if not raw_hash or len(raw_hash) != INDEX_HASH_LENGTH // 2:
+                    skipped += 1
+                    continue
+                ids.append(row_id)
+                raw_hashes.append(raw_hash)
+            last_id = rows[-1][0]
+        if decoded:
+            log.info('Decoded %s hex hashes missing a binary hash', decoded)
+        if skipped:
+            log.error('Skipped %s rows with a missing or invalid hash', skipped)
+        return ids, raw_hashes, last_id
+
+    def _page_historical(self, uow, last_id: int) -> List[Tuple[int, bytes, Text]]:
+        return uow.image_post.find_all_images_with_binary_hash(limit=self.page_size, id=last_id)
+
+    def _page_current(self, uow, last_id: int) -> List[Tuple[int, bytes, Text]]:
+        return uow.image_post_current.find_all_images_with_binary_hash(limit=self.page_size, id=last_id)
+
+    def _page_meme_templates(self, uow, last_id: int) -> List[Tuple[int, bytes, Text]]:
+        return [(t.id, None, t.dhash_h) for t in uow.meme_template.page_by_id(last_id, limit=self.page_size)]
@@ -0,0 +1,94 @@
+from itertools import combinations, product
+from typing import Text, List, Tuple, NoReturn
+
+import numpy as np
+
+from redditrepostsleuth.core.index.linear_image_index import LinearImageIndex
+from redditrepostsleuth.core.logging import log
+from redditrepostsleuth.core.util.hamming import hex_to_words, hamming_distances
+
+_NIBBLES_PER_CHUNK = 4
+
+
+def _chunk_masks(max_changes: int) -> np.ndarray:
+    """
+    Build every XOR mask that changes up to max_changes hex characters in a 16 bit chunk
+    :param max_changes: Max number of changed hex characters
+    :return: uint16 array of masks
+    """
+    masks = []
+    for changes in range(max_changes + 1):
+        for positions in combinations(range(_NIBBLES_PER_CHUNK), changes):
+            for values in product(range(1, 16), repeat=changes):
+                mask = 0
+                for position, value in zip(positions, values):
+                    mask |= value << (4 * position)
+                masks.append(mask)
+    return np.array(masks, dtype=np.uint16)
+
+
+class MultiIndexHashImageIndex(LinearImageIndex):
+    """
+    Exact multi-index hashing engine.
+
+    Each hash is split into 16 bit chunks with a sorted lookup table per chunk. If two hashes are within distance r
+    then at least one of their m chunks is within r // m, so we only have to probe each table for chunk values close
+    to the target's and verify the candidates.  Searches with a radius too large to probe efficiently fall back to a
+    full linear scan so results are always exact
+    """
+    def __init__(self, name: Text = 'mih', max_chunk_distance: int = 2):
+        super().__init__(name)
+        self.max_chunk_distance = max_chunk_distance
+        self._masks = [_chunk_masks(i) for i in range(max_chunk_distance + 1)]
+        self._chunk_values: List[np.ndarray] = []
+        self._chunk_rows: List[np.ndarray] = []
+
+    def build_packed(self, ids: List[int], hashes: np.ndarray, hash_length: int) -> NoReturn:
+        super().build_packed(ids, hashes, hash_length)
+        self._chunk_values = []
+        self._chunk_rows = []
+        if not len(self):
+            return
+        chunks = self._to_chunks(self._hashes)
+        for i in range(chunks.shape[1]):
+            rows = np.argsort(chunks[:, i], kind='stable')
+            self._chunk_values.append(chunks[rows, i])
+            self._chunk_rows.append(rows)
+
+    def search(self, image_hash: Text, max_distance: int, max_results: int = None) -> List[Tuple[int, int]]:
+        if not len(self) or len(image_hash) != self.hash_length:
+            return super().search(image_hash, max_distance, max_results=max_results)
+
+        chunk_distance = int(max_distance) // len(self._chunk_values)
+        if chunk_distance > self.max_chunk_distance:
+            log.debug('Search distance %s too large for chunk probing, using linear scan', max_distance)
+            return super().search(image_hash, max_distance, max_results=max_results)
+
+        target = hex_to_words(image_hash)
+        target_chunks = self._to_chunks(target.reshape(1, -1))[0]
+        masks = self._masks[chunk_distance]
+        candidates = []
+        for i, chunk_values in enumerate(self._chunk_values):
+            probes = np.bitwise_xor(masks, target_chunks[i])
+            starts = np.searchsorted(chunk_values, probes, side='left')
+            ends = np.searchsorted(chunk_values, probes, side='right')
+            for start, end in zip(starts, ends):
+                if end > start:
+                    candidates.append(self._chunk_rows[i][start:end])
+
+        if not candidates:
+            return []
+
+        rows = np.unique(np.concatenate(candidates))
+        distances = hamming_distances(target, self._hashes[rows])
+        keep = distances <= max_distance
+        return self._ranked_results(rows[keep], distances[keep], max_results)
+
+    @staticmethod
+    def _to_chunks(hashes: np.ndarray) -> np.ndarray:
+        """
+        Split packed hashes into 16 bit chunks, preserving the hex character order
+        :param hashes: 2D uint64 array
+        :return: 2D uint16 array with 4 chunks per word
+        """
+        return hashes.astype('>u8').view('>u2').astype(np.uint16)
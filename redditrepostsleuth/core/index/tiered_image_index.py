@@ -0,0 +1,214 @@
+import threading
+from datetime import datetime
+from time import perf_counter
+from typing import Text, List, Tuple, Callable, Optional, Type
+
+import numpy as np
+
+from redditrepostsleuth.core.index.image_index import ImageIndex
+from redditrepostsleuth.core.index.linear_image_index import LinearImageIndex
+from redditrepostsleuth.core.logging import log
+from redditrepostsleuth.core.util.hamming import bytes_to_matrix
+
+
+class HotSegment:
+    """
+    Small mutable segment that new rows are appended to until they are compacted into an immutable segment.
+    Searched with a linear scan that is rebuilt when rows have been appended since the last search
+    """
+    def __init__(self, hash_length: int, ids: List[int] = None, raw_hashes: List[bytes] = None):
+        self.hash_length = hash_length
+        self._ids = list(ids or [])
+        self._raw_hashes = list(raw_hashes or [])
+        self._index: Optional[LinearImageIndex] = None
+        self._lock = threading.Lock()
+
+    def append(self, ids: List[int], raw_hashes: List[bytes]) -> None:
+        with self._lock:
+            self._ids += ids
+            self._raw_hashes += raw_hashes
+            self._index = None
+
+    def snapshot(self) -> Tuple[List[int], List[bytes]]:
+        with self._lock:
+            return list(self._ids), list(self._raw_hashes)
+
+    def search(self, image_hash: Text, max_distance: int, max_results: int = None) -> List[Tuple[int, int]]:
+        with self._lock:
+            if self._index is None:
+                self._index = build_segment(LinearImageIndex, 'hot', self._ids, self._raw_hashes, self.hash_length)
+            index = self._index
+        return index.search(image_hash, max_distance, max_results=max_results)
+
+    def __len__(self):
+        return len(self._ids)
+
+
+class IndexGeneration:
+    """
+    Immutable view of a tiered index.  Searches grab the current generation once so a swap mid search is harmless
+    """
+    def __init__(self, number: int, segments: Tuple[ImageIndex, ...], hot: HotSegment, last_id: int, built_at: datetime):
+        self.number = number
+        self.segments = segments
+        self.hot = hot
+        self.last_id = last_id
+        self.built_at = built_at
+
+
+class TieredImageIndex:
+    """
+    Image index made of immutable segments plus a small hot segment.
+
+    A full load builds the base segment.  New rows are tailed from the database into the hot segment, and once it is
+    large enough it's compacted into a new immutable segment.  Extra segments are merged back into one when there are
+    too many.  Every change builds the new segments first and then swaps in a new generation, so searches never wait
+    on a build
+    """
+    def __init__(
+            self,
+            name: Text,
+            index_class: Type[LinearImageIndex],
+            load_func: Callable[[int], Tuple[List[int], List[bytes], int]],
+            hash_length: int,
+            compact_size: int = 50000,
+            max_segments: int = 4
+    ):
+        """
+        :param name: Name of the index
+        :param index_class: Index engine used for immutable segments
+        :param load_func: Function taking the last loaded ID and returning (ids, raw hashes, last row ID) of newer rows
+        :param hash_length: Length of the hashes as hex
+        :param compact_size: Compact the hot segment once it holds this many rows
+        :param max_segments: Merge segments once there are more than this many
+        """
+        self.name = name
+        self.index_class = index_class
+        self.load_func = load_func
+        self.hash_length = hash_length
+        self.compact_size = compact_size
+        self.max_segments = max_segments
+        self._generation: Optional[IndexGeneration] = None
+        self._lock = threading.Lock()
+
+    @property
+    def generation(self) -> Optional[IndexGeneration]:
+        return self._generation
+
+    @property
+    def built_at(self) -> Optional[datetime]:
+        return self._generation.built_at if self._generation else None
+
+    def load(self) -> None:
+        """
+        Do a full load of the index and swap it in.  Hot rows newer than the load are kept
+        """
+        log.info('Loading %s tiered image index', self.name)
+        start = perf_counter()
+        ids, raw_hashes, last_id = self.load_func(0)
+        base = build_segment(self.index_class, self.name, ids, raw_hashes, self.hash_length)
+        with self._lock:
+            old = self._generation
+            hot_ids, hot_hashes = [], []
+            if old:
+                for row_id, raw_hash in zip(*old.hot.snapshot()):
+                    if row_id > last_id:
+                        hot_ids.append(row_id)
+                        hot_hashes.append(raw_hash)
+            self._swap(
+                (base,),
+                HotSegment(self.hash_length, hot_ids, hot_hashes),
+                max(last_id, old.last_id if old else 0),
+                built_at=datetime.utcnow()
+            )
+        log.info('Loaded %s tiered image index with %s items in %s seconds', self.name, len(self), round(perf_counter() - start, 2))
+
+    def refresh(self) -> int:
+        """
+        Append rows added since the last load or refresh to the hot segment
+        :return: Number of rows added
+        """
+        generation = self._generation
+        ids, raw_hashes, last_id = self.load_func(generation.last_id)
+        with self._lock:
+            if self._generation.last_id != generation.last_id:
+                # Another load moved us forward while we were reading.  The next refresh picks up anything missed
+                return 0
+            self._generation.hot.append(ids, raw_hashes)
+            self._swap(self._generation.segments, self._generation.hot, max(last_id, generation.last_id))
+        if ids:
+            log.debug('Added %s rows to %s hot segment', len(ids), self.name)
+        return len(ids)
+
+    def compact(self) -> bool:
+        """
+        Move the hot segment into a new immutable segment once it's large enough, merging segments if needed
+        :return: True if the index was compacted
+        """
+        generation = self._generation
+        if len(generation.hot) < self.compact_size:
+            return False
+        ids, raw_hashes = generation.hot.snapshot()
+        segment = build_segment(self.index_class, self.name, ids, raw_hashes, self.hash_length)
+        with self._lock:
+            remaining_ids, remaining_hashes = self._generation.hot.snapshot()
+            hot = HotSegment(self.hash_length, remaining_ids[len(ids):], remaining_hashes[len(ids):])
+            self._swap(self._generation.segments + (segment,), hot, self._generation.last_id)
+        log.info('Compacted %s rows into new %s segment', len(ids), self.name)
+        if len(self._generation.segments) > self.max_segments:
+            self._merge_segments()
+        return True
+
+    def _merge_segments(self) -> None:
+        """
+        Merge every segment after the base into one
+        """
+        segments = self._generation.segments
+        merged = self.index_class(name=self.name)
+        merged.build_packed(
+            np.concatenate([s._ids for s in segments[1:]]).tolist(),
+            np.vstack([s._hashes for s in segments[1:]]),
+            self.hash_length
+        )
+        with self._lock:
+            new_segments = self._generation.segments[len(segments):]
+            self._swap((segments[0], merged) + new_segments, self._generation.hot, self._generation.last_id)
+        log.info('Merged %s %s segments', len(segments) - 1, self.name)
+
+    def _swap(self, segments: Tuple[ImageIndex, ...], hot: HotSegment, last_id: int, built_at: datetime = None) -> None:
+        old = self._generation
+        self._generation = IndexGeneration(
+            number=old.number + 1 if old else 1,
+            segments=segments,
+            hot=hot,
+            last_id=last_id,
+            built_at=built_at or old.built_at
+        )
+
+    def search(self, image_hash: Text, max_distance: int, max_results: int = None) -> List[Tuple[int, int]]:
+        generation = self._generation
+        if not generation:
+            return []
+        results = []
+        for segment in generation.segments + (generation.hot,):
+            results += segment.search(image_hash, max_distance, max_results=max_results)
+        results.sort(key=lambda r: r[1])
+        return results[:max_results] if max_results else results
+
+    def __len__(self):
+        generation = self._generation
+        if not generation:
+            return 0
+        return sum(len(s) for s in generation.segments) + len(generation.hot)
+
+
+def build_segment(
+        index_class: Type[LinearImageIndex],
+        name: Text,
+        ids: List[int],
+        raw_hashes: List[bytes],
+        hash_length: int
+) -> LinearImageIndex:
+    index = index_class(name=name)
+    index.build_packed(ids, bytes_to_matrix(b''.join(raw_hashes), len(ids)), hash_length)
+    return index
@@ -0,0 +1,114 @@
+import threading
+from datetime import datetime
+from time import perf_counter, sleep
+from typing import Callable, Optional
+
+from redditrepostsleuth.core.config import Config
+from redditrepostsleuth.core.db.uow.unitofworkmanager import UnitOfWorkManager
+from redditrepostsleuth.core.index.local_index_searcher import LocalIndexSearcher, INDEX_HASH_LENGTH
+from redditrepostsleuth.core.index.tiered_image_index import TieredImageIndex
+from redditrepostsleuth.core.logging import log
+
+
+class TieredIndexSearcher(LocalIndexSearcher):
+    """
+    Local index searcher backed by tiered indexes.
+
+    Both indexes are loaded by start(), or the first search if start() wasn't called.  After that a maintenance
+    thread tails new rows into each index's hot segment every image_index_hot_refresh seconds, compacts hot segments,
+    and does full reloads once an index is older than its max age.  All of that happens off the search path, so
+    searches never wait on a rebuild
+    """
+    def __init__(
+            self,
+            uowm: UnitOfWorkManager,
+            config: Config,
+            page_size: int = 100000,
+            on_current_rebuild: Callable = None,
+            background: bool = True
+    ):
+        """
+        :param background: Run maintenance in a background thread.  If False it's run inline before searches
+        """
+        super().__init__(
+            uowm,
+            config,
+            page_size=page_size,
+            on_current_rebuild=on_current_rebuild,
+            background=background
+        )
+        self.hot_refresh = float(config.image_index_hot_refresh)
+        compact_size = int(config.image_index_compact_size or 50000)
+        self.historical_index = TieredImageIndex(
+            'historical',
+            self.index_class,
+            lambda last_id: self._load_hashes(self._page_historical, last_id=last_id),
+            INDEX_HASH_LENGTH,
+            compact_size=compact_size
+        )
+        self.current_index = TieredImageIndex(
+            'current',
+            self.index_class,
+            lambda last_id: self._load_hashes(self._page_current, last_id=last_id),
+            INDEX_HASH_LENGTH,
+            compact_size=compact_size
+        )
+        self._last_maintenance = 0
+        self._thread: Optional[threading.Thread] = None
+
+    def _refresh_indexes(self):
+        if not self.historical_index.generation or not self.current_index.generation:
+            with self._load_lock:
+                if not self.historical_index.generation:
+                    self.historical_index.load()
+                if not self.current_index.generation:
+                    self.current_index.load()
+            self._last_maintenance = perf_counter()
+
+        if not self.background:
+            if perf_counter() - self._last_maintenance >= self.hot_refresh:
+                self.maintain()
+            return
+
+        if not self._thread or not self._thread.is_alive():
+            # Started on load so the thread is never inherited across a Celery worker fork
+            with self._load_lock:
+                if not self._thread or not self._thread.is_alive():
+                    self._thread = threading.Thread(
+                        target=self._maintenance_loop,
+                        name='index-maintenance',
+                        daemon=True
+                    )
+                    self._thread.start()
+
+    def _maintenance_loop(self):
+        while True:
+            sleep(self.hot_refresh)
+            try:
+                self.maintain()
+            except Exception as e:
+                log.exception('Index maintenance failed: %s', str(e))
+
+    def maintain(self) -> None:
+        """
+        Run one pass of index maintenance.  on_current_rebuild is only called after a full reload of the current index.
+        Refreshes are too frequent to invalidate on and compaction doesn't change what's in the index
+        """
+        self._last_maintenance = perf_counter()
+        for index, max_age in (
+                (self.historical_index, self.config.index_historical_max_age),
+                (self.current_index, self.config.index_current_max_age)
+        ):
+            if self._is_older_than(index, max_age):
+                index.load()
+                if index is self.current_index and self.on_current_rebuild:
+                    self.on_current_rebuild()
+                continue
+            index.refresh()
+            index.compact()
+
+    @staticmethod
+    def _is_older_than(index: TieredImageIndex, max_age: Optional[int]) -> bool:
+        if not max_age:
+            return False
+        return (datetime.utcnow() - index.built_at).total_seconds() > int(max_age)
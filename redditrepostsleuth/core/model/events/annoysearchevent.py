@@ -10,16 +10,22 @@ class AnnoySearchEvent(InfluxEvent):
             search_times: ImageSearchTimes,
             source=None,
             event_type=None,
+            cache_hit: bool = None
     ):
         super().__init__(event_type=event_type)
         self.search_times = search_times
         self.source = source
+        self.cache_hit = cache_hit
         self.hostname = platform.node()
 
     def get_influx_event(self):
         event = super().get_influx_event()
         for k, v in self.search_times.to_dict().items():
             event[0]['fields'][k] = v
+        if self.cache_hit is not None:
+            # Counters so hit rate can be summed per source
+            event[0]['fields']['search_cache_hit'] = 1 if self.cache_hit else 0
+            event[0]['fields']['search_cache_miss'] = 0 if self.cache_hit else 1
         event[0]['tags']['hostname'] = self.hostname
         event[0]['tags']['source'] = self.source
         return event
\ No newline at end of file
@@ -0,0 +1,25 @@
+import platform
+from typing import Text
+
+from redditrepostsleuth.core.model.events.influxevent import InfluxEvent
+
+
+class IngestLaneEvent(InfluxEvent):
+    def __init__(self, lane: Text, depth: int, dispatched: int, max_lag: float, avg_lag: float, event_type='ingest_lane'):
+        super().__init__(event_type=event_type)
+        self.lane = lane
+        self.depth = depth
+        self.dispatched = dispatched
+        self.max_lag = max_lag
+        self.avg_lag = avg_lag
+        self.hostname = platform.node()
+
+    def get_influx_event(self):
+        event = super().get_influx_event()
+        event[0]['fields']['depth'] = self.depth
+        event[0]['fields']['dispatched'] = self.dispatched
+        event[0]['fields']['max_lag'] = self.max_lag
+        event[0]['fields']['avg_lag'] = self.avg_lag
+        event[0]['tags']['lane'] = self.lane
+        event[0]['tags']['hostname'] = self.hostname
+        return event
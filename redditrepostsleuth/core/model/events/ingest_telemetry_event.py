@@ -0,0 +1,50 @@
+import platform
+from typing import Text, Dict
+
+from redditrepostsleuth.core.model.events.influxevent import InfluxEvent
+
+
+class IngestTelemetryEvent(InfluxEvent):
+    def __init__(
+            self,
+            source: Text,
+            count: int,
+            posts_per_sec: float,
+            timings: Dict[Text, Dict[Text, float]],
+            interval: float,
+            event_type='ingest_telemetry'
+    ):
+        super().__init__(event_type=event_type)
+        self.source = source
+        self.count = count
+        self.posts_per_sec = posts_per_sec
+        self.timings = timings
+        self.interval = interval
+        self.hostname = platform.node()
+
+    def get_influx_event(self):
+        event = super().get_influx_event()
+        event[0]['fields']['count'] = self.count
+        event[0]['fields']['posts_per_sec'] = self.posts_per_sec
+        event[0]['fields']['interval'] = self.interval
+        for name, summary in self.timings.items():
+            for k, v in summary.items():
+                event[0]['fields'][f'{name}_{k}'] = v
+        event[0]['tags']['source'] = self.source
+        event[0]['tags']['hostname'] = self.hostname
+        return event
+
+
+class IngestHashFailureEvent(InfluxEvent):
+    def __init__(self, domain: Text, count: int, event_type='ingest_hash_failure'):
+        super().__init__(event_type=event_type)
+        self.domain = domain
+        self.count = count
+        self.hostname = platform.node()
+
+    def get_influx_event(self):
+        event = super().get_influx_event()
+        event[0]['fields']['count'] = self.count
+        event[0]['tags']['domain'] = self.domain
+        event[0]['tags']['hostname'] = self.hostname
+        return event
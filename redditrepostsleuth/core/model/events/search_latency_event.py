@@ -0,0 +1,36 @@
+import platform
+from typing import Text, Dict, Optional
+
+from redditrepostsleuth.core.model.events.influxevent import InfluxEvent
+
+
+class SearchLatencyEvent(InfluxEvent):
+    def __init__(
+            self,
+            source: Text,
+            stages: Dict[Text, Dict[Text, float]],
+            interval: int,
+            cache_hits: Optional[int] = None,
+            cache_misses: Optional[int] = None,
+            event_type='search_latency'
+    ):
+        super().__init__(event_type=event_type)
+        self.source = source
+        self.stages = stages
+        self.interval = interval
+        self.cache_hits = cache_hits
+        self.cache_misses = cache_misses
+        self.hostname = platform.node()
+
+    def get_influx_event(self):
+        event = super().get_influx_event()
+        for stage, summary in self.stages.items():
+            for k, v in summary.items():
+                event[0]['fields'][f'{stage}_{k}'] = v
+        event[0]['fields']['interval'] = self.interval
+        if self.cache_hits is not None:
+            event[0]['fields']['search_cache_hit'] = self.cache_hits
+            event[0]['fields']['search_cache_miss'] = self.cache_misses
+        event[0]['tags']['hostname'] = self.hostname
+        event[0]['tags']['source'] = self.source
+        return event
@@ -20,6 +20,8 @@ class SearchResults:
         self.checked_url = checked_url
         self.total_searched: int = 0
         self.matches: List[SearchMatch] = []
+        # Set when only some of the matches were loaded
+        self.total_matches: Optional[int] = None
         self.search_times: SearchTimes = search_times or SearchTimes()
 
     @property
@@ -7,7 +7,7 @@ from redditrepostsleuth.core.logging import log
 
 class SearchTimes:
     def __init__(self):
-        self._timers = []
+        self._timers = {}
         self.total_search_time: float = float(0)
         self.total_filter_time: float = float(0)
         self.set_title_similarity_time: float = float(0)
@@ -16,17 +16,15 @@ class SearchTimes:
         return json.dumps(self.to_dict())
 
     def start_timer(self, name: Text):
-        self._timers.append({
-            'name': name,
-            'start': perf_counter()
-        })
+        self._timers[name] = perf_counter()
 
     def stop_timer(self, name: Text):
-        timer = next((x for x in self._timers if x['name'] == name), None)
-        if not timer:
+        start = self._timers.pop(name, None)
+        if start is None:
             log.error('Failed to find timer %s', name)
+            return
         if hasattr(self, name):
-            setattr(self, name, round(perf_counter() - timer['start'], 5))
+            setattr(self, name, round(perf_counter() - start, 5))
 
     def to_dict(self):
         return {
@@ -1,8 +1,9 @@
 import json
-from typing import List, Text, Optional
+from copy import copy
+from time import perf_counter
+from typing import List, Text, Optional, Dict, NoReturn, Tuple
 
 import requests
-from distance import hamming
 from praw import Reddit
 from requests.exceptions import ConnectionError
 
@@ -10,6 +11,9 @@ from redditrepostsleuth.core.config import Config
 from redditrepostsleuth.core.db.databasemodels import Post, ImageSearch, MemeTemplate
 from redditrepostsleuth.core.db.uow.unitofworkmanager import UnitOfWorkManager
 from redditrepostsleuth.core.exception import NoIndexException, ImageConversioinException
+from redditrepostsleuth.core.index.index_class_maps import INDEX_MAP
+from redditrepostsleuth.core.index.local_index_searcher import LocalIndexSearcher
+from redditrepostsleuth.core.index.tiered_index_searcher import TieredIndexSearcher
 from redditrepostsleuth.core.logging import log
 from redditrepostsleuth.core.model.events.annoysearchevent import AnnoySearchEvent
 from redditrepostsleuth.core.model.image_index_api_result import ImageIndexApiResult
@@ -17,7 +21,10 @@ from redditrepostsleuth.core.model.image_search_settings import ImageSearchSetti
 from redditrepostsleuth.core.model.search.image_search_match import ImageSearchMatch
 from redditrepostsleuth.core.model.search.image_search_results import ImageSearchResults
 from redditrepostsleuth.core.services.eventlogging import EventLogging
+from redditrepostsleuth.core.services.search_latency_recorder import SearchLatencyRecorder
+from redditrepostsleuth.core.services.search_result_cache import SearchResultCache
 from redditrepostsleuth.core.util.helpers import create_search_result_json, get_default_image_search_settings
+from redditrepostsleuth.core.util.hamming import hamming_distances_from_hex, hamming_distance as get_hamming_distance
 from redditrepostsleuth.core.util.imagehashing import get_image_hashes
 from redditrepostsleuth.core.util.repost_filters import annoy_distance_filter, hamming_distance_filter, \
     filter_no_dhash
@@ -26,16 +33,47 @@ from redditrepostsleuth.core.util.repost_helpers import sort_reposts, get_closes
 
 
 class DuplicateImageService:
-    def __init__(self, uowm: UnitOfWorkManager, event_logger: EventLogging, reddit: Reddit, config: Config = None):
+    def __init__(
+            self,
+            uowm: UnitOfWorkManager,
+            event_logger: EventLogging,
+            reddit: Reddit,
+            config: Config = None,
+            search_cache: SearchResultCache = None,
+            latency_recorder: SearchLatencyRecorder = None
+    ):
         self.reddit = reddit
         self.uowm = uowm
         self.event_logger = event_logger
+        self.search_cache = search_cache
+        self.latency_recorder = latency_recorder
         if config:
             self.config = config
         else:
             self.config = Config()
+        self.local_index = None
+        if self.config.image_index_engine in INDEX_MAP:
+            log.info('Using local %s image index', self.config.image_index_engine)
+            searcher_class = TieredIndexSearcher if self.config.image_index_hot_refresh else LocalIndexSearcher
+            self.local_index = searcher_class(
+                self.uowm,
+                self.config,
+                on_current_rebuild=self._on_current_index_rebuild
+            )
         log.info('Created dup image service')
 
+    def load_index(self) -> None:
+        """
+        Start loading the local image index, if one is configured, so the first search doesn't have to.  Call once
+        per process after any fork
+        """
+        if self.local_index:
+            self.local_index.start()
+
+    def _on_current_index_rebuild(self):
+        if self.search_cache:
+            self.search_cache.advance_generation(int(self.config.index_current_max_age or self.search_cache.ttl))
+
     def _filter_results_for_reposts(
             self,
             search_results: ImageSearchResults,
@@ -74,9 +112,10 @@ class DuplicateImageService:
             search_results.closest_match = closest_match
             if search_results.closest_match and search_results.meme_template:
                 search_results.search_times.start_timer('set_closest_meme_hash_time')
-                match_hash = self._get_meme_hash(search_results.closest_match.post.url)
-                search_results.closest_match.hamming_distance = hamming(search_results.meme_hash, match_hash)
-                search_results.closest_match.hash_size = len(match_hash)
+                match_hash = self._get_meme_hashes([search_results.closest_match]).get(search_results.closest_match.post.id)
+                if match_hash and len(match_hash) == len(search_results.meme_hash):
+                    search_results.closest_match.hamming_distance = get_hamming_distance(search_results.meme_hash, match_hash)
+                    search_results.closest_match.hash_size = len(match_hash)
                 search_results.search_times.stop_timer('set_closest_meme_hash_time')
 
         # Has to be after closest match so we don't drop closest
@@ -122,20 +161,14 @@ class DuplicateImageService:
 
         search_results.search_times.start_timer('total_search_time')
 
-        if search_settings.meme_filter:
-            search_results.search_times.start_timer('meme_detection_time')
-            search_results.meme_template = self._get_meme_template(search_results.target_hash)
-            search_results.search_times.stop_timer('meme_detection_time')
-            if search_results.meme_template:
-                search_settings.target_match_percent = 100  # Keep only 100% matches on default hash size
-                search_results.search_times.start_timer('set_meme_hash_time')
-                search_results.meme_hash = self._get_meme_hash(url)
-                search_results.search_times.stop_timer('set_meme_hash_time')
-                if not search_results.meme_hash:
-                    log.error('No meme hash, disabled meme filter')
-                    search_results.meme_template = None
-                else:
-                    log.info('Using meme filter %s', search_results.meme_template.id)
+        cache_key = self._get_cache_key(search_results, sort_by)
+        if cache_key:
+            cached = self.search_cache.get(cache_key)
+            if cached:
+                log.debug('Search cache hit for %s', url)
+                return self._get_search_results_from_cache(search_results, cached, source)
+
+        self._set_meme_template(search_results)
 
         log.debug('Search Settings: %s', search_settings)
 
@@ -149,21 +182,164 @@ class DuplicateImageService:
         )
         search_results.search_times.stop_timer('image_search_api_time')
 
+        search_results = self._finish_search(search_results, api_search_results, source, sort_by, cache_key)
+        search_results = self._log_search(
+            search_results,
+            source,
+            api_search_results.used_current_index,
+            api_search_results.used_historical_index,
+        )
+
+        log.info('Seached %s items and found %s matches', search_results.total_searched, len(search_results.matches))
+        return search_results
+
+    def check_images(
+            self,
+            posts: List[Post],
+            source='unknown',
+            sort_by='created',
+            search_settings: ImageSearchSettings = None
+    ) -> List[ImageSearchResults]:
+        """
+        Batch version of check_image.  All index searches are sent in one request and the matches for every post are
+        hydrated with one query per index.  Filtering is still done per post and all searches are logged in one commit
+        :param posts: Posts to check
+        :param source: Source of the search
+        :param sort_by: Sort matches by
+        :param search_settings: Settings used for every post
+        :return: Search results in the same order as posts
+        """
+        if not search_settings:
+            log.info('No search settings provided, using default')
+            search_settings = get_default_image_search_settings(self.config)
+
+        log.info('Checking %s posts for matches', len(posts))
+        results = []
+        to_search = []
+        for post in posts:
+            # Each post gets its own copy since the meme filter changes the target match percent
+            search_results = ImageSearchResults(
+                post.url,
+                checked_post=post,
+                search_settings=copy(search_settings)
+            )
+            search_results.search_times.start_timer('total_search_time')
+            results.append(search_results)
+
+            cache_key = self._get_cache_key(search_results, sort_by)
+            if cache_key:
+                cached = self.search_cache.get(cache_key)
+                if cached:
+                    log.debug('Search cache hit for %s', post.url)
+                    self._get_search_results_from_cache(search_results, cached, source)
+                    continue
+
+            self._set_meme_template(search_results)
+            to_search.append((search_results, cache_key))
+
+        if not to_search:
+            return results
+
+        api_start = perf_counter()
+        api_search_results = self._get_matches_batch([search_results for search_results, _ in to_search])
+        api_search_time = round(perf_counter() - api_start, 5)
+
+        historical_posts = self._get_posts_from_index_ids(
+            list({m['id'] for r in api_search_results for m in r.historical_matches})
+        )
+        current_posts = self._get_posts_from_index_ids(
+            list({m['id'] for r in api_search_results for m in r.current_matches}),
+            historical_index=False
+        )
+
+        to_log = []
+        for (search_results, cache_key), api_result in zip(to_search, api_search_results):
+            search_results.search_times.image_search_api_time = api_search_time
+            search_results = self._finish_search(
+                search_results,
+                api_result,
+                source,
+                sort_by,
+                cache_key,
+                historical_posts=historical_posts,
+                current_posts=current_posts
+            )
+            to_log.append((search_results, api_result))
+
+        self._log_searches(to_log, source)
+        log.info('Searched %s of %s posts in one batch', len(to_search), len(posts))
+        return results
+
+    def _get_cache_key(self, search_results: ImageSearchResults, sort_by: Text) -> Optional[Text]:
+        if not self.search_cache:
+            return
+        return self.search_cache.build_key(
+            search_results.target_hash,
+            search_results.search_settings,
+            post_id=search_results.checked_post.post_id if search_results.checked_post else None,
+            sort_by=sort_by
+        )
+
+    def _set_meme_template(self, search_results: ImageSearchResults) -> NoReturn:
+        """
+        Find the meme template for the searched image and get the meme hash if the meme filter is on
+        :param search_results: Search results to set the template on
+        """
+        if not search_results.search_settings.meme_filter:
+            return
+        search_results.search_times.start_timer('meme_detection_time')
+        search_results.meme_template = self._get_meme_template(search_results.target_hash)
+        search_results.search_times.stop_timer('meme_detection_time')
+        if not search_results.meme_template:
+            return
+        search_results.search_settings.target_match_percent = 100  # Keep only 100% matches on default hash size
+        search_results.search_times.start_timer('set_meme_hash_time')
+        search_results.meme_hash = self._get_meme_hash(search_results.checked_url)
+        search_results.search_times.stop_timer('set_meme_hash_time')
+        if not search_results.meme_hash:
+            log.error('No meme hash, disabled meme filter')
+            search_results.meme_template = None
+        else:
+            log.info('Using meme filter %s', search_results.meme_template.id)
+
+    def _finish_search(
+            self,
+            search_results: ImageSearchResults,
+            api_search_results: ImageIndexApiResult,
+            source: Text,
+            sort_by: Text,
+            cache_key: Optional[Text],
+            historical_posts: Dict[int, Post] = None,
+            current_posts: Dict[int, Post] = None
+    ) -> ImageSearchResults:
+        """
+        Build, dedupe and filter the matches from an index search then cache the result
+        :param search_results: Search results being built
+        :param api_search_results: Result from the index
+        :param source: Source of the search
+        :param sort_by: Sort matches by
+        :param cache_key: Search cache key, if caching
+        :param historical_posts: Already hydrated posts for the historical matches
+        :param current_posts: Already hydrated posts for the current matches
+        :rtype: ImageSearchResults
+        """
         search_results.search_times.index_search_time = api_search_results.index_search_time
         search_results.total_searched = api_search_results.total_searched
 
         search_results.search_times.start_timer('set_match_post_time')
-        search_results.matches = self._build_search_results(api_search_results.historical_matches, url,
-                                                            search_results.target_hash)
-        search_results.matches += self._build_search_results(api_search_results.current_matches, url,
-                                                             search_results.target_hash, historical_index=False)
+        search_results.matches = self._build_search_results(api_search_results.historical_matches,
+                                                            search_results.checked_url, search_results.target_hash,
+                                                            posts=historical_posts)
+        search_results.matches += self._build_search_results(api_search_results.current_matches,
+                                                             search_results.checked_url, search_results.target_hash,
+                                                             historical_index=False, posts=current_posts)
         search_results.search_times.stop_timer('set_match_post_time')
 
         search_results.search_times.start_timer('remove_duplicate_time')
         search_results.matches = self._remove_duplicates(search_results.matches)
         search_results.search_times.stop_timer('remove_duplicate_time')
 
-        if post and search_results.search_settings.check_title:
+        if search_results.checked_post and search_results.search_settings.check_title:
             search_results.search_times.start_timer('set_title_similarity_time')
             search_results.matches = set_all_title_similarity(search_results.checked_post.title, search_results.matches)
             search_results.search_times.stop_timer('set_title_similarity_time')
@@ -173,18 +349,83 @@ class DuplicateImageService:
             sort_by=sort_by
         )
         search_results.search_times.stop_timer('total_search_time')
-        self._log_search_time(search_results, source)
+        self._log_search_time(search_results, source, cache_hit=False if self.search_cache else None)
+
+        if cache_key:
+            self.search_cache.set(cache_key, {
+                'matches': search_results.matches,
+                'closest_match': search_results.closest_match,
+                'meme_template': search_results.meme_template,
+                'meme_hash': search_results.meme_hash,
+                'total_searched': search_results.total_searched,
+                'target_match_percent': search_results.search_settings.target_match_percent,
+                'used_current_index': api_search_results.used_current_index,
+                'used_historical_index': api_search_results.used_historical_index
+            })
+        return search_results
 
+    def _get_search_results_from_cache(
+            self,
+            search_results: ImageSearchResults,
+            cached: dict,
+            source: Text
+    ) -> ImageSearchResults:
+        """
+        Fill in search results from a cached search and log it like a normal search
+        :param search_results: Fresh search results for this search
+        :param cached: Cached search data
+        :param source: Source of the search
+        :rtype: ImageSearchResults
+        """
+        search_results.matches = cached['matches']
+        search_results.closest_match = cached['closest_match']
+        search_results.meme_template = cached['meme_template']
+        search_results.meme_hash = cached['meme_hash']
+        search_results.total_searched = cached['total_searched']
+        search_results.search_settings.target_match_percent = cached['target_match_percent']
+        search_results.search_times.stop_timer('total_search_time')
+        self._log_search_time(search_results, source, cache_hit=True)
         search_results = self._log_search(
             search_results,
             source,
-            api_search_results.used_current_index,
-            api_search_results.used_historical_index,
+            cached['used_current_index'],
+            cached['used_historical_index'],
         )
-
-        log.info('Seached %s items and found %s matches', search_results.total_searched, len(search_results.matches))
+        log.info('Found %s matches in search cache', len(search_results.matches))
         return search_results
 
+    def _get_meme_hashes(self, matches: List[ImageSearchMatch]) -> Dict[int, Text]:
+        """
+        Get the meme filter hash for each match.  Uses the hash stored on the post when there is one at the current
+        meme hash size.  Otherwise the image is downloaded and hashed and the new hash is saved back to the post
+        :param matches: Matches to get hashes for
+        :return: Dict of Post.id to meme hash.  Matches we failed to hash are left out
+        """
+        hash_length = self.config.default_meme_filter_hash_size ** 2 // 4
+        results = {}
+        backfill = {}
+        for match in matches:
+            if match.post.dhash_meme and len(match.post.dhash_meme) == hash_length:
+                results[match.post.id] = match.post.dhash_meme
+                continue
+            match_hash = self._get_meme_hash(match.post.url)
+            if not match_hash:
+                continue
+            results[match.post.id] = match_hash
+            match.post.dhash_meme = match_hash
+            backfill[match.post.id] = match_hash
+
+        if backfill:
+            log.debug('Saving %s backfilled meme hashes', len(backfill))
+            try:
+                with self.uowm.start() as uow:
+                    uow.posts.update_meme_hashes(backfill)
+                    uow.commit()
+            except Exception as e:
+                log.exception('Failed to save meme hashes', exc_info=True)
+
+        return results
+
     def _get_meme_hash(self, url: Text) -> Optional[Text]:
         """
         Take a given URL and return the hash that will be used for the meme filter
@@ -219,6 +460,9 @@ class DuplicateImageService:
         :param max_depth: Max depth to search index
         :rtype: ImageIndexApiResult
         """
+        if self.local_index:
+            return self.local_index.search(hash, target_hamming_distance, max_matches=max_matches)
+
         try:
 
             params = {
@@ -247,27 +491,103 @@ class DuplicateImageService:
         except TypeError as e:
             raise NoIndexException(f'Failed to convert API result: {str(e)}')
 
+    def _get_matches_batch(self, searches: List[ImageSearchResults]) -> List[ImageIndexApiResult]:
+        """
+        Search the index for many hashes at once.  The index API gets every search in a single request
+        :param searches: Search results holding the hash and settings for each search
+        :return: Index results in the same order as searches
+        """
+        if self.local_index:
+            return [
+                self.local_index.search(
+                    s.target_hash,
+                    s.target_hamming_distance,
+                    max_matches=s.search_settings.max_matches
+                ) for s in searches
+            ]
+
+        payload = {
+            'searches': [
+                {
+                    'hash': s.target_hash,
+                    'max_results': s.search_settings.max_matches,
+                    'max_depth': s.search_settings.max_depth,
+                    'a_filter': s.search_settings.target_annoy_distance,
+                    'h_filter': s.target_hamming_distance
+                } for s in searches
+            ]
+        }
+        try:
+            r = requests.post(f'{self.config.index_api}/image/batch', json=payload)
+        except ConnectionError:
+            log.error('Failed to connect to Index API')
+            raise NoIndexException('Failed to connect to Index API')
+        except Exception as e:
+            log.exception('Problem with image index api', exc_info=True)
+            raise
+
+        if r.status_code == 404:
+            log.warning('Index API does not support batch search, searching one at a time')
+            return [
+                self._get_matches(
+                    s.target_hash,
+                    s.target_hamming_distance,
+                    s.search_settings.target_annoy_distance,
+                    max_matches=s.search_settings.max_matches,
+                    max_depth=s.search_settings.max_depth
+                ) for s in searches
+            ]
+
+        if r.status_code != 200:
+            log.error('Unexpected status from index API: %s', r.status_code)
+            raise NoIndexException(f'Unexpected status: {r.status_code}')
+
+        res_data = json.loads(r.text)
+        if len(res_data) != len(searches):
+            raise NoIndexException(f'Expected {len(searches)} batch results, got {len(res_data)}')
+
+        try:
+            return [ImageIndexApiResult(**result) for result in res_data]
+        except TypeError as e:
+            raise NoIndexException(f'Failed to convert API result: {str(e)}')
+
     def _build_search_results(
             self,
             index_matches: List[dict],
             url: Text,
             searched_hash: Text,
-            historical_index: bool = True
+            historical_index: bool = True,
+            posts: Dict[int, Post] = None
     ) -> List[ImageSearchMatch]:
         """
         Take a list of index matches and convert them to ImageSearchMatches
         :param index_matches: Dict of raw matches from index search
         :param url: URL of the image we searched
         :param historical_index: If results are from the historical index
+        :param posts: Index ID to Post for the matches.  Looked up if not provided
         :return:
         """
         results = []
         log.debug('Building search results from %s index matches', len(index_matches))
+        if posts is None:
+            posts = self._get_posts_from_index_ids([m['id'] for m in index_matches], historical_index=historical_index)
+        to_score = []
         for m in index_matches:
-            image_match = self._get_image_search_match_from_index_result(m, url, searched_hash,
-                                                                         historical_index=historical_index)
-            if image_match:
-                results.append(image_match)
+            post = posts.get(m['id'], None)
+            if not post:
+                log.error('Failed to lookup original match post. ID %s - Historical: %s', m['id'], historical_index)
+                continue
+            if not post.dhash_h:
+                log.error('Post %s missing dhash', post.post_id)
+                continue
+            if len(post.dhash_h) != len(searched_hash):
+                log.error('Post %s dhash length %s does not match searched hash', post.post_id, len(post.dhash_h))
+                continue
+            to_score.append((m, post))
+
+        distances = hamming_distances_from_hex(searched_hash, [post.dhash_h for _, post in to_score])
+        for (m, post), h_distance in zip(to_score, distances):
+            results.append(self._build_image_search_match(m, url, searched_hash, post, hamming_distance=h_distance))
         log.debug('%s results built', len(results))
         return results
 
@@ -284,25 +604,51 @@ class DuplicateImageService:
         if not post:
             return
 
+        return self._build_image_search_match(result, url, searched_hash, post)
+
+    def _build_image_search_match(
+            self,
+            result: dict,
+            url: Text,
+            searched_hash: Text,
+            post: Post,
+            hamming_distance: int = None
+    ) -> Optional[ImageSearchMatch]:
+        """
+        Take a raw index result and its hydrated Post and create the ImageSearchMatch
+        :param result: Raw match from index search
+        :param url: URL of the image we searched
+        :param searched_hash: Hash of the image we searched
+        :param post: Post the index result points to
+        :param hamming_distance: Precomputed distance between the searched hash and the post's dhash
+        :rtype: Optional[ImageSearchMatch]
+        """
         if not post.dhash_h:
             log.error('Post %s missing dhash', post.post_id)
             return
 
+        if hamming_distance is None:
+            hamming_distance = get_hamming_distance(searched_hash, post.dhash_h)
+
         return ImageSearchMatch(
             url,
             result['id'],
             post,
-            hamming(searched_hash, post.dhash_h),
+            hamming_distance,
             result['distance'],
             len(post.dhash_h)
         )
 
-    def _log_search_time(self, search_results: ImageSearchResults, source: Text):
+    def _log_search_time(self, search_results: ImageSearchResults, source: Text, cache_hit: bool = None):
+        if self.latency_recorder:
+            self.latency_recorder.record(source, search_results.search_times.to_dict(), cache_hit=cache_hit)
+            return
         self.event_logger.save_event(
             AnnoySearchEvent(
                 search_results.search_times,
                 event_type='duplicate_image_search',
-                source=source
+                source=source,
+                cache_hit=cache_hit
             )
         )
 
@@ -313,7 +659,56 @@ class DuplicateImageService:
             used_current_index: bool,
             used_historical_index: bool,
     ) -> ImageSearchResults:
-        image_search = ImageSearch(
+        image_search = self._build_image_search(search_results, source, used_current_index, used_historical_index)
+
+        with self.uowm.start() as uow:
+            uow.image_search.add(image_search)
+            try:
+                uow.commit()
+                search_results.logged_search = image_search
+            except Exception as e:
+                log.exception('Failed to save image search', exc_info=False)
+
+        return search_results
+
+    def _log_searches(
+            self,
+            searches: List[Tuple[ImageSearchResults, ImageIndexApiResult]],
+            source: str
+    ) -> NoReturn:
+        """
+        Batch version of _log_search.  All searches are saved in one commit
+        :param searches: Pairs of search results and the index result they were built from
+        :param source: Source of the searches
+        """
+        image_searches = []
+        with self.uowm.start() as uow:
+            for search_results, api_search_results in searches:
+                image_search = self._build_image_search(
+                    search_results,
+                    source,
+                    api_search_results.used_current_index,
+                    api_search_results.used_historical_index
+                )
+                uow.image_search.add(image_search)
+                image_searches.append((search_results, image_search))
+            try:
+                uow.commit()
+            except Exception as e:
+                log.exception('Failed to save image searches', exc_info=False)
+                return
+
+        for search_results, image_search in image_searches:
+            search_results.logged_search = image_search
+
+    def _build_image_search(
+            self,
+            search_results: ImageSearchResults,
+            source: str,
+            used_current_index: bool,
+            used_historical_index: bool,
+    ) -> ImageSearch:
+        return ImageSearch(
             post_id=search_results.checked_post.post_id if search_results.checked_post else 'url',
             used_historical_index=used_historical_index,
             used_current_index=used_current_index,
@@ -337,16 +732,6 @@ class DuplicateImageService:
             target_image_match=search_results.search_settings.target_match_percent
         )
 
-        with self.uowm.start() as uow:
-            uow.image_search.add(image_search)
-            try:
-                uow.commit()
-                search_results.logged_search = image_search
-            except Exception as e:
-                log.exception('Failed to save image search', exc_info=False)
-
-        return search_results
-
     def _remove_duplicates(self, matches: List[ImageSearchMatch]) -> List[ImageSearchMatch]:
         log.debug('Remove duplicates from %s matches', len(matches))
         results = []
@@ -376,6 +761,23 @@ class DuplicateImageService:
                 return
             return post
 
+    def _get_posts_from_index_ids(self, index_ids: List[int], historical_index: bool = True) -> Dict[int, Post]:
+        """
+        Resolve a batch of index IDs to their Posts using one query per search instead of one per match
+        :param index_ids: IDs returned from the index
+        :param historical_index: If the IDs are from the historical index
+        :return: Dict of index ID to Post
+        """
+        if not index_ids:
+            return {}
+        with self.uowm.start() as uow:
+            # Hit the correct table if historical or current
+            if historical_index:
+                rows = uow.image_post.get_posts_by_ids(index_ids)
+            else:
+                rows = uow.image_post_current.get_posts_by_ids(index_ids)
+        return {index_id: post for index_id, post in rows}
+
     # TODO - 1/17/2021 - Can be removed
     def _set_match_post(self, match: ImageSearchMatch, historical: bool = True) -> Optional[ImageSearchMatch]:
         """
@@ -403,6 +805,13 @@ class DuplicateImageService:
             return match
 
     def _get_meme_template(self, image_hash: Text) -> Optional[MemeTemplate]:
+        if self.local_index:
+            meme_template_id = self.local_index.get_meme_template_id(image_hash)
+            if not meme_template_id:
+                return
+            with self.uowm.start() as uow:
+                return uow.meme_template.get_by_id(meme_template_id)
+
         try:
             r = requests.get(f'{self.config.index_api}/meme', params={'hash': image_hash})
         except Exception as e:
@@ -432,12 +841,20 @@ class DuplicateImageService:
         if len(matches) == 0:
             return matches
 
+        meme_hashes = self._get_meme_hashes(matches)
+        to_score = []
         for match in matches:
-            match_hash = self._get_meme_hash(match.post.url)
+            match_hash = meme_hashes.get(match.post.id)
             if not match_hash:
                 continue
-            h_distance = hamming(searched_hash, match_hash)
+            if len(match_hash) != len(searched_hash):
+                log.error('Meme hash length %s does not match searched hash - %s', len(match_hash),
+                          f'https://redd.it/{match.post.post_id}')
+                continue
+            to_score.append((match, match_hash))
 
+        distances = hamming_distances_from_hex(searched_hash, [match_hash for _, match_hash in to_score])
+        for (match, _), h_distance in zip(to_score, distances):
             if h_distance > target_hamming:
                 log.info('Meme Hamming Filter Reject - Target: %s Actual: %s - %s', target_hamming,
                          h_distance, f'https://redd.it/{match.post.post_id}')
@@ -0,0 +1,165 @@
+from collections import Counter
+from hashlib import md5
+from typing import List, Text, Set, Tuple, Optional, Iterable
+
+from redis import Redis
+from redis.exceptions import RedisError
+
+from redditrepostsleuth.core.config import Config
+from redditrepostsleuth.core.logging import log
+from redditrepostsleuth.core.util.helpers import get_redis_client
+
+SKETCH_KEY = 'hot_url:sketch'
+TOP_KEY = 'hot_url:top'
+# ZADD that never lowers a score.  ARGV is score, member pairs.  Done in Lua instead of ZADD GT so it works on
+# Redis servers older than 6.2 and the redis-py version pulled in by celery
+ZADD_MAX_SCRIPT = """
+for i = 1, #ARGV, 2 do
+    local current = redis.call('ZSCORE', KEYS[1], ARGV[i + 1])
+    if not current or tonumber(current) < tonumber(ARGV[i]) then
+        redis.call('ZADD', KEYS[1], ARGV[i], ARGV[i + 1])
+    end
+end
+"""
+
+
+class HotUrlCounter:
+    """
+    Count how many times each link URL hash has been shared, shared by every worker through Redis.
+
+    Counts are kept in a count-min sketch stored as saturating u32 counters in a single BITFIELD string, so memory is
+    fixed no matter how many URLs we see.  The sketch can only overestimate.  The most shared URL hashes are also kept
+    in a sorted set capped at top_k so checking if a URL is hot is a single ZSCORE.  Scores in the top set only ever
+    go up
+    """
+    def __init__(
+            self,
+            redis_client: Redis,
+            width: int = 2 ** 20,
+            depth: int = 4,
+            top_k: int = 1000,
+            hot_threshold: int = 10000
+    ):
+        """
+        :param redis_client: Redis client
+        :param width: Counters per row.  Overestimates are around total shares * 2.7 / width
+        :param depth: Number of rows.  More rows make a large overestimate less likely
+        :param top_k: Max URL hashes to keep in the top set
+        :param hot_threshold: Shares before a URL is considered hot
+        """
+        self.redis_client = redis_client
+        self.width = width
+        self.depth = depth
+        self.top_k = top_k
+        self.hot_threshold = hot_threshold
+
+    def add(self, url_hashes: List[Text]) -> None:
+        """
+        Count a batch of shared URLs
+        :param url_hashes: URL hashes of the shared links.  Repeats are counted
+        """
+        counts = Counter(h for h in url_hashes if h)
+        if not counts:
+            return
+        try:
+            pipe = self.redis_client.pipeline(transaction=False)
+            for url_hash, count in counts.items():
+                args = ['BITFIELD', SKETCH_KEY, 'OVERFLOW', 'SAT']
+                for position in self._positions(url_hash):
+                    args += ['INCRBY', 'u32', f'#{position}', count]
+                pipe.execute_command(*args)
+            estimates = [min(r) for r in pipe.execute()]
+
+            pipe = self.redis_client.pipeline(transaction=True)
+            # Never lower a score, such as a count set by mark_hot that's higher than our estimate
+            pipe.eval(ZADD_MAX_SCRIPT, 1, TOP_KEY, *self._score_args(zip(counts.keys(), estimates)))
+            pipe.zremrangebyrank(TOP_KEY, 0, -(self.top_k + 1))
+            pipe.execute()
+        except RedisError as e:
+            log.error('Failed to update hot URL counts: %s', str(e))
+
+    def estimate(self, url_hash: Text) -> int:
+        """
+        Get the estimated share count of a URL.  Never less than the real count
+        """
+        args = ['BITFIELD', SKETCH_KEY]
+        for position in self._positions(url_hash):
+            args += ['GET', 'u32', f'#{position}']
+        try:
+            return min(self.redis_client.execute_command(*args))
+        except RedisError as e:
+            log.error('Failed to get hot URL count: %s', str(e))
+            return 0
+
+    def get_hot(self, url_hashes: List[Text]) -> Set[Text]:
+        """
+        Get the URL hashes that have been shared at least hot_threshold times
+        :param url_hashes: URL hashes to check
+        :return: Set of hot URL hashes
+        """
+        url_hashes = [h for h in url_hashes if h]
+        if not url_hashes:
+            return set()
+        try:
+            pipe = self.redis_client.pipeline(transaction=False)
+            for url_hash in url_hashes:
+                pipe.zscore(TOP_KEY, url_hash)
+            scores = pipe.execute()
+        except RedisError as e:
+            log.error('Failed to check hot URLs: %s', str(e))
+            return set()
+        return {h for h, score in zip(url_hashes, scores) if score is not None and score >= self.hot_threshold}
+
+    def is_hot(self, url_hash: Text) -> bool:
+        return url_hash in self.get_hot([url_hash])
+
+    def mark_hot(self, url_hash: Text, count: int) -> None:
+        """
+        Record a known share count, such as one found in the database for a URL shared before we started counting
+        :param url_hash: URL hash
+        :param count: Number of shares
+        """
+        try:
+            self.redis_client.eval(ZADD_MAX_SCRIPT, 1, TOP_KEY, *self._score_args([(url_hash, count)]))
+        except RedisError as e:
+            log.error('Failed to mark hot URL %s: %s', url_hash, str(e))
+
+    def top(self, count: int = 25) -> List[Tuple[Text, int]]:
+        """
+        Get the most shared URL hashes
+        :param count: Number to return
+        :return: List of (url hash, estimated shares), most shared first
+        """
+        try:
+            results = self.redis_client.zrevrange(TOP_KEY, 0, count - 1, withscores=True)
+        except RedisError as e:
+            log.error('Failed to get top URLs: %s', str(e))
+            return []
+        return [(url_hash.decode() if isinstance(url_hash, bytes) else url_hash, int(score)) for url_hash, score in results]
+
+    @staticmethod
+    def _score_args(scores: Iterable[Tuple[Text, int]]) -> List:
+        args = []
+        for url_hash, score in scores:
+            args += [score, url_hash]
+        return args
+
+    def _positions(self, url_hash: Text) -> List[int]:
+        """
+        Counter index of a URL hash in each row using double hashing
+        """
+        digest = md5(url_hash.encode('utf-8')).digest()
+        h1 = int.from_bytes(digest[:8], 'big')
+        h2 = int.from_bytes(digest[8:], 'big') | 1
+        return [row * self.width + (h1 + row * h2) % self.width for row in range(self.depth)]
+
+
+def get_hot_url_counter(config: Config) -> Optional[HotUrlCounter]:
+    """
+    Create the hot URL counter if hot_url_counter is enabled
+    :param config: Config
+    :return: HotUrlCounter or None
+    """
+    if not config.hot_url_counter:
+        return
+    return HotUrlCounter(get_redis_client(config), hot_threshold=int(config.hot_url_threshold or 10000))
@@ -0,0 +1,338 @@
+import fcntl
+import json
+import os
+import tempfile
+from hashlib import sha256, md5
+from time import time
+from typing import Text, Optional, Dict, NamedTuple, List, Tuple
+
+from redditrepostsleuth.core.config import Config
+from redditrepostsleuth.core.logging import log
+
+
+class CachedImage(NamedTuple):
+    data: bytes
+    etag: Optional[Text]
+    last_modified: Optional[Text]
+    fresh: bool
+
+
+class ImageDownloadCache:
+    """
+    Disk backed cache of downloaded images shared by every worker process on a host.
+
+    Image bytes are stored once per content digest under blobs/ and each URL gets a small metadata file under urls/
+    pointing at its blob along with the ETag and Last-Modified headers we got.  Hashes derived from an image are stored
+    next to its blob so any URL serving the same bytes can reuse them.
+
+    All writes go to a temp file and are moved into place so readers in other processes never see a partial file.
+    Blob mtimes are bumped on read.  A running total of blob bytes is kept in a shared file and once it grows past
+    max_size the least recently used blobs, and the URL metadata pointing at them, are evicted
+    """
+    def __init__(
+            self,
+            cache_dir: Text,
+            max_size_mb: int = 1024,
+            revalidate_after: int = 3600,
+            evict_to: float = .9
+    ):
+        """
+        :param cache_dir: Directory to store the cache in
+        :param max_size_mb: Max size of cached image bytes
+        :param revalidate_after: Seconds to trust a cached image before checking with the host again
+        :param evict_to: Fraction of max_size to evict down to so we don't evict again on the next write
+        """
+        self.cache_dir = cache_dir
+        self.max_size = max_size_mb * 1024 * 1024
+        self.revalidate_after = revalidate_after
+        self.evict_to = evict_to
+        os.makedirs(os.path.join(cache_dir, 'blobs'), exist_ok=True)
+        os.makedirs(os.path.join(cache_dir, 'urls'), exist_ok=True)
+        if not os.path.isfile(self._size_path):
+            # First run against this directory, or one from before we tracked size
+            self._update_size(set_to=sum(size for _, size, _ in self._list_blobs()))
+
+    def get(self, url: Text) -> Optional[CachedImage]:
+        """
+        Get a cached image
+        :param url: Image URL
+        :return: CachedImage or None if we don't have it.  fresh is False once the entry needs revalidating
+        """
+        meta = self._read_meta(url)
+        if not meta:
+            return
+        blob_path = self._blob_path(meta['digest'])
+        try:
+            with open(blob_path, 'rb') as f:
+                data = f.read()
+            os.utime(blob_path)
+        except OSError:
+            # Evicted by another process
+            return
+        return CachedImage(
+            data=data,
+            etag=meta.get('etag'),
+            last_modified=meta.get('last_modified'),
+            fresh=time() - meta['validated_at'] < self.revalidate_after
+        )
+
+    def set(self, url: Text, data: bytes, etag: Text = None, last_modified: Text = None) -> Text:
+        """
+        Cache an image we downloaded
+        :param url: Image URL
+        :param data: Image bytes
+        :param etag: ETag header from the response
+        :param last_modified: Last-Modified header from the response
+        :return: Content digest of the image
+        """
+        digest = sha256(data).hexdigest()
+        blob_path = self._blob_path(digest)
+        total = None
+        try:
+            if os.path.isfile(blob_path):
+                os.utime(blob_path)
+            else:
+                os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+                self._atomic_write(blob_path, data)
+                total = self._update_size(add=len(data))
+            self._write_meta(url, {
+                'url': url,
+                'digest': digest,
+                'etag': etag,
+                'last_modified': last_modified,
+                'validated_at': time()
+            })
+        except OSError as e:
+            log.error('Failed to cache image %s: %s', url, str(e))
+            return digest
+
+        if total and total > self.max_size:
+            self.evict()
+        return digest
+
+    def mark_validated(self, url: Text) -> None:
+        """
+        Reset the revalidation timer after the host told us our copy is still current
+        :param url: Image URL
+        """
+        meta = self._read_meta(url)
+        if not meta:
+            return
+        meta['validated_at'] = time()
+        try:
+            self._write_meta(url, meta)
+        except OSError as e:
+            log.error('Failed to update cached image %s: %s', url, str(e))
+
+    def is_fresh(self, url: Text) -> bool:
+        """
+        Check if we have a copy of this URL that doesn't need revalidating yet
+        :param url: Image URL
+        """
+        meta = self._read_meta(url)
+        if not meta or not os.path.isfile(self._blob_path(meta['digest'])):
+            return False
+        return time() - meta['validated_at'] < self.revalidate_after
+
+    def get_hashes(self, url: Text, name: Text) -> Optional[Dict]:
+        """
+        Get hashes previously derived from the image at this URL
+        :param url: Image URL
+        :param name: Name the hashes were stored under, should include anything that changes the result like hash size
+        :return: Dict of hashes or None if we don't have a fresh copy or haven't hashed it
+        """
+        meta = self._read_meta(url)
+        if not meta or time() - meta['validated_at'] >= self.revalidate_after:
+            return
+        derived = self._read_json(self._blob_path(meta['digest']) + '.json')
+        if not derived:
+            return
+        return derived.get(name)
+
+    def set_hashes(self, url: Text, name: Text, hashes: Dict) -> None:
+        """
+        Store hashes derived from the cached image at this URL
+        :param url: Image URL
+        :param name: Name to store the hashes under
+        :param hashes: Dict of hashes
+        """
+        meta = self._read_meta(url)
+        if not meta:
+            return
+        path = self._blob_path(meta['digest']) + '.json'
+        derived = self._read_json(path) or {}
+        derived[name] = hashes
+        try:
+            self._atomic_write(path, json.dumps(derived).encode('utf-8'))
+        except OSError as e:
+            log.error('Failed to cache hashes for %s: %s', url, str(e))
+
+    def evict(self) -> None:
+        """
+        Remove least recently used images if we're over max size, along with the URL metadata pointing at them.
+        Only one process evicts at a time
+        """
+        lock_path = os.path.join(self.cache_dir, '.evict.lock')
+        with open(lock_path, 'w') as lock:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return
+            try:
+                self._evict()
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _evict(self) -> None:
+        blobs = self._list_blobs()
+        total = sum(size for _, size, _ in blobs)
+        if total <= self.max_size:
+            self._update_size(set_to=total)
+            return
+
+        kept = set()
+        removed = 0
+        for _, size, path in sorted(blobs):
+            if total <= self.max_size * self.evict_to:
+                kept.add(os.path.basename(path))
+                continue
+            for p in (path, path + '.json'):
+                try:
+                    os.remove(p)
+                except OSError:
+                    pass
+            total -= size
+            removed += 1
+        self._update_size(set_to=total)
+
+        removed_meta = 0
+        urls_dir = os.path.join(self.cache_dir, 'urls')
+        for file in os.listdir(urls_dir):
+            if not file.endswith('.json'):
+                continue
+            path = os.path.join(urls_dir, file)
+            meta = self._read_json(path)
+            if meta and meta.get('digest') in kept:
+                continue
+            try:
+                os.remove(path)
+                removed_meta += 1
+            except OSError:
+                pass
+        log.info('Evicted %s images and %s URLs from download cache', removed, removed_meta)
+
+    def _list_blobs(self) -> List[Tuple[float, int, Text]]:
+        """
+        :return: (mtime, size, path) of every cached blob
+        """
+        blobs = []
+        for root, _, files in os.walk(os.path.join(self.cache_dir, 'blobs')):
+            for file in files:
+                if file.endswith('.json') or file.startswith('.'):
+                    continue
+                path = os.path.join(root, file)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                blobs.append((stat.st_mtime, stat.st_size, path))
+        return blobs
+
+    @property
+    def _size_path(self) -> Text:
+        return os.path.join(self.cache_dir, '.size')
+
+    def _update_size(self, add: int = 0, set_to: int = None) -> int:
+        """
+        Update the running total of blob bytes shared by every process
+        :param add: Bytes to add
+        :param set_to: Replace the total, used after walking the blobs
+        :return: New total
+        """
+        with open(self._size_path, 'a+') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                if set_to is None:
+                    try:
+                        total = int(f.read() or 0) + add
+                    except ValueError:
+                        total = add
+                else:
+                    total = set_to
+                f.seek(0)
+                f.truncate()
+                f.write(str(total))
+                return total
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _blob_path(self, digest: Text) -> Text:
+        return os.path.join(self.cache_dir, 'blobs', digest[:2], digest)
+
+    def _meta_path(self, url: Text) -> Text:
+        return os.path.join(self.cache_dir, 'urls', md5(url.encode('utf-8')).hexdigest() + '.json')
+
+    def _read_meta(self, url: Text) -> Optional[Dict]:
+        meta = self._read_json(self._meta_path(url))
+        if not meta or meta.get('url') != url:
+            return
+        return meta
+
+    def _write_meta(self, url: Text, meta: Dict) -> None:
+        self._atomic_write(self._meta_path(url), json.dumps(meta).encode('utf-8'))
+
+    @staticmethod
+    def _read_json(path: Text) -> Optional[Dict]:
+        try:
+            with open(path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return
+
+    @staticmethod
+    def _atomic_write(path: Text, data: bytes) -> None:
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+
+_image_download_cache: Optional[ImageDownloadCache] = None
+
+
+def configure_image_download_cache(config: Config) -> Optional[ImageDownloadCache]:
+    """
+    Set up the image download cache for this process if one is configured
+    :param config: Config
+    :return: ImageDownloadCache or None if image_cache_dir is not set
+    """
+    global _image_download_cache
+    if not config.image_cache_dir:
+        return
+    if not _image_download_cache:
+        try:
+            _image_download_cache = ImageDownloadCache(
+                config.image_cache_dir,
+                max_size_mb=int(config.image_cache_max_size_mb or 1024),
+                revalidate_after=int(config.image_cache_revalidate_after or 3600)
+            )
+        except OSError as e:
+            log.error('Failed to create image download cache at %s: %s', config.image_cache_dir, str(e))
+            return
+    return _image_download_cache
+
+
+def get_image_download_cache() -> Optional[ImageDownloadCache]:
+    """
+    Get the image download cache for this process
+    :return: ImageDownloadCache or None if it hasn't been configured
+    """
+    return _image_download_cache
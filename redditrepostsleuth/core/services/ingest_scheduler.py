@@ -0,0 +1,195 @@
+import pickle
+from time import time, sleep
+from typing import Text, List, NamedTuple, Callable, Dict, Optional
+
+from redis import Redis
+from redis.exceptions import RedisError
+
+from redditrepostsleuth.core.config import Config
+from redditrepostsleuth.core.db.databasemodels import Post
+from redditrepostsleuth.core.logging import log
+from redditrepostsleuth.core.model.events.ingest_lane_event import IngestLaneEvent
+from redditrepostsleuth.core.services.eventlogging import EventLogging
+from redditrepostsleuth.core.util.helpers import get_redis_client
+
+LANE_KEY_PREFIX = 'ingest_lane'
+PRIORITY_LANE = 'priority'
+FIREHOSE_LANE = 'firehose'
+
+
+class IngestLane(NamedTuple):
+    name: Text
+    weight: int
+    queue: Text
+    # Throttled lanes stop dispatching while the ingest queues are backed up
+    throttled: bool
+
+
+DEFAULT_LANES = [
+    IngestLane(PRIORITY_LANE, 4, 'postingest_priority', False),
+    IngestLane(FIREHOSE_LANE, 1, 'postingest', True),
+]
+
+
+class IngestScheduler:
+    """
+    Hold posts waiting for ingest in one Redis list per lane and feed them to the Celery ingest queues.
+
+    Lanes are drained with deficit round robin.  Every round each lane is credited weight * quantum posts and sends as
+    many as it has credit for, so a deep firehose lane can't starve the priority lane and a busy priority lane can't
+    completely starve the firehose.  Throttled lanes sit out rounds while the ingest queues are backed up, which keeps
+    the Celery queues short so a priority post never waits behind a large backlog.
+
+    Per lane depth and the time posts spent waiting are sent to Influx every metrics_interval seconds
+    """
+    def __init__(
+            self,
+            redis_client: Redis,
+            lanes: List[IngestLane] = None,
+            quantum: int = 100,
+            event_logger: EventLogging = None,
+            metrics_interval: int = 30
+    ):
+        """
+        :param redis_client: Redis client
+        :param lanes: Lanes in the order they're served each round
+        :param quantum: Posts credited per unit of weight each round.  Also the max batch size sent to ingest
+        :param event_logger: Event logger for lane metrics
+        :param metrics_interval: Seconds between lane metric flushes
+        """
+        self.redis_client = redis_client
+        self.lanes = lanes or DEFAULT_LANES
+        self.quantum = quantum
+        self.event_logger = event_logger
+        self.metrics_interval = metrics_interval
+        self._deficits: Dict[Text, int] = {lane.name: 0 for lane in self.lanes}
+        self._lags: Dict[Text, List[float]] = {lane.name: [] for lane in self.lanes}
+        self._last_flush = time()
+
+    def submit(self, posts: List[Post], lane: Text) -> None:
+        """
+        Add posts to a lane
+        :param posts: Posts to ingest
+        :param lane: Lane name
+        """
+        if not posts:
+            return
+        self._get_lane(lane)
+        now = time()
+        self.redis_client.rpush(self._key(lane), *[pickle.dumps((now, post)) for post in posts])
+        log.debug('Submitted %s posts to %s ingest lane', len(posts), lane)
+
+    def depth(self, lane: Text) -> int:
+        return self.redis_client.llen(self._key(lane))
+
+    def dispatch(self, send_batch: Callable[[IngestLane, List[Post]], None], throttle: bool = False) -> int:
+        """
+        Run one round of deficit round robin
+        :param send_batch: Function sending a batch of posts from a lane to ingest
+        :param throttle: Skip throttled lanes this round
+        :return: Number of posts dispatched
+        """
+        dispatched = 0
+        for lane in self.lanes:
+            if throttle and lane.throttled:
+                continue
+            self._deficits[lane.name] += lane.weight * self.quantum
+            items = self._pop(lane.name, self._deficits[lane.name])
+            if len(items) < self._deficits[lane.name]:
+                # Lane is empty.  Credit doesn't carry over or an idle lane would burst later
+                self._deficits[lane.name] = 0
+            else:
+                self._deficits[lane.name] -= len(items)
+            if not items:
+                continue
+            now = time()
+            posts = []
+            for submitted_at, post in items:
+                self._lags[lane.name].append(now - submitted_at)
+                posts.append(post)
+            for i in range(0, len(posts), self.quantum):
+                send_batch(lane, posts[i:i + self.quantum])
+            dispatched += len(posts)
+
+        if time() - self._last_flush >= self.metrics_interval:
+            self.flush_metrics()
+        return dispatched
+
+    def run(
+            self,
+            send_batch: Callable[[IngestLane, List[Post]], None],
+            get_queue_depth: Callable[[], Optional[int]] = None,
+            max_queue_depth: int = 200,
+            idle_sleep: float = 0.5
+    ) -> None:
+        """
+        Dispatch forever
+        :param send_batch: Function sending a batch of posts from a lane to ingest
+        :param get_queue_depth: Function returning the combined depth of the Celery ingest queues
+        :param max_queue_depth: Throttle lanes while the ingest queues are deeper than this
+        :param idle_sleep: Seconds to wait when a round had nothing to send
+        """
+        while True:
+            try:
+                depth = get_queue_depth() if get_queue_depth else None
+                throttle = depth is not None and depth >= max_queue_depth
+                if not self.dispatch(send_batch, throttle=throttle):
+                    sleep(idle_sleep)
+            except RedisError as e:
+                log.error('Failed to dispatch ingest lanes: %s', str(e))
+                sleep(5)
+            except Exception as e:
+                log.exception('Ingest dispatcher error', exc_info=True)
+                sleep(5)
+
+    def flush_metrics(self) -> None:
+        self._last_flush = time()
+        for lane in self.lanes:
+            lags = self._lags[lane.name]
+            self._lags[lane.name] = []
+            try:
+                depth = self.depth(lane.name)
+            except RedisError:
+                depth = None
+            log.info('Ingest lane %s: Depth %s, Dispatched %s, Max Lag %s', lane.name, depth, len(lags), round(max(lags), 3) if lags else 0)
+            if not self.event_logger:
+                continue
+            self.event_logger.save_event(IngestLaneEvent(
+                lane.name,
+                depth,
+                len(lags),
+                round(max(lags), 5) if lags else 0,
+                round(sum(lags) / len(lags), 5) if lags else 0
+            ))
+
+    def _pop(self, lane: Text, count: int) -> List:
+        """
+        Atomically take up to count items off the front of a lane
+        """
+        pipe = self.redis_client.pipeline(transaction=True)
+        pipe.lrange(self._key(lane), 0, count - 1)
+        pipe.ltrim(self._key(lane), count, -1)
+        raw, _ = pipe.execute()
+        return [pickle.loads(r) for r in raw]
+
+    def _get_lane(self, name: Text) -> IngestLane:
+        for lane in self.lanes:
+            if lane.name == name:
+                return lane
+        raise ValueError(f'Unknown ingest lane {name}')
+
+    @staticmethod
+    def _key(lane: Text) -> Text:
+        return f'{LANE_KEY_PREFIX}:{lane}'
+
+
+def get_ingest_scheduler(config: Config, event_logger: EventLogging = None) -> Optional[IngestScheduler]:
+    """
+    Create the ingest scheduler if ingest_scheduler is enabled
+    :param config: Config
+    :param event_logger: Event logger for lane metrics
+    :return: IngestScheduler or None
+    """
+    if not config.ingest_scheduler:
+        return
+    return IngestScheduler(get_redis_client(config), event_logger=event_logger)
@@ -0,0 +1,114 @@
+import threading
+from collections import Counter
+from datetime import datetime
+from time import perf_counter
+from typing import Dict, Text, Optional, List
+from urllib.parse import urlparse
+
+from redditrepostsleuth.core.config import Config
+from redditrepostsleuth.core.db.databasemodels import Post
+from redditrepostsleuth.core.logging import log
+from redditrepostsleuth.core.model.events.ingest_telemetry_event import IngestTelemetryEvent, IngestHashFailureEvent
+from redditrepostsleuth.core.services.eventlogging import EventLogging
+from redditrepostsleuth.core.util.latency_histogram import LatencyHistogram
+
+
+class IngestTelemetry:
+    """
+    Aggregate ingest stats in process and flush them every flush_interval seconds.
+
+    Per source (praw, pushshift, reddit_json) we keep the number of posts saved, a histogram of how long after
+    creation each post was saved and a histogram of how long batches sat in the queue.  Hash failures are counted by
+    image domain
+    """
+    def __init__(self, event_logger: EventLogging, flush_interval: int = 60):
+        """
+        :param event_logger: Event logger to flush to
+        :param flush_interval: Seconds between flushes
+        """
+        self.event_logger = event_logger
+        self.flush_interval = flush_interval
+        self._counts = Counter()
+        self._histograms: Dict[Text, Dict[Text, LatencyHistogram]] = {}
+        self._hash_failures = Counter()
+        self._lock = threading.Lock()
+        self._last_flush = perf_counter()
+
+    def record_saved(self, posts: List[Post]) -> None:
+        """
+        Record posts that were saved
+        :param posts: Saved posts
+        """
+        now = datetime.utcnow()
+        with self._lock:
+            for post in posts:
+                source = post.ingested_from or 'unknown'
+                self._counts[source] += 1
+                if post.created_at:
+                    self._get_histogram(source, 'lag').record((now - post.created_at).total_seconds())
+        self._maybe_flush()
+
+    def record_queue_wait(self, posts: List[Post], seconds: float) -> None:
+        """
+        Record how long a batch of posts waited in the queue
+        :param posts: Posts in the batch
+        :param seconds: Seconds between the batch being sent and a worker picking it up
+        """
+        with self._lock:
+            for source in set(post.ingested_from or 'unknown' for post in posts):
+                self._get_histogram(source, 'queue_wait').record(seconds)
+
+    def record_hash_failure(self, url: Text) -> None:
+        """
+        Record an image we failed to download or hash
+        :param url: Image URL
+        """
+        with self._lock:
+            self._hash_failures[urlparse(url).netloc.lower() if url else 'unknown'] += 1
+
+    def flush(self) -> None:
+        """
+        Send the stats collected since the last flush
+        """
+        with self._lock:
+            elapsed = perf_counter() - self._last_flush
+            self._last_flush = perf_counter()
+            counts, self._counts = self._counts, Counter()
+            histograms, self._histograms = self._histograms, {}
+            hash_failures, self._hash_failures = self._hash_failures, Counter()
+
+        try:
+            for source in set(counts) | set(histograms):
+                self.event_logger.save_event(IngestTelemetryEvent(
+                    source,
+                    counts[source],
+                    round(counts[source] / elapsed, 3) if elapsed else 0,
+                    {name: histogram.summary() for name, histogram in histograms.get(source, {}).items()},
+                    round(elapsed, 3)
+                ))
+            for domain, count in hash_failures.items():
+                self.event_logger.save_event(IngestHashFailureEvent(domain, count))
+        except Exception as e:
+            log.exception('Failed to flush ingest telemetry: %s', str(e))
+
+    def _get_histogram(self, source: Text, name: Text) -> LatencyHistogram:
+        histograms = self._histograms.setdefault(source, {})
+        if name not in histograms:
+            histograms[name] = LatencyHistogram()
+        return histograms[name]
+
+    def _maybe_flush(self) -> None:
+        if perf_counter() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+
+def get_ingest_telemetry(config: Config, event_logger: EventLogging) -> Optional[IngestTelemetry]:
+    """
+    Create ingest telemetry if it's configured
+    :param config: Config
+    :param event_logger: Event logger to flush to
+    :return: IngestTelemetry or None if ingest_telemetry_flush_interval is not set
+    """
+    if not config.ingest_telemetry_flush_interval:
+        return
+    return IngestTelemetry(event_logger, flush_interval=int(config.ingest_telemetry_flush_interval))
@@ -0,0 +1,162 @@
+import threading
+from collections import OrderedDict
+from hashlib import md5
+from math import ceil, log as ln
+from time import time
+from typing import List, Text, Optional
+
+from redis import Redis
+from redis.exceptions import RedisError
+
+from redditrepostsleuth.core.config import Config
+from redditrepostsleuth.core.logging import log
+from redditrepostsleuth.core.util.helpers import get_redis_client
+
+BLOOM_KEY_PREFIX = 'ingest_seen'
+
+
+class PostDeduplicator:
+    """
+    Drop post IDs we've already sent to ingest.
+
+    Recently seen IDs are kept in a bounded in process LRU so old IDs age out one at a time instead of the whole set
+    being wiped.  If a Redis client is provided a Bloom filter is also checked so multiple ingest replicas share what
+    they have seen.  The filter is split into time buckets that expire on their own, so it never fills up.  A false
+    positive drops a new post, so the error rate should be kept low
+    """
+    def __init__(
+            self,
+            max_local: int = 10000,
+            redis_client: Redis = None,
+            capacity: int = 500000,
+            error_rate: float = 0.0001,
+            bucket_seconds: int = 3600
+    ):
+        """
+        :param max_local: Max IDs to keep in process
+        :param redis_client: Redis client for the shared filter
+        :param capacity: Expected IDs per bucket
+        :param error_rate: Target false positive rate at capacity
+        :param bucket_seconds: Seconds each filter bucket covers.  IDs are remembered for 1 to 2 buckets
+        """
+        self.max_local = max_local
+        self.redis_client = redis_client
+        self.bucket_seconds = bucket_seconds
+        self.bits = ceil(-capacity * ln(error_rate) / (ln(2) ** 2))
+        self.hash_count = max(1, round(self.bits / capacity * ln(2)))
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+
+    def filter_new(self, post_ids: List[Text], mark: bool = True) -> List[Text]:
+        """
+        Get the IDs we haven't seen before and mark them all as seen
+        :param post_ids: Post IDs to check
+        :param mark: Mark the IDs as seen.  If False only check them and call mark_seen once they're sent, so posts
+        that failed to send aren't dropped as duplicates next time
+        :return: Unseen post IDs, in the order provided
+        """
+        unseen = []
+        with self._lock:
+            checked = set()
+            for post_id in post_ids:
+                if post_id in self._local:
+                    self._local.move_to_end(post_id)
+                    continue
+                if post_id in checked:
+                    continue
+                checked.add(post_id)
+                if mark:
+                    self._local[post_id] = None
+                unseen.append(post_id)
+            self._trim_local()
+
+        if unseen and self.redis_client:
+            unseen = self._filter_shared(unseen, mark=mark)
+        return unseen
+
+    def mark_seen(self, post_ids: List[Text]) -> None:
+        """
+        Mark IDs as seen after checking them with filter_new(mark=False)
+        :param post_ids: Post IDs that were sent to ingest
+        """
+        if not post_ids:
+            return
+        with self._lock:
+            for post_id in post_ids:
+                self._local[post_id] = None
+                self._local.move_to_end(post_id)
+            self._trim_local()
+        if self.redis_client:
+            self._filter_shared(post_ids)
+
+    def _trim_local(self) -> None:
+        while len(self._local) > self.max_local:
+            self._local.popitem(last=False)
+
+    def is_new(self, post_id: Text) -> bool:
+        """
+        Check a single ID and mark it as seen
+        """
+        return bool(self.filter_new([post_id]))
+
+    def _filter_shared(self, post_ids: List[Text], mark: bool = True) -> List[Text]:
+        """
+        Check and set IDs in the shared Bloom filter.  Bits are set in the current bucket and SETBIT returns the old
+        value, so an ID was seen if all its old bits were set in the current bucket or all its bits are set in the
+        previous one.  If mark is False the current bucket is only read
+        """
+        bucket = int(time() // self.bucket_seconds)
+        current_key = f'{BLOOM_KEY_PREFIX}:{bucket}'
+        previous_key = f'{BLOOM_KEY_PREFIX}:{bucket - 1}'
+        positions = [self._positions(post_id) for post_id in post_ids]
+        try:
+            pipe = self.redis_client.pipeline(transaction=True)
+            for offsets in positions:
+                for offset in offsets:
+                    if mark:
+                        pipe.setbit(current_key, offset, 1)
+                    else:
+                        pipe.getbit(current_key, offset)
+            for offsets in positions:
+                for offset in offsets:
+                    pipe.getbit(previous_key, offset)
+            if mark:
+                pipe.expire(current_key, self.bucket_seconds * 2)
+            results = pipe.execute()
+        except RedisError as e:
+            log.error('Failed to check shared dedup filter: %s', str(e))
+            return post_ids
+
+        per_id = len(positions[0]) if positions else 0
+        current_bits = results[:len(post_ids) * per_id]
+        previous_bits = results[len(post_ids) * per_id:len(post_ids) * per_id * 2]
+        unseen = []
+        for i, post_id in enumerate(post_ids):
+            start = i * per_id
+            if all(current_bits[start:start + per_id]) or all(previous_bits[start:start + per_id]):
+                log.debug('Post %s already seen by another ingestor', post_id)
+                continue
+            unseen.append(post_id)
+        return unseen
+
+    def _positions(self, post_id: Text) -> List[int]:
+        """
+        Bit positions of an ID using double hashing
+        """
+        digest = md5(post_id.encode('utf-8')).digest()
+        h1 = int.from_bytes(digest[:8], 'big')
+        h2 = int.from_bytes(digest[8:], 'big') | 1
+        return [(h1 + i * h2) % self.bits for i in range(self.hash_count)]
+
+
+def get_post_deduplicator(config: Config) -> PostDeduplicator:
+    """
+    Create a post deduplicator, sharing it through Redis if ingest_dedup_shared is set
+    :param config: Config
+    """
+    redis_client: Optional[Redis] = get_redis_client(config) if config.ingest_dedup_shared else None
+    return PostDeduplicator(
+        max_local=int(config.ingest_dedup_local_size or 10000),
+        redis_client=redis_client,
+        capacity=int(config.ingest_dedup_capacity or 500000)
+    )
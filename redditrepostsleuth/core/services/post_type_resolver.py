@@ -0,0 +1,109 @@
+import threading
+from collections import OrderedDict
+from time import time
+from typing import Dict, List, Text, Optional, Tuple
+
+from praw import Reddit
+from prawcore import PrawcoreException
+
+from redditrepostsleuth.core.config import Config
+from redditrepostsleuth.core.logging import log
+from redditrepostsleuth.core.util.helpers import chunk_list, get_post_type_pushshift_local, \
+    post_type_from_reddit_submission
+from redditrepostsleuth.core.util.reddithelpers import get_reddit_instance
+
+
+class PostTypeResolver:
+    """
+    Get post types for a batch of Pushshift submissions.  Anything we can't tell from the submission itself is looked
+    up on Reddit 100 at a time with reddit.info instead of one request per post.  Lookups are kept for ttl seconds
+    """
+    def __init__(self, reddit: Reddit = None, cache_size: int = 10000, ttl: int = 3600, config: Config = None):
+        """
+        :param reddit: Reddit instance.  Created from config the first time we need Reddit if not provided
+        :param cache_size: Max lookups to keep
+        :param ttl: Seconds to keep a lookup
+        :param config: Config used to create the Reddit instance
+        """
+        self.reddit = reddit
+        self.config = config
+        self.cache_size = cache_size
+        self.ttl = ttl
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def resolve(self, submissions: List[Dict]) -> Dict[Text, Optional[Text]]:
+        """
+        Get the post type of each submission
+        :param submissions: Pushshift submissions
+        :return: Dict of post ID to post type.  Type is None if it couldn't be determined
+        """
+        results = {}
+        unresolved = {}
+        for submission in submissions:
+            post_type = get_post_type_pushshift_local(submission)
+            if post_type:
+                results[submission['id']] = post_type
+                continue
+            cached = self._get_cached(submission['id'])
+            if cached:
+                results[submission['id']] = cached[0]
+                continue
+            unresolved[submission['id']] = submission
+
+        if not unresolved:
+            return results
+
+        log.debug('Looking up post type of %s posts on Reddit', len(unresolved))
+        reddit_data = {}
+        for chunk in chunk_list(list(unresolved.keys()), 100):
+            try:
+                for reddit_sub in self._get_reddit().info(fullnames=[f't3_{post_id}' for post_id in chunk]):
+                    reddit_data[reddit_sub.id] = reddit_sub.__dict__
+            except PrawcoreException as e:
+                log.error('Failed to look up post types on Reddit: %s', str(e))
+                # Don't cache anything from a failed chunk so it's tried again next time
+                for post_id in chunk:
+                    results[post_id] = post_type_from_reddit_submission(None, unresolved.pop(post_id))
+
+        for post_id, submission in unresolved.items():
+            post_type = post_type_from_reddit_submission(reddit_data.get(post_id), submission)
+            self._set_cached(post_id, post_type)
+            results[post_id] = post_type
+        return results
+
+    def _get_reddit(self) -> Reddit:
+        if not self.reddit:
+            self.reddit = get_reddit_instance(self.config or Config())
+        return self.reddit
+
+    def _get_cached(self, post_id: Text) -> Optional[Tuple[Optional[Text]]]:
+        with self._lock:
+            cached = self._cache.get(post_id)
+            if not cached:
+                return
+            if cached[0] < time():
+                del self._cache[post_id]
+                return
+            return cached[1],
+
+    def _set_cached(self, post_id: Text, post_type: Optional[Text]) -> None:
+        with self._lock:
+            self._cache[post_id] = (time() + self.ttl, post_type)
+            self._cache.move_to_end(post_id)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+
+_post_type_resolver: Optional[PostTypeResolver] = None
+
+
+def get_post_type_resolver(config: Config = None) -> PostTypeResolver:
+    """
+    Get the post type resolver for this process, creating it on first use
+    :param config: Config
+    """
+    global _post_type_resolver
+    if not _post_type_resolver:
+        _post_type_resolver = PostTypeResolver(config=config)
+    return _post_type_resolver
@@ -0,0 +1,124 @@
+import atexit
+import threading
+from time import perf_counter, sleep
+from typing import Dict, Text, Optional, List
+
+from redditrepostsleuth.core.config import Config
+from redditrepostsleuth.core.logging import log
+from redditrepostsleuth.core.model.events.search_latency_event import SearchLatencyEvent
+from redditrepostsleuth.core.services.eventlogging import EventLogging
+from redditrepostsleuth.core.util.latency_histogram import LatencyHistogram
+
+
+class SearchLatencyRecorder:
+    """
+    Aggregate search stage timings into a histogram per source and stage, along with search cache hits and misses.
+    Every flush_interval seconds each source's percentiles and cache counts are sent as a single Influx point instead
+    of sending one point per search.  A background thread flushes on schedule even if searches stop coming in and
+    whatever is left is flushed at exit
+    """
+    def __init__(self, event_logger: EventLogging, flush_interval: int = 60):
+        """
+        :param event_logger: Event logger to flush to
+        :param flush_interval: Seconds between flushes
+        """
+        self.event_logger = event_logger
+        self.flush_interval = flush_interval
+        self._histograms: Dict[Text, Dict[Text, LatencyHistogram]] = {}
+        self._cache_counts: Dict[Text, List[int]] = {}
+        self._lock = threading.Lock()
+        self._last_flush = perf_counter()
+        self._thread: Optional[threading.Thread] = None
+        atexit.register(self.flush)
+
+    def record(self, source: Text, search_times: Dict[Text, float], cache_hit: bool = None) -> None:
+        """
+        Record the stage timings of a search
+        :param source: Source of the search
+        :param search_times: Dict of stage name to seconds.  Stages that didn't run are skipped
+        :param cache_hit: If the result came from the search cache.  None if there's no search cache
+        """
+        with self._lock:
+            histograms = self._histograms.setdefault(source, {})
+            for stage, seconds in search_times.items():
+                if not seconds:
+                    continue
+                if stage not in histograms:
+                    histograms[stage] = LatencyHistogram()
+                histograms[stage].record(seconds)
+            if cache_hit is not None:
+                counts = self._cache_counts.setdefault(source, [0, 0])
+                counts[0 if cache_hit else 1] += 1
+        self._start_flush_thread()
+        if perf_counter() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def _start_flush_thread(self) -> None:
+        if not self.flush_interval or (self._thread and self._thread.is_alive()):
+            return
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            # Started on first record so the thread is never inherited across a Celery worker fork
+            self._thread = threading.Thread(target=self._flush_loop, name='search-latency-flush', daemon=True)
+            self._thread.start()
+
+    def _flush_loop(self) -> None:
+        while True:
+            sleep(self.flush_interval)
+            if perf_counter() - self._last_flush >= self.flush_interval:
+                self.flush()
+
+    def snapshot(self, reset: bool = False) -> Dict[Text, Dict[Text, Dict[Text, float]]]:
+        """
+        Get a summary of every histogram
+        :param reset: Start new histograms after taking the snapshot
+        :return: Dict of source to stage to summary
+        """
+        with self._lock:
+            histograms = self._histograms
+            if reset:
+                self._histograms = {}
+        return {
+            source: {stage: histogram.summary() for stage, histogram in stages.items()}
+            for source, stages in histograms.items()
+        }
+
+    def flush(self) -> None:
+        """
+        Send each source's percentiles and cache counts since the last flush
+        """
+        self._last_flush = perf_counter()
+        with self._lock:
+            cache_counts = self._cache_counts
+            self._cache_counts = {}
+        snapshot = self.snapshot(reset=True)
+        for source in set(snapshot) | set(cache_counts):
+            stages = snapshot.get(source, {})
+            counts = cache_counts.get(source)
+            if not stages and not counts:
+                continue
+            try:
+                self.event_logger.save_event(
+                    SearchLatencyEvent(
+                        source,
+                        stages,
+                        self.flush_interval,
+                        cache_hits=counts[0] if counts else None,
+                        cache_misses=counts[1] if counts else None
+                    )
+                )
+            except Exception as e:
+                log.exception('Failed to flush search latency: %s', str(e))
+
+
+def get_search_latency_recorder(config: Config, event_logger: EventLogging) -> Optional[SearchLatencyRecorder]:
+    """
+    Create a search latency recorder if one is configured
+    :param config: Config
+    :param event_logger: Event logger to flush to
+    :return: SearchLatencyRecorder or None if search_latency_flush_interval is not set
+    """
+    if not config.search_latency_flush_interval:
+        return
+    return SearchLatencyRecorder(event_logger, flush_interval=int(config.search_latency_flush_interval))
@@ -0,0 +1,210 @@
+import json
+import pickle
+import threading
+from collections import OrderedDict
+from hashlib import md5
+from time import time
+from typing import Text, Optional, Dict, Any
+
+from redis import Redis
+from redis.exceptions import RedisError
+
+from redditrepostsleuth.core.config import Config
+from redditrepostsleuth.core.index.index_class_maps import INDEX_MAP
+from redditrepostsleuth.core.logging import log
+from redditrepostsleuth.core.model.image_search_settings import ImageSearchSettings
+from redditrepostsleuth.core.util.helpers import get_redis_client
+
+GENERATION_KEY = 'search_cache:generation'
+GENERATION_OWNER_KEY = 'search_cache:generation_owner'
+# The external index API doesn't tell us when it indexes new posts so results can't be kept long
+EXTERNAL_INDEX_MAX_TTL = 60
+
+
+class SearchResultCache:
+    """
+    Cache of finished image searches so repeated searches of the same image skip the index, hydration and filters.
+
+    Results are stored in Redis so all workers share them, with a small in process LRU in front.  Every key includes
+    the index generation, which is shared by all workers.  Bumping the generation orphans every cached result.
+    advance_generation() does this when a local current index advances so new posts show up in results.  The
+    external index API never advances the generation, so with it the TTL is the only thing that expires results
+    """
+    def __init__(
+            self,
+            redis_client: Redis,
+            ttl: int = 300,
+            local_size: int = 500,
+            generation_refresh: int = 5
+    ):
+        """
+        :param redis_client: Redis client
+        :param ttl: Seconds to keep a result
+        :param local_size: Max results to keep in process
+        :param generation_refresh: Seconds to trust our local copy of the generation before checking Redis again
+        """
+        self.redis_client = redis_client
+        self.ttl = ttl
+        self.local_size = local_size
+        self.generation_refresh = generation_refresh
+        self.hits = 0
+        self.misses = 0
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = None
+        self._generation_checked = 0
+
+    @staticmethod
+    def build_key(
+            target_hash: Text,
+            search_settings: ImageSearchSettings,
+            post_id: Text = None,
+            sort_by: Text = None
+    ) -> Text:
+        """
+        Build a cache key for a search.  Settings are normalized so equivalent settings give the same key
+        :param target_hash: Hash being searched
+        :param search_settings: Settings of the search
+        :param post_id: ID of the post being checked.  Most filters depend on the checked post
+        :param sort_by: Match sort order
+        """
+        data = {
+            'target_hash': target_hash,
+            'settings': search_settings.to_dict(),
+            'post_id': post_id,
+            'sort_by': sort_by
+        }
+        return md5(json.dumps(data, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+    def get(self, key: Text) -> Optional[Dict[str, Any]]:
+        """
+        Get a cached result
+        :param key: Key from build_key
+        :return: Cached result or None on a miss
+        """
+        full_key = self._get_full_key(key)
+        if not full_key:
+            self.misses += 1
+            return
+
+        with self._lock:
+            local = self._local.get(full_key)
+            if local and local[0] > time():
+                self._local.move_to_end(full_key)
+                self.hits += 1
+                return pickle.loads(local[1])
+
+        try:
+            data = self.redis_client.get(full_key)
+        except RedisError as e:
+            log.error('Failed to get cached search result: %s', str(e))
+            data = None
+
+        if not data:
+            self.misses += 1
+            return
+
+        self._set_local(full_key, data)
+        self.hits += 1
+        return pickle.loads(data)
+
+    def set(self, key: Text, result: Dict[str, Any]) -> None:
+        """
+        Cache a result
+        :param key: Key from build_key
+        :param result: Data to cache
+        """
+        full_key = self._get_full_key(key)
+        if not full_key:
+            return
+        data = pickle.dumps(result)
+        self._set_local(full_key, data)
+        try:
+            self.redis_client.set(full_key, data, ex=self.ttl)
+        except RedisError as e:
+            log.error('Failed to cache search result: %s', str(e))
+
+    def invalidate(self) -> None:
+        """
+        Drop all cached results by moving to a new generation
+        """
+        with self._lock:
+            self._local.clear()
+            self._generation = None
+        try:
+            self.redis_client.incr(GENERATION_KEY)
+            log.info('Invalidated search result cache')
+        except RedisError as e:
+            log.error('Failed to invalidate search result cache: %s', str(e))
+
+    def advance_generation(self, interval: int) -> bool:
+        """
+        Move to a new generation when an index is rebuilt, at most once per interval across all workers.  Every
+        worker rebuilds its own index on its own schedule, so the first one to rebuild in each interval owns the
+        bump and the rest pick up the new generation within generation_refresh seconds
+        :param interval: Seconds between generations.  Should match how often the index is rebuilt
+        :return: True if this call moved to a new generation
+        """
+        try:
+            if not self.redis_client.set(GENERATION_OWNER_KEY, 1, nx=True, ex=max(int(interval), 1)):
+                return False
+        except RedisError as e:
+            log.error('Failed to claim search cache generation: %s', str(e))
+            return False
+        self.invalidate()
+        return True
+
+    def _get_full_key(self, key: Text) -> Optional[Text]:
+        generation = self._get_generation()
+        if generation is None:
+            return
+        return f'search_cache:{generation}:{key}'
+
+    def _get_generation(self) -> Optional[int]:
+        """
+        Get the current generation, only going to Redis once every generation_refresh seconds
+        :return: Generation or None if we can't reach Redis
+        """
+        if self._generation is not None and time() - self._generation_checked < self.generation_refresh:
+            return self._generation
+        try:
+            generation = int(self.redis_client.get(GENERATION_KEY) or 0)
+        except RedisError as e:
+            log.error('Failed to get search cache generation: %s', str(e))
+            return
+        with self._lock:
+            if generation != self._generation:
+                self._local.clear()
+            self._generation = generation
+            self._generation_checked = time()
+        return generation
+
+    def _set_local(self, full_key: Text, data: bytes) -> None:
+        with self._lock:
+            self._local[full_key] = (time() + self.ttl, data)
+            self._local.move_to_end(full_key)
+            while len(self._local) > self.local_size:
+                self._local.popitem(last=False)
+
+
+def get_search_result_cache(config: Config) -> Optional[SearchResultCache]:
+    """
+    Create a search result cache if one is configured
+    :param config: Config
+    :return: SearchResultCache or None if search_cache_ttl is not set
+    """
+    if not config.search_cache_ttl:
+        return
+    ttl = int(config.search_cache_ttl)
+    if config.image_index_engine not in INDEX_MAP and ttl > EXTERNAL_INDEX_MAX_TTL:
+        log.warning(
+            'Search cache TTL of %s is too long for the external index API, using %s',
+            ttl,
+            EXTERNAL_INDEX_MAX_TTL
+        )
+        ttl = EXTERNAL_INDEX_MAX_TTL
+    return SearchResultCache(
+        get_redis_client(config),
+        ttl=ttl,
+        local_size=int(config.search_cache_local_size or 500)
+    )
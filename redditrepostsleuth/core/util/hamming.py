@@ -0,0 +1,111 @@
+from typing import List, Text
+
+import numpy as np
+
+# Number of set bits for every possible byte value
+_POPCOUNT_TABLE = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+# Lowest bit of every nibble in a 64 bit word
+_NIBBLE_LOW_BITS = np.uint64(0x1111111111111111)
+_HEX_CHARS_PER_WORD = 16
+
+
+def _pad_hex(hex_hash: Text) -> Text:
+    """
+    Left pad a hex hash so it packs evenly into 64 bit words
+    :param hex_hash: Hex string
+    :return: Padded hex string
+    """
+    remainder = len(hex_hash) % _HEX_CHARS_PER_WORD
+    if not remainder:
+        return hex_hash
+    return hex_hash.rjust(len(hex_hash) + _HEX_CHARS_PER_WORD - remainder, '0')
+
+
+def hex_to_words(hex_hash: Text) -> np.ndarray:
+    """
+    Pack a hex hash into an array of uint64 words. A 64 char hash becomes 4 words
+    :param hex_hash: Hex string hash
+    :return: 1D uint64 array
+    """
+    return np.frombuffer(bytes.fromhex(_pad_hex(hex_hash)), dtype='>u8').astype(np.uint64)
+
+
+def hashes_to_matrix(hex_hashes: List[Text]) -> np.ndarray:
+    """
+    Pack a list of equal length hex hashes into a 2D array with one row of uint64 words per hash
+    :param hex_hashes: List of hex string hashes
+    :return: 2D uint64 array of shape (hashes, words)
+    """
+    if not hex_hashes:
+        return np.zeros((0, 0), dtype=np.uint64)
+    hash_length = len(hex_hashes[0])
+    if any(len(h) != hash_length for h in hex_hashes):
+        raise ValueError('All hashes must be the same length')
+    padded = ''.join(_pad_hex(h) for h in hex_hashes)
+    words = np.frombuffer(bytes.fromhex(padded), dtype='>u8').astype(np.uint64)
+    return words.reshape(len(hex_hashes), -1)
+
+
+def bytes_to_matrix(raw_hashes: bytes, rows: int) -> np.ndarray:
+    """
+    Pack concatenated raw hashes, as stored in the binary hash columns, into a 2D array with one row per hash.
+    Each hash must be a multiple of 8 bytes
+    :param raw_hashes: Raw hash bytes joined together
+    :param rows: Number of hashes
+    :return: 2D uint64 array of shape (hashes, words)
+    """
+    if not rows:
+        return np.zeros((0, 0), dtype=np.uint64)
+    return np.frombuffer(raw_hashes, dtype='>u8').astype(np.uint64).reshape(rows, -1)
+
+
+def popcount(words: np.ndarray) -> np.ndarray:
+    """
+    Count the set bits in each row of a uint64 array
+    :param words: 1D or 2D uint64 array
+    :return: Bit count per row. Scalar array for 1D input
+    """
+    as_bytes = np.ascontiguousarray(words).view(np.uint8)
+    return _POPCOUNT_TABLE[as_bytes].sum(axis=-1, dtype=np.int64)
+
+
+def hamming_distances(target: np.ndarray, candidates: np.ndarray) -> np.ndarray:
+    """
+    Vectorized Hamming distance between one packed hash and many packed hashes.
+
+    Distance is counted per hex character, not per bit, to stay consistent with distance.hamming on the hex strings
+    that all of our targets and match percents are built around.
+    :param target: 1D uint64 array of the packed target hash
+    :param candidates: 2D uint64 array of packed hashes
+    :return: 1D int array with the distance to each candidate
+    """
+    diff = np.bitwise_xor(candidates, target)
+    # Collapse each differing nibble down to a single bit so popcount gives differing hex characters
+    diff = (diff | (diff >> np.uint64(1)) | (diff >> np.uint64(2)) | (diff >> np.uint64(3))) & _NIBBLE_LOW_BITS
+    return popcount(diff)
+
+
+def hamming_distance(hash1: Text, hash2: Text) -> int:
+    """
+    Hamming distance between two hex hashes of the same length
+    :param hash1: Hex hash
+    :param hash2: Hex hash
+    :return: Number of differing hex characters
+    """
+    if len(hash1) != len(hash2):
+        raise ValueError('Hashes must be the same length')
+    return int(hamming_distances(hex_to_words(hash1), hex_to_words(hash2)))
+
+
+def hamming_distances_from_hex(target_hash: Text, hex_hashes: List[Text]) -> List[int]:
+    """
+    Score a list of hex hashes against a target hash in a single vectorized pass
+    :param target_hash: Hex hash to compare against
+    :param hex_hashes: Hex hashes the same length as the target
+    :return: Distance to each hash, in the same order
+    """
+    if not hex_hashes:
+        return []
+    if any(len(h) != len(target_hash) for h in hex_hashes):
+        raise ValueError('Hashes must be the same length')
+    return hamming_distances(hex_to_words(target_hash), hashes_to_matrix(hex_hashes)).tolist()
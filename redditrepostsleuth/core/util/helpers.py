@@ -1,7 +1,7 @@
 
 
 import json
-from typing import Dict, List, Text, TYPE_CHECKING
+from typing import Dict, List, Text, TYPE_CHECKING, Optional
 
 import requests
 from falcon import Request
@@ -41,6 +41,21 @@ def chunk_list(l, n):
 
 def get_post_type_pushshift(submission: Dict) -> str:
     # TODO - Go over this whole function
+    post_type = get_post_type_pushshift_local(submission)
+    if post_type:
+        return post_type
+
+    # Since the push push obj didn't have a post hint, we need to query reddit
+    reddit = get_reddit_instance(config=Config())
+    reddit_sub = reddit.submission(id=submission['id'])
+    return post_type_from_reddit_submission(reddit_sub.__dict__, submission)
+
+def get_post_type_pushshift_local(submission: Dict) -> Optional[Text]:
+    """
+    Get the post type of a Pushshift submission without calling Reddit
+    :param submission: Pushshift submission
+    :return: Post type or None if we need to ask Reddit
+    """
     if submission.get('is_self', None):
         return 'text'
 
@@ -54,24 +69,17 @@ def get_post_type_pushshift(submission: Dict) -> str:
             #log.debug('Post URL %s is an image', submission['url'])
             return 'image'
 
-    reddit = get_reddit_instance(config=Config())
-    is_video = submission.get('is_video', None)
-    if is_video:
-        #log.debug('Post %s has is_video value of %s. It is a video', submission['id'], is_video)
-        # Since the push push obj didn't have a post hint, we need to query reddit
-        print('Hitting Reddit API')
-        reddit_sub = reddit.submission(id=submission['id'])
-        post_hint = reddit_sub.__dict__.get('post_hint', None)
-        if post_hint:
-            #log.debug('Returning post hintg %s for post %s', post_hint, reddit_sub.id)
-            return post_hint
-        else:
-            #log.debug('Unable to determine video type for post %s', reddit_sub.id)
-            return 'video'
-
-    # Last ditch to get post_hint
-    reddit_sub = reddit.submission(id=submission['id'])
-    return reddit_sub.__dict__.get('post_hint', None)
+def post_type_from_reddit_submission(reddit_data: Optional[Dict], submission: Dict) -> Optional[Text]:
+    """
+    Get the post type of a Pushshift submission from the data Reddit has for it
+    :param reddit_data: Attributes of the Reddit submission or None if Reddit didn't return it
+    :param submission: Pushshift submission
+    """
+    post_hint = reddit_data.get('post_hint', None) if reddit_data else None
+    if post_hint:
+        return post_hint
+    if submission.get('is_video', None):
+        return 'video'
 
 def searched_post_str(post: Post, count: int) -> str:
     output = '**Searched'
@@ -119,13 +127,14 @@ def build_msg_values_from_search(search_results: 'SearchResults', uowm: UnitOfWo
     :param search_results: ImageRepostWrapper
     :param uowm: UnitOfWorkManager
     """
+    match_count = search_results.total_matches or len(search_results.matches)
     base_values = {
         'total_searched': f'{search_results.total_searched:,}',
         'total_posts': 0,
-        'match_count': len(search_results.matches),
+        'match_count': match_count,
         'post_type': search_results.checked_post.post_type,
         'this_subreddit': search_results.checked_post.subreddit,
-        'times_word': 'times' if len(search_results.matches) > 1 else 'time',
+        'times_word': 'times' if match_count > 1 else 'time',
         'stats_searched_post_str': searched_post_str(search_results.checked_post, search_results.total_searched),
         'post_shortlink': f'https://redd.it/{search_results.checked_post.post_id}',
         'post_author': search_results.checked_post.author,
@@ -9,11 +9,14 @@ from urllib import request
 from urllib.error import HTTPError
 
 import imagehash
+import numpy as np
 from PIL import Image
 from PIL.Image import DecompressionBombError
 
-from redditrepostsleuth.core.exception import ImageConversioinException
+from redditrepostsleuth.core.exception import ImageConversioinException, ImageRemovedException, \
+    InvalidImageUrlException
 from redditrepostsleuth.core.logging import log
+from redditrepostsleuth.core.services.image_download_cache import get_image_download_cache
 from redditrepostsleuth.core.db.databasemodels import Post
 
 
@@ -32,22 +35,78 @@ def generate_img_by_post(post: Post) -> Image:
 
 def generate_img_by_url(url: str) -> Image:
 
-    req = request.Request(
-        url,
-        data=None,
-        headers={
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_9_3) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/35.0.1916.47 Safari/537.36'
-        }
-    )
+    data = download_image(url)
+    try:
+        img = Image.open(BytesIO(data))
+    except (OSError, DecompressionBombError) as e:
+        log.exception('Failed to convert image %s. Error: %s ', url, str(e), exc_info=False)
+        raise ImageConversioinException(str(e))
+
+    return img if img else None
+
+def download_image(url: Text, raise_for_status: bool = False) -> bytes:
+    """
+    Download the raw bytes of an image.  If the image download cache is configured recent copies are served from disk
+    and stale copies are revalidated with the host using their ETag / Last-Modified
+    :param url: Image URL
+    :param raise_for_status: Raise ImageRemovedException on a 404 and InvalidImageUrlException on other bad statuses
+    instead of ImageConversioinException
+    :return: Image bytes
+    """
+    cache = get_image_download_cache()
+    cached = cache.get(url) if cache else None
+    if cached and cached.fresh:
+        log.debug('Using cached image %s', url)
+        return cached.data
+
+    headers = {
+        'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_9_3) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/35.0.1916.47 Safari/537.36'
+    }
+    if cached:
+        if cached.etag:
+            headers['If-None-Match'] = cached.etag
+        if cached.last_modified:
+            headers['If-Modified-Since'] = cached.last_modified
+
+    req = request.Request(url, data=None, headers=headers)
 
     try:
         response = request.urlopen(req, timeout=10)
-        img = Image.open(BytesIO(response.read()))
-    except (HTTPError, ConnectionError, OSError, DecompressionBombError, UnicodeEncodeError) as e:
+        data = response.read()
+    except HTTPError as e:
+        if e.code == 304 and cached:
+            log.debug('Cached image %s not modified', url)
+            cache.mark_validated(url)
+            return cached.data
+        if raise_for_status:
+            if e.code == 404:
+                log.error('Image no longer exists %s: %s', e.code, url)
+                raise ImageRemovedException(f'Image no longer exists: {url}')
+            log.error('Bad status code from image URL %s: %s', e.code, url)
+            raise InvalidImageUrlException(f'Issue getting image url: {url} - Status Code {e.code}')
+        log.exception('Failed to convert image %s. Error: %s ', url, str(e), exc_info=False)
+        raise ImageConversioinException(str(e))
+    except (ConnectionError, OSError, UnicodeEncodeError) as e:
         log.exception('Failed to convert image %s. Error: %s ', url, str(e), exc_info=False)
         raise ImageConversioinException(str(e))
 
-    return img if img else None
+    if cache:
+        cache.set(url, data, etag=response.headers.get('ETag'), last_modified=response.headers.get('Last-Modified'))
+    return data
+
+def get_image_hashes_from_bytes(data: bytes, hash_size: int = 16, meme_hash_size: int = None) -> Dict:
+    """
+    Create our hashes from raw image bytes
+    :param data: Image bytes
+    :param hash_size: Hash size of dhash_h, dhash_v and ahash
+    :param meme_hash_size: If provided also create dhash_meme
+    :return: Dict of hex hashes
+    """
+    try:
+        img = Image.open(BytesIO(data))
+    except (OSError, DecompressionBombError) as e:
+        raise ImageConversioinException(str(e))
+    return get_image_hashes_from_img(img, hash_size=hash_size, meme_hash_size=meme_hash_size)
 
 def generate_img_by_file(path: str) -> Image:
 
@@ -59,49 +118,105 @@ def generate_img_by_file(path: str) -> Image:
 
     return img if img else None
 
-def set_image_hashes(post: Post, hash_size: int = 16) -> Post:
+def set_image_hashes(post: Post, hash_size: int = 16, meme_hash_size: int = None, raise_for_status: bool = False) -> Post:
+    """
+    Download the post's image and set its hashes
+    :param post: Post to hash
+    :param hash_size: Hash size for the search hashes
+    :param meme_hash_size: If provided also set the meme filter hash at this size
+    :param raise_for_status: Raise ImageRemovedException / InvalidImageUrlException on bad statuses
+    """
     log.debug('%s - Hashing image post %s', os.getpid(), post.post_id)
+    hashes = get_image_hashes(
+        post.url,
+        hash_size=hash_size,
+        meme_hash_size=meme_hash_size,
+        raise_for_status=raise_for_status
+    )
+    post.dhash_h = hashes['dhash_h']
+    post.dhash_v = hashes['dhash_v']
+    post.ahash = hashes['ahash']
+    if meme_hash_size:
+        post.dhash_meme = hashes['dhash_meme']
+
+    return post
+
+def get_image_hashes(url: Text, hash_size: int = 16, meme_hash_size: int = None, raise_for_status: bool = False) -> Dict:
+    """
+    Download an image and create its hashes.  Hashes are reused from the image download cache when we have them
+    :param url: Image URL
+    :param hash_size: Hash size of dhash_h, dhash_v and ahash
+    :param meme_hash_size: If provided also create dhash_meme
+    :param raise_for_status: Raise ImageRemovedException / InvalidImageUrlException on bad statuses
+    :return: Dict of hex hashes
+    """
+    log.debug('Hashing image %s', url)
+    cache = get_image_download_cache()
+    cache_name = f'hashes:{hash_size}:{meme_hash_size}'
+    if cache:
+        hashes = cache.get_hashes(url, cache_name)
+        if hashes:
+            return hashes
+
+    data = download_image(url, raise_for_status=raise_for_status)
     try:
-        img = generate_img_by_url(post.url)
+        hashes = get_image_hashes_from_bytes(data, hash_size=hash_size, meme_hash_size=meme_hash_size)
     except ImageConversioinException as e:
+        log.error('Failed to convert image %s. Error: %s ', url, str(e))
         raise
-
-    try:
-        dhash_h = imagehash.dhash(img, hash_size=hash_size)
-        dhash_v = imagehash.dhash_vertical(img, hash_size=hash_size)
-        ahash = imagehash.average_hash(img, hash_size=hash_size)
-        post.dhash_h = str(dhash_h)
-        post.dhash_v = str(dhash_v)
-        post.ahash = str(ahash)
     except Exception as e:
         # TODO: Specific exception
         log.exception('Error creating hash', exc_info=True)
         raise
 
-    return post
+    if cache:
+        cache.set_hashes(url, cache_name, hashes)
+    return hashes
 
-def get_image_hashes(url: Text, hash_size: int = 16) -> Dict:
+def get_image_hashes_from_img(img: Image, hash_size: int = 16, meme_hash_size: int = None) -> Dict:
+    """
+    Create all of our hashes from a single grayscale conversion of the image.
+    Results are identical to imagehash's dhash, dhash_vertical and average_hash
+    :param img: PIL image
+    :param hash_size: Hash size of dhash_h, dhash_v and ahash
+    :param meme_hash_size: If provided also create dhash_meme, a horizontal dhash at this size
+    :return: Dict of hex hashes
+    """
+    if hash_size < 2:
+        raise ValueError('Hash size must be greater than or equal to 2')
+    gray = img.convert('L')
     result = {
-        'dhash_h': None,
-        'dhash_v': None,
-        'ahash': None,
+        'dhash_h': _dhash_h(gray, hash_size),
+        'dhash_v': _dhash_v(gray, hash_size),
+        'ahash': _ahash(gray, hash_size),
     }
-    log.debug('Hashing image %s', url)
-    img = generate_img_by_url(url)
-    try:
-        dhash_h = imagehash.dhash(img, hash_size=hash_size)
-        dhash_v = imagehash.dhash_vertical(img, hash_size=hash_size)
-        ahash = imagehash.average_hash(img, hash_size=hash_size)
-        result['dhash_h'] = str(dhash_h)
-        result['dhash_v'] = str(dhash_v)
-        result['ahash'] = str(ahash)
-    except Exception as e:
-        # TODO: Specific exception
-        log.exception('Error creating hash', exc_info=True)
-        raise
-
+    if meme_hash_size:
+        result['dhash_meme'] = _dhash_h(gray, meme_hash_size)
     return result
 
+def _resize_pixels(gray: Image, width: int, height: int) -> np.ndarray:
+    return np.asarray(gray.resize((width, height), Image.LANCZOS))
+
+def _dhash_h(gray: Image, hash_size: int) -> Text:
+    pixels = _resize_pixels(gray, hash_size + 1, hash_size)
+    return _bits_to_hex(pixels[:, 1:] > pixels[:, :-1])
+
+def _dhash_v(gray: Image, hash_size: int) -> Text:
+    pixels = _resize_pixels(gray, hash_size, hash_size + 1)
+    return _bits_to_hex(pixels[1:, :] > pixels[:-1, :])
+
+def _ahash(gray: Image, hash_size: int) -> Text:
+    pixels = _resize_pixels(gray, hash_size, hash_size)
+    return _bits_to_hex(pixels > np.mean(pixels))
+
+def _bits_to_hex(bits: np.ndarray) -> Text:
+    """
+    Convert a boolean hash array to the same hex string ImageHash gives us
+    """
+    if bits.size % 8:
+        return str(imagehash.ImageHash(bits))
+    return np.packbits(bits.flatten()).tobytes().hex()
+
 def set_image_hashes_api(post: Post, api_url: str) -> Post:
     """
     Call an external API to create image hashes.
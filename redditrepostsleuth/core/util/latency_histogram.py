@@ -0,0 +1,74 @@
+from collections import Counter
+from typing import Dict, List
+
+
+class LatencyHistogram:
+    """
+    HDR style histogram of latencies.
+
+    Values are recorded in microseconds into log-linear buckets.  Each power of two range is split into the same
+    number of sub buckets, so every recorded value is kept within about 1.5% no matter how large it is, and memory only
+    grows with the number of distinct buckets hit
+    """
+    def __init__(self, sub_bucket_bits: int = 7):
+        """
+        :param sub_bucket_bits: log2 of the sub buckets per power of two.  7 gives 1.5% precision
+        """
+        self.sub_bucket_bits = sub_bucket_bits
+        self._half = 1 << (sub_bucket_bits - 1)
+        self.counts = Counter()
+        self.total = 0
+        self.max = 0
+
+    def record(self, seconds: float) -> None:
+        value = max(int(seconds * 1000000), 0)
+        self.counts[self._bucket(value)] += 1
+        self.total += 1
+        self.max = max(self.max, value)
+
+    def percentile(self, percentile: float) -> float:
+        """
+        Get the value at a percentile
+        :param percentile: Percentile from 0 to 100
+        :return: Value in seconds
+        """
+        if not self.total:
+            return 0.0
+        target = max(percentile / 100 * self.total, 1)
+        seen = 0
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+            if seen >= target:
+                return min(self._bucket_value(bucket), self.max) / 1000000
+        return self.max / 1000000
+
+    def merge(self, other: 'LatencyHistogram') -> None:
+        self.counts.update(other.counts)
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def summary(self, percentiles: List[float] = (50, 95, 99)) -> Dict[str, float]:
+        """
+        Compact summary of the histogram
+        :return: Dict with the count, max and each percentile in seconds
+        """
+        result = {'count': self.total, 'max': self.max / 1000000}
+        for p in percentiles:
+            result[f'p{p:g}'] = self.percentile(p)
+        return result
+
+    def _bucket(self, value: int) -> int:
+        shift = max(value.bit_length() - self.sub_bucket_bits, 0)
+        return shift * self._half + (value >> shift)
+
+    def _bucket_value(self, bucket: int) -> int:
+        """
+        Middle of the range of values that land in a bucket
+        """
+        if bucket < 2 * self._half:
+            return bucket
+        shift = bucket // self._half - 1
+        return ((bucket - shift * self._half) << shift) + (1 << shift) // 2
+
+    def __len__(self):
+        return self.total
@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Dict
+from typing import Dict, Optional
 
 from praw.models import Submission
 from prawcore import Forbidden
@@ -7,6 +7,9 @@ from prawcore import Forbidden
 from redditrepostsleuth.core.db.databasemodels import Post, RedditImagePost, RedditImagePostCurrent
 from redditrepostsleuth.core.util.helpers import get_post_type_pushshift
 
+# Default for pushshift_to_post so a post type of None from the resolver is kept instead of looked up again
+_NOT_RESOLVED = object()
+
 
 def submission_to_post(submission: Submission, source: str = 'praw') -> Post:
     """
@@ -37,7 +40,14 @@ def submission_to_post(submission: Submission, source: str = 'praw') -> Post:
 
     return post
 
-def pushshift_to_post(submission: Dict, source: str = 'pushshift') -> Post:
+def pushshift_to_post(submission: Dict, source: str = 'pushshift', post_type: Optional[str] = _NOT_RESOLVED) -> Post:
+    """
+    Convert a Pushshift submission into a Post object
+    :param submission: Pushshift submission
+    :param source: Where the submission came from
+    :param post_type: Post type from the post type resolver, including None if it couldn't be determined.  If not
+    passed the post type is looked up from the submission
+    """
     post = Post()
     post.post_id = submission.get('id', None)
     post.url = submission.get('url', None)
@@ -51,7 +61,9 @@ def pushshift_to_post(submission: Dict, source: str = 'pushshift') -> Post:
     post.selftext = submission.get('selftext', None)
     post.crosspost_checked = True
     post.ingested_from = source
-    post.post_type = get_post_type_pushshift(submission)
+    if post_type is _NOT_RESOLVED:
+        post_type = get_post_type_pushshift(submission)
+    post.post_type = post_type
 
     return post
 
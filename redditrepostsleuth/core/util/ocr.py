@@ -2,12 +2,11 @@ from typing import Text, List
 
 import cv2
 import numpy as np
-import requests
 from imutils.object_detection import non_max_suppression
 from matplotlib import pyplot as plt
 
 from redditrepostsleuth.core.logging import log
-from redditrepostsleuth.core.util.imagehashing import generate_img_by_url
+from redditrepostsleuth.core.util.imagehashing import generate_img_by_url, download_image
 import pytesseract
 
 def predictions(prob_score, geo, min_confidence: float = 0.5):
@@ -77,8 +76,7 @@ def get_image_text_tesseract(
         padding: float = 0.06,
         draw_results:  bool = False):
 
-    resp = requests.get(url, stream=True).raw
-    image = np.asarray(bytearray(resp.read()), dtype="uint8")
+    image = np.asarray(bytearray(download_image(url)), dtype="uint8")
     image = cv2.imdecode(image, cv2.IMREAD_COLOR)
     (origH, origW) = image.shape[:2]
     log.debug('Original Image Size: %s', image.shape[:2])
@@ -1,17 +1,14 @@
 import json
 from datetime import datetime
 from typing import Text, List
-import random
 
-import requests
 from praw import Reddit
-from requests.exceptions import SSLError, ConnectionError, ReadTimeout
 
 from redditrepostsleuth.core.logging import log
 from redditrepostsleuth.core.model.search.image_search_match import ImageSearchMatch
 from redditrepostsleuth.core.model.search.search_match import SearchMatch
-from redditrepostsleuth.core.util.constants import USER_AGENTS
 from redditrepostsleuth.core.util.helpers import batch_check_urls
+from redditrepostsleuth.core.util.url_liveness import get_liveness_checker
 
 
 def cross_post_filter(match: SearchMatch) -> bool:
@@ -123,17 +120,15 @@ def filter_no_dhash(match: ImageSearchMatch):
     return True
 
 
-def filter_dead_urls(match: SearchMatch) -> bool:
-    try:
-        headers = {'User-Agent': random.choice(USER_AGENTS)}
-        r = requests.head(match.post.url, timeout=3, headers=headers)
-    except (ConnectionError, SSLError, ReadTimeout):
-        return False
-    if r.status_code == 200:
-        return True
-    else:
-        log.debug('Active URL Reject:  https://redd.it/%s', match.post.post_id)
-        return False
+def filter_dead_urls(matches: List[SearchMatch]) -> List[SearchMatch]:
+    """
+    Check the URL of each match concurrently and drop the ones that are no longer alive
+    :param matches: List of matches
+    :return: List of filtered matches
+    """
+    results = get_liveness_checker().filter_alive(matches, lambda x: x.post.url)
+    log.debug('Active URL Filter Rejected %s matches', len(matches) - len(results))
+    return results
 
 
 def filter_removed_posts(reddit: Reddit, matches: List[SearchMatch]) -> List[SearchMatch]:
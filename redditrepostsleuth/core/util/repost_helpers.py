@@ -5,7 +5,6 @@ from hashlib import md5
 from typing import List, Text
 
 import Levenshtein
-import requests
 from praw import Reddit
 
 from redditrepostsleuth.core.db.databasemodels import Post
@@ -18,10 +17,10 @@ from redditrepostsleuth.core.model.search.link_search_results import LinkSearchR
 from redditrepostsleuth.core.model.search.search_match import SearchMatch
 from redditrepostsleuth.core.model.search.search_results import SearchResults
 from redditrepostsleuth.core.model.search_settings import SearchSettings
-from redditrepostsleuth.core.util.constants import USER_AGENTS
 from redditrepostsleuth.core.util.repost_filters import filter_same_post, filter_same_author, cross_post_filter, \
     filter_newer_matches, same_sub_filter, filter_title_distance, filter_days_old_matches, filter_dead_urls_remote, \
     filter_removed_posts, filter_dead_urls
+from redditrepostsleuth.core.util.url_liveness import get_liveness_checker
 
 
 def filter_matching_images(raw_list: List[RepostMatch], post_being_checked: Post) -> List[Post]:
@@ -64,15 +63,45 @@ def get_link_reposts(
         search_settings: SearchSettings,
         post: Post = None,
         get_total: bool = False,
+        max_matches: int = None,
+        use_url_stats: bool = False
         ) -> LinkSearchResults:
-
+    """
+    Find the posts that shared a URL.  If use_url_stats is set the URL's link_url_stats are checked first so a URL
+    nobody else shared is a single indexed lookup.  If max_matches is also set and the URL was shared more often,
+    only the oldest max_matches posts and the newest post are loaded and total_matches is set from the stats.  The
+    limit is ignored when the sub, age or title filters are on since they can drop every one of the oldest posts
+    :param url: URL to check
+    :param uowm: UnitOfWorkManager
+    :param search_settings: Search settings
+    :param post: Post being checked
+    :param get_total: Set total_searched to the number of link posts
+    :param max_matches: Max posts to load
+    :param use_url_stats: Trust link_url_stats.  Only safe once the backfill has run, see link_url_stats_ready
+    :rtype: LinkSearchResults
+    """
     url_hash = md5(url.encode('utf-8'))
     url_hash = url_hash.hexdigest()
+    can_limit = max_matches and not search_settings.same_sub and not search_settings.max_days_old and not search_settings.check_title
     with uowm.start() as uow:
         search_results = LinkSearchResults(url, search_settings, checked_post=post, search_times=LinkSearchTimes())
         search_results.search_times.start_timer('query_time')
         search_results.search_times.start_timer('total_search_time')
-        raw_results = uow.posts.find_all_by_url_hash(url_hash)
+        url_stats = uow.link_url_stats.get_by_url_hash(url_hash) if use_url_stats else None
+        if url_stats and url_stats.share_count == 1 and post and url_stats.first_post_id == post.post_id:
+            log.debug('Post %s is the only post with URL hash %s', post.post_id, url_hash)
+            raw_results = []
+        elif url_stats and can_limit and url_stats.share_count > max_matches:
+            raw_results = uow.posts.find_all_by_url_hash(url_hash, limit=max_matches)
+            if raw_results and raw_results[-1].post_id != url_stats.last_post_id:
+                newest = uow.posts.get_by_post_id(url_stats.last_post_id)
+                if newest:
+                    raw_results.append(newest)
+            # The checked post is counted in the stats but isn't a match
+            search_results.total_matches = url_stats.share_count - 1 if post else url_stats.share_count
+        else:
+            # No stats yet for this URL or we can't trust them until the backfill is done
+            raw_results = uow.posts.find_all_by_url_hash(url_hash)
         search_results.search_times.stop_timer('query_time')
         log.debug('Query time: %s', search_results.search_times.query_time)
         search_results.matches = [SearchMatch(url, match) for match in raw_results]
@@ -139,14 +168,11 @@ def filter_search_results(
 
 
 def get_first_active_match(matches: List[ImageSearchMatch]) -> ImageSearchMatch:
-    for match in matches:
-        try:
-            headers = {'User-Agent': random.choice(USER_AGENTS)}
-            r = requests.head(match.post.url, timeout=3, headers=headers)
-            if r.status_code == 200:
-                return match
-        except Exception as e:
-            continue
+    """
+    Return the first match in the provided order whose URL is still alive.  URLs are checked concurrently
+    :param matches: Matches in rank order
+    """
+    return get_liveness_checker().first_alive(matches, lambda x: x.post.url)
 
 
 def get_title_similarity(title1: Text, title2: Text) -> float:
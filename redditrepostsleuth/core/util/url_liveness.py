@@ -0,0 +1,152 @@
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from time import perf_counter
+from typing import List, Text, Callable, Optional, TypeVar, Dict
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from redditrepostsleuth.core.logging import log
+from redditrepostsleuth.core.util.constants import USER_AGENTS
+
+T = TypeVar('T')
+
+
+class UrlLivenessChecker:
+    """
+    Check if URLs are still alive with concurrent HEAD requests.
+
+    Each worker thread keeps its own pooled session so connections to the same host are reused, and the number of
+    in flight requests to a single host is capped so a page of imgur links doesn't hammer imgur.
+    """
+    def __init__(
+            self,
+            max_workers: int = 10,
+            max_per_host: int = 4,
+            timeout: float = 3,
+            max_wait: float = 10
+    ):
+        """
+        :param max_workers: Max concurrent requests
+        :param max_per_host: Max concurrent requests to a single host
+        :param timeout: Timeout of each request
+        :param max_wait: Max total time to wait on a batch of checks
+        """
+        self.max_workers = max_workers
+        self.max_per_host = max_per_host
+        self.timeout = timeout
+        self.max_wait = max_wait
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._host_locks: Dict[Text, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def is_alive(self, url: Text) -> bool:
+        """
+        Check if a single URL returns a 200
+        :param url: URL to check
+        """
+        try:
+            with self._get_host_lock(url):
+                r = self._get_session().head(
+                    url,
+                    timeout=self.timeout,
+                    headers={'User-Agent': random.choice(USER_AGENTS)}
+                )
+        except Exception as e:
+            log.debug('Liveness check failed for %s: %s', url, str(e))
+            return False
+        return r.status_code == 200
+
+    def first_alive(self, items: List[T], get_url: Callable[[T], Text]) -> Optional[T]:
+        """
+        Return the first item in the provided order that has a live URL.
+
+        All items are checked concurrently but results are consumed in order, so we return as soon as every item ahead
+        of the first live one is known to be dead.  Checks that have not started are cancelled
+        :param items: Items in rank order
+        :param get_url: Function to get the URL from an item
+        :return: First live item or None if none are alive or we run out of time
+        """
+        if not items:
+            return
+        futures = self._submit(items, get_url)
+        deadline = perf_counter() + self.max_wait
+        try:
+            for item, future in zip(items, futures):
+                try:
+                    if future.result(timeout=max(deadline - perf_counter(), 0)):
+                        return item
+                except FutureTimeoutError:
+                    log.error('Liveness check ran out of time after %s seconds', self.max_wait)
+                    return
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def filter_alive(self, items: List[T], get_url: Callable[[T], Text]) -> List[T]:
+        """
+        Return the items with live URLs, preserving order.  Items not checked before the deadline are dropped
+        :param items: Items to check
+        :param get_url: Function to get the URL from an item
+        """
+        if not items:
+            return []
+        futures = self._submit(items, get_url)
+        deadline = perf_counter() + self.max_wait
+        results = []
+        try:
+            for item, future in zip(items, futures):
+                try:
+                    if future.result(timeout=max(deadline - perf_counter(), 0)):
+                        results.append(item)
+                except FutureTimeoutError:
+                    log.error('Liveness check ran out of time after %s seconds', self.max_wait)
+                    break
+        finally:
+            for future in futures:
+                future.cancel()
+        return results
+
+    def _submit(self, items: List[T], get_url: Callable[[T], Text]) -> list:
+        executor = self._get_executor()
+        return [executor.submit(self.is_alive, get_url(item)) for item in items]
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        # Created on first use so the pool is never inherited across a Celery worker fork
+        with self._lock:
+            if not self._executor:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+            return self._executor
+
+    def _get_host_lock(self, url: Text) -> threading.BoundedSemaphore:
+        host = urlparse(url).netloc
+        with self._lock:
+            if host not in self._host_locks:
+                self._host_locks[host] = threading.BoundedSemaphore(self.max_per_host)
+            return self._host_locks[host]
+
+    def _get_session(self) -> requests.Session:
+        session = getattr(self._local, 'session', None)
+        if not session:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=self.max_workers, pool_maxsize=self.max_per_host)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            self._local.session = session
+        return session
+
+
+_liveness_checker: Optional[UrlLivenessChecker] = None
+
+
+def get_liveness_checker() -> UrlLivenessChecker:
+    """
+    Get the shared liveness checker for this process
+    """
+    global _liveness_checker
+    if not _liveness_checker:
+        _liveness_checker = UrlLivenessChecker()
+    return _liveness_checker
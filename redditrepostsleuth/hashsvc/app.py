@@ -0,0 +1,18 @@
+import falcon
+
+from redditrepostsleuth.core.config import Config
+from redditrepostsleuth.core.services.image_download_cache import configure_image_download_cache
+from redditrepostsleuth.hashsvc.hash_endpoint import ImageHashEndpoint
+from redditrepostsleuth.hashsvc.image_hasher import ImageHasher
+
+config = Config()
+configure_image_download_cache(config)
+hasher = ImageHasher(
+    hash_workers=int(config.hash_service_workers or 4),
+    max_downloads=int(config.hash_service_max_downloads or 20)
+)
+
+api = application = falcon.API()
+
+api.add_route('/hash', ImageHashEndpoint(hasher))
+api.add_route('/hash/batch', ImageHashEndpoint(hasher), suffix='batch')
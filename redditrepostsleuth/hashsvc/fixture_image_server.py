@@ -0,0 +1,61 @@
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from io import BytesIO
+from typing import Text, Dict
+
+import numpy as np
+from PIL import Image
+
+
+def generate_fixture_images(count: int = 20, size: int = 800) -> Dict[Text, bytes]:
+    """
+    Generate random JPEGs to serve
+    :param count: Number of images
+    :param size: Width and height of each image
+    :return: Dict of path to image bytes
+    """
+    rand = np.random.RandomState(1)
+    images = {}
+    for i in range(count):
+        img = Image.fromarray(rand.randint(0, 256, (size, size, 3), dtype=np.uint8), 'RGB')
+        buffer = BytesIO()
+        img.save(buffer, format='JPEG')
+        images[f'/{i}.jpg'] = buffer.getvalue()
+    return images
+
+
+class FixtureImageServer:
+    """
+    Local HTTP server that serves generated images so the hash service can be tested and load tested without
+    hitting real image hosts
+    """
+    def __init__(self, images: Dict[Text, bytes], port: int = 0):
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                data = images.get(self.path)
+                if not data:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', 'image/jpeg')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.images = images
+        self.server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> Text:
+        return f'http://127.0.0.1:{self.server.server_address[1]}'
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,37 @@
+import json
+
+from falcon import Request, Response, HTTPBadRequest
+
+from redditrepostsleuth.core.exception import ImageConversioinException
+from redditrepostsleuth.core.logging import log
+from redditrepostsleuth.hashsvc.image_hasher import ImageHasher
+
+MAX_BATCH_SIZE = 500
+
+
+class ImageHashEndpoint:
+    def __init__(self, hasher: ImageHasher):
+        self.hasher = hasher
+
+    def on_get(self, req: Request, resp: Response):
+        """
+        Hash a single image.  Returns the same payload set_image_hashes_api expects
+        """
+        url = req.get_param('url', required=True)
+        try:
+            hashes = self.hasher.hash_url(url)
+        except ImageConversioinException as e:
+            log.error('Failed to hash %s: %s', url, str(e))
+            raise HTTPBadRequest(title='Invalid Image', description=f'Failed to hash image: {str(e)}')
+        resp.body = json.dumps(hashes)
+
+    def on_post_batch(self, req: Request, resp: Response):
+        """
+        Hash a batch of images.  Expects a JSON list of URLs and returns a list of results in the same order
+        """
+        urls = json.load(req.bounded_stream)
+        if not isinstance(urls, list) or not all(isinstance(url, str) for url in urls):
+            raise HTTPBadRequest(title='Invalid Request', description='Expected a JSON list of URLs')
+        if len(urls) > MAX_BATCH_SIZE:
+            raise HTTPBadRequest(title='Invalid Request', description=f'Max batch size is {MAX_BATCH_SIZE}')
+        resp.body = json.dumps(self.hasher.hash_urls(urls))
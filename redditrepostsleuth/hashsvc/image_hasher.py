@@ -0,0 +1,105 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Text, Dict, List, Optional
+
+from redditrepostsleuth.core.exception import ImageConversioinException
+from redditrepostsleuth.core.logging import log
+from redditrepostsleuth.core.util.imagehashing import download_image, get_image_hashes_from_bytes
+
+
+def _hash_image_bytes(data: bytes, hash_size: int) -> Dict:
+    # Runs in the worker processes.  Only the hex hashes come back across the process boundary
+    return get_image_hashes_from_bytes(data, hash_size=hash_size)
+
+
+class ImageHasher:
+    """
+    Download and hash images.  Downloads run on a bounded thread pool and the CPU bound hashing runs on a process
+    pool so one slow host or one huge image doesn't stall everything else
+    """
+    def __init__(self, hash_workers: int = 4, max_downloads: int = 20, hash_size: int = 16):
+        """
+        :param hash_workers: Number of hashing processes
+        :param max_downloads: Max concurrent image downloads
+        :param hash_size: Hash size to use
+        """
+        self.hash_workers = hash_workers
+        self.max_downloads = max_downloads
+        self.hash_size = hash_size
+        self._download_pool: Optional[ThreadPoolExecutor] = None
+        self._hash_pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def hash_url(self, url: Text) -> Dict:
+        """
+        Hash a single image
+        :param url: Image URL
+        :return: dict of dhash_h, dhash_v and ahash
+        :raises ImageConversioinException: If the image can't be downloaded or hashed
+        """
+        self._start_pools()
+        try:
+            data = self._download_pool.submit(download_image, url).result()
+        except ImageConversioinException:
+            raise
+        except Exception as e:
+            log.error('Failed to download %s: %s', url, str(e))
+            raise ImageConversioinException(str(e))
+        return self._hash_bytes(data)
+
+    def hash_urls(self, urls: List[Text]) -> List[Dict]:
+        """
+        Hash a batch of images concurrently.  Failures are returned in the results instead of raising
+        :param urls: Image URLs
+        :return: List of results in the same order as the URLs.  Each has the url and either the hashes or an error
+        """
+        self._start_pools()
+        downloads = [self._download_pool.submit(download_image, url) for url in urls]
+        hashes = []
+        for url, download in zip(urls, downloads):
+            try:
+                hashes.append(self._hash_pool.submit(_hash_image_bytes, download.result(), self.hash_size))
+            except ImageConversioinException as e:
+                hashes.append(str(e))
+            except Exception as e:
+                # Anything else, such as a malformed URL, only fails this URL and not the batch
+                log.error('Failed to download %s: %s', url, str(e))
+                hashes.append(str(e))
+
+        results = []
+        for url, future in zip(urls, hashes):
+            if isinstance(future, str):
+                results.append({'url': url, 'error': future})
+                continue
+            try:
+                results.append({'url': url, **future.result()})
+            except Exception as e:
+                log.error('Failed to hash %s: %s', url, str(e))
+                results.append({'url': url, 'error': str(e)})
+        return results
+
+    def _hash_bytes(self, data: bytes) -> Dict:
+        try:
+            return self._hash_pool.submit(_hash_image_bytes, data, self.hash_size).result()
+        except ImageConversioinException:
+            raise
+        except Exception as e:
+            log.exception('Error creating hash', exc_info=True)
+            raise ImageConversioinException(str(e))
+
+    def _start_pools(self):
+        # Pools are created on first use so they are started after gunicorn forks its workers
+        with self._lock:
+            if not self._download_pool:
+                self._download_pool = ThreadPoolExecutor(max_workers=self.max_downloads)
+            if not self._hash_pool:
+                self._hash_pool = ProcessPoolExecutor(max_workers=self.hash_workers)
+
+    def shutdown(self):
+        with self._lock:
+            if self._download_pool:
+                self._download_pool.shutdown()
+                self._download_pool = None
+            if self._hash_pool:
+                self._hash_pool.shutdown()
+                self._hash_pool = None
@@ -13,6 +13,8 @@ from redditrepostsleuth.core.exception import NoIndexException
 from redditrepostsleuth.core.logging import log
 from redditrepostsleuth.core.model.search.search_results import SearchResults
 from redditrepostsleuth.core.services.duplicateimageservice import DuplicateImageService
+from redditrepostsleuth.core.services.search_result_cache import get_search_result_cache
+from redditrepostsleuth.core.services.search_latency_recorder import get_search_latency_recorder
 from redditrepostsleuth.core.services.eventlogging import EventLogging
 from redditrepostsleuth.core.services.reddit_manager import RedditManager
 from redditrepostsleuth.core.services.response_handler import ResponseHandler
@@ -230,7 +232,8 @@ if __name__ == '__main__':
     config = Config()
     uowm = SqlAlchemyUnitOfWorkManager(get_db_engine(config))
     event_logger = EventLogging(config=config)
-    dup = DuplicateImageService(uowm, event_logger, config=config)
+    dup = DuplicateImageService(uowm, event_logger, config=config, search_cache=get_search_result_cache(config), latency_recorder=get_search_latency_recorder(config, event_logger))
+    dup.load_index()
     response_builder = ResponseBuilder(uowm)
     reddit_manager = RedditManager(get_reddit_instance(config))
     top = TopPostMonitor(
@@ -0,0 +1,310 @@
+"""
+Ingest Pushshift submission dumps.
+
+Streams a dump file (plain, .zst, .bz2, .xz or .gz) line by line, parses and maps the submissions to posts across a
+process pool and sends them to the ingest workers in batches.  Sending pauses while the Celery queues are backed up.
+The byte offset of the last batch sent is checkpointed so a backfill can pick up where it left off after a crash.
+
+Usage: python -m redditrepostsleuth.ingestsvc.archive_ingestor RS_2019-06.zst --post-types image,link
+"""
+import argparse
+import bz2
+import gzip
+import io
+import json
+import lzma
+import os
+import sys
+import tempfile
+from collections import deque
+from multiprocessing import Pool
+from time import sleep, perf_counter, time
+from typing import Text, List, Optional, BinaryIO, Callable, Iterator, Tuple, NoReturn
+
+from redis import Redis
+from redis.exceptions import RedisError
+
+from redditrepostsleuth.core.db.databasemodels import Post
+from redditrepostsleuth.core.logging import log
+from redditrepostsleuth.core.services.post_type_resolver import get_post_type_resolver
+from redditrepostsleuth.core.util.objectmapping import pushshift_to_post
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+SKIP_CHUNK_SIZE = 1024 * 1024 * 16
+DEFAULT_QUEUES = ['pushshift_ingest', 'postingest', 'repost_image']
+
+
+def open_archive(path: Text) -> BinaryIO:
+    """
+    Open a dump file for streaming, decompressing based on the extension
+    :param path: Path to the dump or - for stdin
+    :return: Binary stream of decompressed NDJSON
+    """
+    if path == '-':
+        return sys.stdin.buffer
+    if path.endswith('.zst'):
+        if not zstandard:
+            raise ValueError('zstandard must be installed to read .zst archives')
+        # Pushshift dumps are compressed with a long window
+        dctx = zstandard.ZstdDecompressor(max_window_size=2 ** 31)
+        return io.BufferedReader(dctx.stream_reader(open(path, 'rb'), closefd=True, read_across_frames=True))
+    if path.endswith('.bz2'):
+        return bz2.open(path, 'rb')
+    if path.endswith('.xz'):
+        return lzma.open(path, 'rb')
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rb')
+    return open(path, 'rb')
+
+
+def skip_to_offset(stream: BinaryIO, offset: int) -> None:
+    """
+    Move a stream forward to a decompressed byte offset.  Compressed streams can't seek so they're read and thrown away
+    """
+    if not offset:
+        return
+    if stream.seekable():
+        stream.seek(offset)
+        return
+    remaining = offset
+    while remaining:
+        data = stream.read(min(remaining, SKIP_CHUNK_SIZE))
+        if not data:
+            raise ValueError(f'Archive ended before checkpoint offset {offset}')
+        remaining -= len(data)
+
+
+def read_line_chunks(stream: BinaryIO, chunk_size: int, start_offset: int = 0) -> Iterator[Tuple[List[bytes], int]]:
+    """
+    Read lines from a stream in chunks
+    :param stream: Stream to read
+    :param chunk_size: Lines per chunk
+    :param start_offset: Offset the stream is currently at
+    :return: Iterator of (lines, offset after the last line in the chunk)
+    """
+    offset = start_offset
+    lines = []
+    while True:
+        line = stream.readline()
+        if not line:
+            break
+        offset += len(line)
+        lines.append(line)
+        if len(lines) >= chunk_size:
+            yield lines, offset
+            lines = []
+    if lines:
+        yield lines, offset
+
+
+def parse_archive_lines(lines: List[bytes], post_types: Optional[List[Text]] = None, after: int = None) -> List[Post]:
+    """
+    Parse dump lines into posts.  Runs in the pool workers
+    :param lines: Raw NDJSON lines
+    :param post_types: Only keep posts of these types
+    :param after: Only keep posts created after this timestamp
+    :return: List of posts
+    """
+    submissions = []
+    for line in lines:
+        try:
+            submission = json.loads(line)
+        except ValueError:
+            log.error('Failed to decode archive line: %s', line[:100])
+            continue
+        if not submission.get('id') or not submission.get('created_utc'):
+            continue
+        if after and int(submission['created_utc']) <= after:
+            continue
+        # Skip the post type lookup entirely when we're dropping text posts anyway
+        if post_types and 'text' not in post_types and submission.get('is_self'):
+            continue
+        submissions.append(submission)
+
+    if not submissions:
+        return []
+    resolved_types = get_post_type_resolver().resolve(submissions)
+    posts = []
+    for submission in submissions:
+        try:
+            post = pushshift_to_post(submission, post_type=resolved_types.get(submission['id']))
+        except Exception as e:
+            log.error('Failed to map submission %s: %s', submission.get('id'), str(e))
+            continue
+        if post_types and post.post_type not in post_types:
+            continue
+        posts.append(post)
+    return posts
+
+
+class QueueBackpressure:
+    """
+    Block while the Celery queues we feed are too deep
+    """
+    def __init__(self, redis_client: Redis, queues: List[Text], max_depth: int, poll_interval: int = 10):
+        """
+        :param redis_client: Redis client for the Celery broker
+        :param queues: Queues to watch
+        :param max_depth: Max combined queue length
+        :param poll_interval: Seconds to wait between checks while backed up
+        """
+        self.redis_client = redis_client
+        self.queues = queues
+        self.max_depth = max_depth
+        self.poll_interval = poll_interval
+
+    def get_depth(self) -> Optional[int]:
+        try:
+            pipe = self.redis_client.pipeline(transaction=False)
+            for queue in self.queues:
+                pipe.llen(queue)
+            return sum(pipe.execute())
+        except RedisError as e:
+            log.error('Failed to get queue depth: %s', str(e))
+
+    def wait(self) -> None:
+        while True:
+            depth = self.get_depth()
+            if depth is None or depth < self.max_depth:
+                return
+            log.info('Waiting for queues to drain.  Depth: %s', depth)
+            sleep(self.poll_interval)
+
+
+class ArchiveIngestor:
+
+    def __init__(
+            self,
+            send_batch: Callable[[List[Post]], None],
+            backpressure: QueueBackpressure = None,
+            workers: int = 4,
+            batch_size: int = 1000,
+            post_types: List[Text] = None,
+            after: int = None,
+            checkpoint_path: Text = None
+    ):
+        """
+        :param send_batch: Function to send a batch of posts to ingest
+        :param backpressure: Checked before every batch is sent
+        :param workers: Number of parse processes
+        :param batch_size: Posts per batch sent to ingest.  Also the number of lines handed to a worker at a time
+        :param post_types: Only ingest these post types
+        :param after: Only ingest posts created after this timestamp
+        :param checkpoint_path: File to store progress in
+        """
+        self.send_batch = send_batch
+        self.backpressure = backpressure
+        self.workers = workers
+        self.batch_size = batch_size
+        self.post_types = post_types
+        self.after = after
+        self.checkpoint_path = checkpoint_path
+
+    def ingest(self, path: Text) -> int:
+        """
+        Ingest a dump file, resuming from the checkpoint if there is one for this file
+        :param path: Path to the dump or - for stdin
+        :return: Number of posts sent
+        """
+        offset = self.load_checkpoint(path)
+        if offset:
+            log.info('Resuming %s from byte %s', path, offset)
+        start = perf_counter()
+        sent = 0
+        with open_archive(path) as stream:
+            skip_to_offset(stream, offset)
+            chunks = read_line_chunks(stream, self.batch_size, start_offset=offset)
+            for posts, chunk_offset in self._parse_chunks(chunks):
+                if posts:
+                    if self.backpressure:
+                        self.backpressure.wait()
+                    self.send_batch(posts)
+                    sent += len(posts)
+                self.save_checkpoint(path, chunk_offset)
+                log.info('Sent %s posts from %s.  Offset %s.  %s posts/sec', sent, path, chunk_offset, round(sent / (perf_counter() - start)))
+        return sent
+
+    def _parse_chunks(self, chunks: Iterator[Tuple[List[bytes], int]]) -> Iterator[Tuple[List[Post], int]]:
+        """
+        Parse chunks across the pool, yielding results in file order.  Only a few chunks are in flight at a time so a
+        slow consumer doesn't pull the whole file into memory
+        """
+        if self.workers <= 1:
+            for lines, offset in chunks:
+                yield parse_archive_lines(lines, self.post_types, self.after), offset
+            return
+
+        with Pool(self.workers) as pool:
+            pending = deque()
+            for lines, offset in chunks:
+                pending.append((pool.apply_async(parse_archive_lines, (lines, self.post_types, self.after)), offset))
+                if len(pending) >= self.workers * 2:
+                    result, chunk_offset = pending.popleft()
+                    yield result.get(), chunk_offset
+            while pending:
+                result, chunk_offset = pending.popleft()
+                yield result.get(), chunk_offset
+
+    def load_checkpoint(self, path: Text) -> int:
+        if not self.checkpoint_path or path == '-':
+            return 0
+        try:
+            with open(self.checkpoint_path, 'r') as f:
+                checkpoint = json.load(f)
+        except (OSError, ValueError):
+            return 0
+        if checkpoint.get('path') != os.path.abspath(path):
+            log.warning('Checkpoint %s is for %s, starting from the beginning', self.checkpoint_path, checkpoint.get('path'))
+            return 0
+        return checkpoint.get('offset', 0)
+
+    def save_checkpoint(self, path: Text, offset: int) -> None:
+        if not self.checkpoint_path or path == '-':
+            return
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.checkpoint_path)), prefix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump({'path': os.path.abspath(path), 'offset': offset}, f)
+        os.replace(tmp_path, self.checkpoint_path)
+
+
+def get_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description='Ingest a Pushshift submission dump')
+    parser.add_argument('path', help='Dump file (plain, .zst, .bz2, .xz, .gz) or - for stdin')
+    parser.add_argument('--workers', type=int, default=4, help='Parse processes')
+    parser.add_argument('--batch-size', type=int, default=1000, help='Posts per ingest batch')
+    parser.add_argument('--post-types', default=None, help='Comma separated post types to ingest')
+    parser.add_argument('--after', type=int, default=None, help='Only ingest posts created after this timestamp')
+    parser.add_argument('--checkpoint', default=None, help='Checkpoint file.  Defaults to <path>.checkpoint')
+    parser.add_argument('--queue', default='pushshift_ingest', help='Queue to send batches to')
+    parser.add_argument('--max-queue-depth', type=int, default=50000, help='Pause while the watched queues hold more than this')
+    parser.add_argument('--watch-queues', default=','.join(DEFAULT_QUEUES), help='Comma separated queues to watch')
+    return parser
+
+
+def main(argv: List[Text] = None) -> NoReturn:
+    from redditrepostsleuth.core.celery.ingesttasks import save_new_posts
+    from redditrepostsleuth.core.config import Config
+    from redditrepostsleuth.core.util.helpers import get_redis_client
+
+    args = get_parser().parse_args(argv)
+    config = Config()
+    ingestor = ArchiveIngestor(
+        lambda posts: save_new_posts.apply_async((posts,), {'enqueued_at': time()}, queue=args.queue),
+        backpressure=QueueBackpressure(get_redis_client(config), args.watch_queues.split(','), args.max_queue_depth),
+        workers=args.workers,
+        batch_size=args.batch_size,
+        post_types=args.post_types.split(',') if args.post_types else None,
+        after=args.after,
+        checkpoint_path=args.checkpoint or f'{args.path}.checkpoint'
+    )
+    sent = ingestor.ingest(args.path)
+    log.info('Finished %s.  Sent %s posts', args.path, sent)
+    sys.exit(0)
+
+
+if __name__ == '__main__':
+    main()
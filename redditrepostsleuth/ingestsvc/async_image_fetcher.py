@@ -0,0 +1,216 @@
+import asyncio
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Text, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from redditrepostsleuth.core.db.databasemodels import Post, RedditImagePost, RedditImagePostCurrent
+from redditrepostsleuth.core.exception import ImageRemovedException, InvalidImageUrlException, \
+    ImageConversioinException
+from redditrepostsleuth.core.logging import log
+from redditrepostsleuth.core.services.ingest_telemetry import IngestTelemetry
+from redditrepostsleuth.core.util.imagehashing import get_image_hashes_from_bytes
+from redditrepostsleuth.ingestsvc.util import prepare_post, create_image_posts
+
+try:
+    import aiohttp
+    FETCH_ERRORS = (aiohttp.ClientError, asyncio.TimeoutError, OSError)
+except ImportError:
+    aiohttp = None
+    FETCH_ERRORS = (asyncio.TimeoutError, OSError)
+
+USER_AGENT = 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_9_3) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/35.0.1916.47 Safari/537.36'
+DEFAULT_HOST_LIMITS = {
+    'i.redd.it': 50,
+    'imgur.com': 10,
+}
+
+
+class AsyncImageFetcher:
+    """
+    Download images on an asyncio event loop over pooled connections.  Concurrency is capped per host so we don't get
+    throttled by the big image hosts, and responses over max_size are abandoned as soon as we know
+    """
+    def __init__(
+            self,
+            max_connections: int = 200,
+            host_limits: Dict[Text, int] = None,
+            default_host_limit: int = 10,
+            timeout: int = 15,
+            max_size: int = 20 * 1024 * 1024,
+            session=None
+    ):
+        """
+        :param max_connections: Max open connections across all hosts
+        :param host_limits: Max concurrent downloads per host.  A limit for imgur.com also covers i.imgur.com
+        :param default_host_limit: Max concurrent downloads for hosts not in host_limits
+        :param timeout: Seconds allowed for a whole download
+        :param max_size: Max image size in bytes
+        :param session: aiohttp ClientSession to use instead of creating one
+        """
+        self.max_connections = max_connections
+        self.host_limits = host_limits if host_limits is not None else DEFAULT_HOST_LIMITS
+        self.default_host_limit = default_host_limit
+        self.timeout = timeout
+        self.max_size = max_size
+        self._session = session
+        self._host_semaphores: Dict[Text, asyncio.Semaphore] = {}
+
+    async def fetch(self, url: Text) -> bytes:
+        """
+        Download an image
+        :param url: Image URL
+        :return: Image bytes
+        :raises ImageRemovedException: If the image is gone
+        :raises InvalidImageUrlException: On any other bad status or if the image is too large
+        :raises ImageConversioinException: If the download fails
+        """
+        host = urlparse(url).netloc.lower()
+        async with self._get_host_semaphore(host):
+            try:
+                async with self._get_session().get(url) as response:
+                    if response.status == 404:
+                        raise ImageRemovedException(f'Image no longer exists: {url}')
+                    if response.status != 200:
+                        raise InvalidImageUrlException(f'Issue getting image url: {url} - Status Code {response.status}')
+                    if response.content_length and response.content_length > self.max_size:
+                        raise InvalidImageUrlException(f'Image too large: {url} - {response.content_length} bytes')
+                    data = bytearray()
+                    async for chunk in response.content.iter_chunked(64 * 1024):
+                        data += chunk
+                        if len(data) > self.max_size:
+                            raise InvalidImageUrlException(f'Image too large: {url}')
+                    return bytes(data)
+            except FETCH_ERRORS as e:
+                raise ImageConversioinException(f'Failed to download {url}: {str(e) or type(e).__name__}')
+
+    async def close(self) -> None:
+        if self._session:
+            await self._session.close()
+            self._session = None
+
+    def _get_host_semaphore(self, host: Text) -> asyncio.Semaphore:
+        limit_key = self._get_limit_key(host)
+        if limit_key not in self._host_semaphores:
+            self._host_semaphores[limit_key] = asyncio.Semaphore(self.host_limits.get(limit_key, self.default_host_limit))
+        return self._host_semaphores[limit_key]
+
+    def _get_limit_key(self, host: Text) -> Text:
+        for limit_host in self.host_limits:
+            if host == limit_host or host.endswith('.' + limit_host):
+                return limit_host
+        return host
+
+    def _get_session(self):
+        if not self._session:
+            if not aiohttp:
+                raise ValueError('aiohttp must be installed to use the async image fetcher')
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_connections, ttl_dns_cache=300),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers={'User-Agent': USER_AGENT}
+            )
+        return self._session
+
+
+class AsyncIngestPipeline:
+    """
+    Prepare posts for saving with downloads running concurrently on an event loop and hashing on a process pool.
+
+    The event loop runs in its own thread so the blocking Celery task can hand it a batch and wait, while connections
+    stay pooled between batches.  The loop and pool are started on first use so they're created after the worker forks
+    """
+    def __init__(
+            self,
+            fetcher: AsyncImageFetcher = None,
+            hash_workers: int = 4,
+            hash_size: int = 16,
+            meme_hash_size: int = None,
+            telemetry: IngestTelemetry = None
+    ):
+        """
+        :param fetcher: Image fetcher
+        :param hash_workers: Number of hashing processes
+        :param hash_size: Hash size for the search hashes
+        :param meme_hash_size: If provided also set the meme filter hash
+        :param telemetry: Ingest telemetry to record hash failures in
+        """
+        self.telemetry = telemetry
+        self.fetcher = fetcher or AsyncImageFetcher()
+        self.hash_workers = hash_workers
+        self.hash_size = hash_size
+        self.meme_hash_size = meme_hash_size
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._hash_pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def prepare_posts(
+            self,
+            posts: List[Post]
+    ) -> List[Tuple[Post, Optional[RedditImagePost], Optional[RedditImagePostCurrent]]]:
+        """
+        Batch version of prepare_post
+        :param posts: Posts to prepare
+        :return: Prepared posts, ready for save_prepared_posts.  Posts that failed are left out
+        """
+        if not posts:
+            return []
+        self._start()
+        return asyncio.run_coroutine_threadsafe(self._prepare_posts(posts), self._loop).result()
+
+    async def _prepare_posts(self, posts: List[Post]) -> List[Tuple]:
+        results = await asyncio.gather(*[self._prepare_post(post) for post in posts])
+        return [r for r in results if r]
+
+    async def _prepare_post(self, post: Post) -> Optional[Tuple]:
+        if post.post_type != 'image':
+            return prepare_post(post, None)
+        try:
+            data = await self.fetcher.fetch(post.url)
+            hashes = await asyncio.get_running_loop().run_in_executor(
+                self._hash_pool,
+                get_image_hashes_from_bytes,
+                data,
+                self.hash_size,
+                self.meme_hash_size
+            )
+        except ImageRemovedException:
+            log.error('Post %s: Image no longer exists %s', post.post_id, post.url)
+            self._record_hash_failure(post)
+            return
+        except (InvalidImageUrlException, ImageConversioinException) as e:
+            log.error('Post %s: Failed to hash image: %s', post.post_id, str(e))
+            self._record_hash_failure(post)
+            return
+        except Exception as e:
+            log.exception('Post %s: Error hashing image', post.post_id, exc_info=True)
+            self._record_hash_failure(post)
+            return
+        post.dhash_h = hashes['dhash_h']
+        post.dhash_v = hashes['dhash_v']
+        post.ahash = hashes['ahash']
+        if self.meme_hash_size:
+            post.dhash_meme = hashes['dhash_meme']
+        return create_image_posts(post)
+
+    def _record_hash_failure(self, post: Post) -> None:
+        if self.telemetry:
+            self.telemetry.record_hash_failure(post.url)
+
+    def _start(self) -> None:
+        with self._lock:
+            if not self._hash_pool:
+                self._hash_pool = ProcessPoolExecutor(max_workers=self.hash_workers)
+            if not self._loop:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name='async_image_fetch', daemon=True).start()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._loop:
+                asyncio.run_coroutine_threadsafe(self.fetcher.close(), self._loop).result()
+                self._loop.call_soon_threadsafe(self._loop.stop)
+                self._loop = None
+            if self._hash_pool:
+                self._hash_pool.shutdown()
+                self._hash_pool = None
@@ -10,7 +10,10 @@ from redditrepostsleuth.core.db.db_utils import get_db_engine
 from redditrepostsleuth.core.db.uow.sqlalchemyunitofworkmanager import SqlAlchemyUnitOfWorkManager
 
 from redditrepostsleuth.core.logging import log
-from redditrepostsleuth.core.util.helpers import get_reddit_instance
+from redditrepostsleuth.core.services.eventlogging import EventLogging
+from redditrepostsleuth.core.services.ingest_scheduler import get_ingest_scheduler
+from redditrepostsleuth.core.util.helpers import get_reddit_instance, get_redis_client
+from redditrepostsleuth.ingestsvc.archive_ingestor import QueueBackpressure
 from redditrepostsleuth.ingestsvc.postingestor import PostIngestor
 
 if __name__ == '__main__':
@@ -18,7 +21,20 @@ if __name__ == '__main__':
     print('Starting post ingestor')
     config = Config()
     uowm = SqlAlchemyUnitOfWorkManager(get_db_engine(config))
-    ingestor = PostIngestor(get_reddit_instance(config), uowm, config)
+    scheduler = get_ingest_scheduler(config, event_logger=EventLogging(config=config))
+    ingestor = PostIngestor(get_reddit_instance(config), uowm, config, scheduler=scheduler)
+    if scheduler:
+        backpressure = QueueBackpressure(
+            get_redis_client(config),
+            ['postingest', 'postingest_async'],
+            int(config.ingest_scheduler_max_queue_depth or 200)
+        )
+        threading.Thread(
+            target=scheduler.run,
+            args=(ingestor.send_lane_batch,),
+            kwargs={'get_queue_depth': backpressure.get_depth, 'max_queue_depth': backpressure.max_depth},
+            name='ingest_dispatch'
+        ).start()
     threading.Thread(target=ingestor.ingest_without_stream, name='praw_ingest').start()
     threading.Thread(target=ingestor.ingest_pushshift, name='pushshift_ingest').start()
 
@@ -1,4 +1,5 @@
 import json
+from typing import Optional
 
 import requests
 import time
@@ -11,16 +12,30 @@ from redditrepostsleuth.core.config import Config
 from redditrepostsleuth.core.db.db_utils import get_db_engine
 from redditrepostsleuth.core.db.uow.sqlalchemyunitofworkmanager import SqlAlchemyUnitOfWorkManager
 from redditrepostsleuth.core.logging import log
-from redditrepostsleuth.core.celery.ingesttasks import save_new_post, save_pushshift_results
+from redditrepostsleuth.core.services.ingest_scheduler import IngestScheduler, IngestLane, FIREHOSE_LANE
+from redditrepostsleuth.core.services.post_deduplicator import PostDeduplicator, get_post_deduplicator
+from redditrepostsleuth.core.celery.ingesttasks import save_new_post, save_pushshift_results, save_new_posts, \
+    save_new_posts_async
 from redditrepostsleuth.core.db.uow.unitofworkmanager import UnitOfWorkManager
-from redditrepostsleuth.core.util.helpers import post_type_from_url
+from redditrepostsleuth.core.util.helpers import post_type_from_url, chunk_list
 from redditrepostsleuth.core.util.objectmapping import submission_to_post
 from redditrepostsleuth.core.util.reddithelpers import get_reddit_instance
 
 
 class PostIngestor:
-    def __init__(self, reddit: Reddit, uowm: UnitOfWorkManager, config: Config) -> None:
+    def __init__(
+            self,
+            reddit: Reddit,
+            uowm: UnitOfWorkManager,
+            config: Config,
+            batch_size: int = 100,
+            deduplicator: PostDeduplicator = None,
+            scheduler: IngestScheduler = None
+    ) -> None:
         self.config = config
+        self.batch_size = batch_size
+        self.deduplicator = deduplicator or get_post_deduplicator(config)
+        self.scheduler = scheduler
         self.existing_posts = []
         self.reddit = reddit
         self.uowm = uowm
@@ -32,6 +47,8 @@ class PostIngestor:
                 while True:
                     try:
                         for submission in sr.stream.submissions():
+                            if not self.deduplicator.filter_new([submission.id], mark=False):
+                                continue
                             log.debug('Saving post %s', submission.id)
                             post = submission_to_post(submission)
                             if not post.post_type:
@@ -39,17 +56,15 @@ class PostIngestor:
                                 log.error('Last resort post type %s', post.post_type)
                                 log.error(post.url)
                             save_new_post.apply_async((post,), queue='postingest')
+                            self.deduplicator.mark_seen([submission.id])
                     except Forbidden as e:
                         pass
             except Exception as e:
                 log.exception('INGEST THREAD DIED', exc_info=True)
 
     def ingest_without_stream(self):
-        seen_posts = []
         while True:
             try:
-                if len(seen_posts) > 10000:
-                    seen_posts = []
                 try:
                     submissions = [sub for sub in self.reddit.subreddit('all').new(limit=500)]
                 except ResponseException as e:
@@ -64,8 +79,11 @@ class PostIngestor:
                         continue
 
                 log.debug('%s posts from API', len(submissions))
+                # Only marked as seen once sent so a failed send is picked up again on the next pass
+                new_ids = set(self.deduplicator.filter_new([sub.id for sub in submissions], mark=False))
+                posts = []
                 for submission in submissions:
-                    if submission.id in seen_posts:
+                    if submission.id not in new_ids:
                         continue
                     #log.debug('Saving post %s', submission.id)
                     post = submission_to_post(submission)
@@ -73,11 +91,33 @@ class PostIngestor:
                         post.post_type = post_type_from_url(post.url)
                         #log.debug('Last resort post type %s', post.post_type)
                         #log.debug(post.url)
-                    save_new_post.apply_async((post,), queue='postingest')
-                    seen_posts.append(post.post_id)
+                    posts.append(post)
+                for batch in chunk_list(posts, self.batch_size):
+                    self._send_batch(batch)
+                    self.deduplicator.mark_seen([post.post_id for post in batch])
             except Exception as e:
                 log.exception('INGEST THREAD DIED', exc_info=True)
 
+    def _send_batch(self, posts):
+        if self.scheduler:
+            self.scheduler.submit(posts, FIREHOSE_LANE)
+        else:
+            self.send_lane_batch(None, posts)
+
+    def send_lane_batch(self, lane: Optional[IngestLane], posts):
+        """
+        Send a batch of posts to the ingest workers.  Used directly and by the ingest scheduler
+        :param lane: Lane the posts came from or None for the firehose
+        :param posts: Posts to ingest
+        """
+        kwargs = {'enqueued_at': time.time()}
+        if lane and lane.name != FIREHOSE_LANE:
+            save_new_posts.apply_async((posts,), kwargs, queue=lane.queue)
+        elif self.config.ingest_async_fetch:
+            save_new_posts_async.apply_async((posts,), kwargs, queue='postingest_async')
+        else:
+            save_new_posts.apply_async((posts,), kwargs, queue='postingest')
+
     def ingest_pushshift(self):
         while True:
             oldest_id = None
@@ -1,8 +1,8 @@
 import os
-from typing import Tuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Tuple, List, Optional, Dict
 from urllib.parse import urlparse
 
-import requests
 from requests.exceptions import ConnectionError
 from sqlalchemy.exc import IntegrityError
 
@@ -15,40 +15,34 @@ from hashlib import md5
 
 from redditrepostsleuth.core.model.events.ingest_image_process_event import IngestImageProcessEvent
 from redditrepostsleuth.core.services.eventlogging import EventLogging
+from redditrepostsleuth.core.services.ingest_telemetry import IngestTelemetry
+from redditrepostsleuth.core.services.post_type_resolver import PostTypeResolver, get_post_type_resolver
 from redditrepostsleuth.core.services.reddit_manager import RedditManager
 from redditrepostsleuth.core.util.imagehashing import set_image_hashes_api, set_image_hashes
 from redditrepostsleuth.core.util.objectmapping import post_to_image_post, post_to_image_post_current, \
-    submission_to_post
+    submission_to_post, pushshift_to_post
 
 
-def pre_process_post(post: Post, uowm: UnitOfWorkManager, hash_api) -> Post:
+def pre_process_post(
+        post: Post,
+        uowm: UnitOfWorkManager,
+        hash_api,
+        meme_hash_size: int = None,
+        telemetry: IngestTelemetry = None
+) -> Post:
     log.debug(post)
+    prepared = prepare_post(post, hash_api, meme_hash_size=meme_hash_size, telemetry=telemetry)
+    if not prepared:
+        return
+    post, image_post, image_post_current = prepared
     with uowm.start() as uow:
-        if post.post_type == 'image':
-            log.debug('Post %s: Is an image', post.post_id)
-            try:
-                post, image_post, image_post_current = process_image_post(post, hash_api)
-            except (ImageRemovedException, ImageConversioinException, InvalidImageUrlException, ConnectionError):
-                return
-            if image_post is None or image_post_current is None:
-                log.error('Post %s: Failed to save image post. One of the post objects is null', post.post_id)
-                log.error('Image Post: %s - Image Post Current: %s', image_post, image_post_current)
-                return
-
-            if not post.dhash_h:
-                log.error('Post %s: is missing dhash', post.post_id)
-                return
-
+        if image_post:
             uow.image_post.add(image_post)
             uow.image_post_current.add(image_post_current)
-        elif post.post_type == 'link':
-            url_hash = md5(post.url.encode('utf-8'))
-            post.url_hash = url_hash.hexdigest()
-            log.debug('Set URL hash for post %s', post.post_id)
-        elif post.post_type == 'hosted:video':
-            pass
         try:
             uow.posts.add(post)
+            if post.url_hash:
+                uow.link_url_stats.add_shares([post])
             uow.commit()
             log.debug('Post %s: Commited post to database', post.post_id)
         except IntegrityError as e:
@@ -58,30 +52,159 @@ def pre_process_post(post: Post, uowm: UnitOfWorkManager, hash_api) -> Post:
     return post
 
 
-def process_image_post(post: Post, hash_api) -> Tuple[Post,RedditImagePost, RedditImagePostCurrent]:
-    if 'imgur' not in post.url: # TODO Why in the hell did I do this?
-        """
-        if 'preview.redd.it' in post.url:
-            log.error('Skipping preview URL in %s: %s', post.subreddit, post.url)
-            raise InvalidImageUrlException(f'Unable to get preview image: {post.url}')
-        """
-        try: # Make sure URL is still valid
-            r = requests.head(post.url)
-        except ConnectionError as e:
-            log.error('Post %s: Failed to verify image URL at %s', post.post_id, post.url)
-            raise
-
-        if r.status_code != 200:
-            if r.status_code == 404:
-                log.error('Post %s: Image no longer exists %s: %s', post.post_id, r.status_code, post.url)
-                raise ImageRemovedException(f'Post {post.post_id} has been deleted')
-            elif r.status_code == 403:
-                log.error('Unauthorized (%s): https://redd.it/%s', post.subreddit, post.post_id)
-                raise InvalidImageUrlException(f'Issue getting image url: {post.url} - Status Code {r.status_code}')
-            else:
-                log.debug('Bad status code from image URL %s', r.status_code)
-                raise InvalidImageUrlException(f'Issue getting image url: {post.url} - Status Code {r.status_code}')
+def pre_process_posts(
+        posts: List[Post],
+        uowm: UnitOfWorkManager,
+        hash_api,
+        meme_hash_size: int = None,
+        max_workers: int = 10,
+        telemetry: IngestTelemetry = None
+) -> List[Post]:
+    """
+    Batch version of pre_process_post.  Images are hashed concurrently and every row is written with bulk inserts
+    :param posts: Posts to save
+    :param uowm: Unit of work manager
+    :param hash_api: Hash API to use, if any
+    :param meme_hash_size: If provided also set the meme filter hash
+    :param max_workers: Max posts to process at once
+    :param telemetry: Ingest telemetry to record hash failures in
+    :return: Posts that were saved
+    """
+    if not posts:
+        return []
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(posts))) as executor:
+        results = executor.map(
+            lambda p: prepare_post(p, hash_api, meme_hash_size=meme_hash_size, telemetry=telemetry),
+            posts
+        )
+        prepared = [r for r in results if r]
+    return save_prepared_posts(prepared, uowm)
+
+
+def prepare_post(
+        post: Post,
+        hash_api,
+        meme_hash_size: int = None,
+        telemetry: IngestTelemetry = None
+) -> Optional[Tuple[Post, Optional[RedditImagePost], Optional[RedditImagePostCurrent]]]:
+    """
+    Do everything needed before saving a post, such as hashing images
+    :param post: Post to prepare
+    :param hash_api: Hash API to use, if any
+    :param meme_hash_size: If provided also set the meme filter hash
+    :param telemetry: Ingest telemetry to record hash failures in
+    :return: (Post, RedditImagePost, RedditImagePostCurrent) or None if the post should not be saved.  Image posts are
+    None for anything other than an image
+    """
+    image_post, image_post_current = None, None
+    if post.post_type == 'image':
+        log.debug('Post %s: Is an image', post.post_id)
+        try:
+            post, image_post, image_post_current = process_image_post(post, hash_api, meme_hash_size=meme_hash_size)
+        except (ImageRemovedException, ImageConversioinException, InvalidImageUrlException, ConnectionError):
+            if telemetry:
+                telemetry.record_hash_failure(post.url)
+            return
+        except Exception as e:
+            # Anything else, like a truncated image, only drops this post and not the rest of the batch
+            log.exception('Post %s: Error hashing image', post.post_id, exc_info=True)
+            if telemetry:
+                telemetry.record_hash_failure(post.url)
+            return
+        if image_post is None or image_post_current is None:
+            log.error('Post %s: Failed to save image post. One of the post objects is null', post.post_id)
+            log.error('Image Post: %s - Image Post Current: %s', image_post, image_post_current)
+            return
+
+        if not post.dhash_h:
+            log.error('Post %s: is missing dhash', post.post_id)
+            return
+    elif post.post_type == 'link':
+        url_hash = md5(post.url.encode('utf-8'))
+        post.url_hash = url_hash.hexdigest()
+        log.debug('Set URL hash for post %s', post.post_id)
+    elif post.post_type == 'hosted:video':
+        pass
+    return post, image_post, image_post_current
+
 
+def save_prepared_posts(
+        prepared: List[Tuple[Post, Optional[RedditImagePost], Optional[RedditImagePostCurrent]]],
+        uowm: UnitOfWorkManager
+) -> List[Post]:
+    """
+    Save prepared posts with bulk inserts.  If the batch hits an integrity error it's retried one post at a time so
+    a single bad row doesn't sink the rest of the batch
+    :param prepared: Results of prepare_post
+    :param uowm: Unit of work manager
+    :return: Posts that were saved
+    """
+    if not prepared:
+        return []
+    try:
+        with uowm.start() as uow:
+            # Posts are merged by ID later on, so we need the IDs back
+            uow.posts.bulk_save([p[0] for p in prepared], return_defaults=True)
+            uow.image_post.bulk_save([p[1] for p in prepared if p[1]])
+            uow.image_post_current.bulk_save([p[2] for p in prepared if p[2]])
+            uow.link_url_stats.add_shares([p[0] for p in prepared if p[0].url_hash])
+            uow.commit()
+        log.debug('Saved batch of %s posts', len(prepared))
+        return [p[0] for p in prepared]
+    except IntegrityError as e:
+        log.info('Bulk save of %s posts failed, saving individually', len(prepared))
+
+    saved = []
+    for post, image_post, image_post_current in prepared:
+        with uowm.start() as uow:
+            if image_post:
+                uow.image_post.add(image_post)
+                uow.image_post_current.add(image_post_current)
+            try:
+                uow.posts.add(post)
+                if post.url_hash:
+                    uow.link_url_stats.add_shares([post])
+                uow.commit()
+                saved.append(post)
+            except IntegrityError as e:
+                log.exception('Post %s: Database save failed', post.post_id, exc_info=False)
+                uow.rollback()
+    return saved
+
+
+def get_new_pushshift_posts(
+        submissions: List[Dict],
+        uowm: UnitOfWorkManager,
+        resolver: PostTypeResolver = None
+) -> List[Post]:
+    """
+    Map the Pushshift submissions we don't already have to posts.  Existence is checked with one query for the batch
+    and post types that need Reddit are looked up together
+    :param submissions: Pushshift submissions
+    :param uowm: UnitOfWorkManager
+    :param resolver: Post type resolver, defaults to the one for this process
+    :return: List of new posts
+    """
+    with uowm.start() as uow:
+        existing = set(uow.posts.get_existing_post_ids([s['id'] for s in submissions]))
+    new_submissions = []
+    for submission in submissions:
+        if submission['id'] in existing:
+            log.debug('Skipping pushshift post: %s', submission['id'])
+            continue
+        existing.add(submission['id'])
+        new_submissions.append(submission)
+    if not new_submissions:
+        return []
+    post_types = (resolver or get_post_type_resolver()).resolve(new_submissions)
+    return [pushshift_to_post(s, post_type=post_types.get(s['id'])) for s in new_submissions]
+
+
+def process_image_post(
+        post: Post,
+        hash_api,
+        meme_hash_size: int = None
+) -> Tuple[Post,RedditImagePost, RedditImagePostCurrent]:
     log.info('%s - Post %s: Hashing with URL: %s', os.getpid(), post.post_id, post.url)
 
     if hash_api:
@@ -89,7 +212,9 @@ def process_image_post(post: Post, hash_api) -> Tuple[Post,RedditImagePost, Redd
         set_image_hashes_api(post, hash_api)
     else:
         log.debug('Post %s: Using local hashing', post.post_id)
-        set_image_hashes(post)
+        # A single GET both validates the URL and fetches the image.  404s raise ImageRemovedException and other bad
+        # statuses raise InvalidImageUrlException
+        set_image_hashes(post, meme_hash_size=meme_hash_size, raise_for_status=True)
 
     return create_image_posts(post)
 
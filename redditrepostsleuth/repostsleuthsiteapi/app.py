@@ -6,6 +6,9 @@ from redditrepostsleuth.core.db.db_utils import get_db_engine
 from redditrepostsleuth.core.db.uow.sqlalchemyunitofworkmanager import SqlAlchemyUnitOfWorkManager
 from redditrepostsleuth.core.notification.notification_service import NotificationService
 from redditrepostsleuth.core.services.duplicateimageservice import DuplicateImageService
+from redditrepostsleuth.core.services.search_result_cache import get_search_result_cache
+from redditrepostsleuth.core.services.search_latency_recorder import get_search_latency_recorder
+from redditrepostsleuth.core.services.image_download_cache import configure_image_download_cache
 from redditrepostsleuth.core.services.eventlogging import EventLogging
 from redditrepostsleuth.core.services.reddit_manager import RedditManager
 from redditrepostsleuth.core.services.response_handler import ResponseHandler
@@ -24,11 +27,13 @@ from redditrepostsleuth.repostsleuthsiteapi.endpoints.posts import PostsEndpoint
 from redditrepostsleuth.repostsleuthsiteapi.endpoints.repost_history import RepostHistoryEndpoint
 
 config = Config()
+configure_image_download_cache(config)
 event_logger = EventLogging(config=config)
 uowm = SqlAlchemyUnitOfWorkManager(get_db_engine(config))
 reddit = get_reddit_instance(config)
 reddit_manager = RedditManager(reddit)
-dup = DuplicateImageService(uowm, event_logger, reddit, config=config)
+dup = DuplicateImageService(uowm, event_logger, reddit, config=config, search_cache=get_search_result_cache(config), latency_recorder=get_search_latency_recorder(config, event_logger))
+dup.load_index()
 response_handler = ResponseHandler(reddit, uowm, event_logger, live_response=config.live_responses)
 notification_svc = NotificationService(config)
 config_updater = SubredditConfigUpdater(
@@ -193,7 +193,9 @@ class SubMonitor:
             self.uowm,
             get_link_search_settings_for_monitored_sub(monitored_sub),
             post=post,
-            get_total=False
+            get_total=False,
+            max_matches=100,
+            use_url_stats=self.config.link_url_stats_ready
         )
         return filter_search_results(
             search_results,
@@ -12,6 +12,8 @@ from redditrepostsleuth.core.services.responsebuilder import ResponseBuilder
 
 from redditrepostsleuth.core.util.helpers import get_reddit_instance
 from redditrepostsleuth.core.services.duplicateimageservice import DuplicateImageService
+from redditrepostsleuth.core.services.search_result_cache import get_search_result_cache
+from redditrepostsleuth.core.services.search_latency_recorder import get_search_latency_recorder
 from redditrepostsleuth.submonitorsvc.submonitor import SubMonitor
 
 if __name__ == '__main__':
@@ -19,7 +21,8 @@ if __name__ == '__main__':
     event_logger = EventLogging(config=config)
     uowm = SqlAlchemyUnitOfWorkManager(get_db_engine(config))
     response_builder = ResponseBuilder(uowm)
-    dup = DuplicateImageService(uowm, event_logger, config=config)
+    dup = DuplicateImageService(uowm, event_logger, config=config, search_cache=get_search_result_cache(config), latency_recorder=get_search_latency_recorder(config, event_logger))
+    dup.load_index()
     reddit_manager = RedditManager(get_reddit_instance(config))
     monitor = SubMonitor(dup, uowm, reddit_manager, response_builder, ResponseHandler(reddit_manager, uowm, event_logger, source='submonitor', live_response=config.live_responses), event_logger=event_logger,config=config)
     monitor.run()
\ No newline at end of file
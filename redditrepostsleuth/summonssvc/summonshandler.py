@@ -282,7 +282,9 @@ class SummonsHandler:
             self.uowm,
             get_default_link_search_settings(self.config),
             post=post,
-            get_total=True
+            get_total=True,
+            max_matches=100,
+            use_url_stats=self.config.link_url_stats_ready
         )
         search_results = filter_search_results(
             search_results,
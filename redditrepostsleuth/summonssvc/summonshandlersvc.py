@@ -14,6 +14,8 @@ from redditrepostsleuth.core.services.responsebuilder import ResponseBuilder
 from redditrepostsleuth.core.util.reddithelpers import get_reddit_instance
 from redditrepostsleuth.core.logging import log
 from redditrepostsleuth.core.services.duplicateimageservice import DuplicateImageService
+from redditrepostsleuth.core.services.search_result_cache import get_search_result_cache
+from redditrepostsleuth.core.services.search_latency_recorder import get_search_latency_recorder
 from redditrepostsleuth.summonssvc.summonshandler import SummonsHandler
 
 
@@ -25,7 +27,8 @@ if __name__ == '__main__':
     response_builder = ResponseBuilder(uowm)
     reddit = get_reddit_instance(config)
     reddit_manager = RedditManager(reddit)
-    dup = DuplicateImageService(uowm, event_logger, reddit, config=config)
+    dup = DuplicateImageService(uowm, event_logger, reddit, config=config, search_cache=get_search_result_cache(config), latency_recorder=get_search_latency_recorder(config, event_logger))
+    dup.load_index()
     summons = SummonsHandler(
         uowm,
         dup,
@@ -0,0 +1,41 @@
+from unittest import TestCase
+
+from redditrepostsleuth.benchmark.image_search_benchmark import SyntheticCorpus, benchmark_engine, \
+    benchmark_check_image, get_search_settings, check_gates, main
+from redditrepostsleuth.core.util.hamming import hamming_distance
+
+
+class TestImageSearchBenchmark(TestCase):
+
+    def test_corpus_clusters_within_distance(self):
+        corpus = SyntheticCorpus(500, 5, 4, 3)
+        for cluster in range(5):
+            center = corpus.hex_hash(cluster)
+            for member in range(3):
+                row = 5 + cluster * 3 + member
+                self.assertLessEqual(hamming_distance(center, corpus.hex_hash(row)), 3)
+
+    def test_benchmark_engine_exact_recall(self):
+        corpus = SyntheticCorpus(2000, 20, 5, 3)
+        queries = corpus.queries(20)
+        for engine in ('linear', 'mih'):
+            r = benchmark_engine(engine, corpus, queries, 5)
+            self.assertEqual(1.0, r['recall'])
+
+    def test_benchmark_check_image(self):
+        corpus = SyntheticCorpus(1000, 10, 5, 3)
+        r = benchmark_check_image('mih', corpus, corpus.queries(10), get_search_settings(92))
+        self.assertEqual(10, r['searches'])
+        self.assertGreater(r['avg_matches'], 0)
+        self.assertIn('total_search_time', r['stages'])
+
+    def test_check_gates(self):
+        result = {
+            'engines': [{'engine': 'mih', 'recall': 0.9}],
+            'check_image': {'stages': {'total_search_time': {'p99': 0.5}}}
+        }
+        self.assertEqual([], check_gates(result))
+        self.assertEqual(2, len(check_gates(result, min_recall=1.0, max_p99=0.1)))
+
+    def test_main(self):
+        self.assertEqual(0, main(['--size', '1000', '--clusters', '10', '--cluster-size', '5', '--searches', '5', '--min-recall', '1']))
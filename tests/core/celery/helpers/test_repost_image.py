@@ -0,0 +1,43 @@
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from sqlalchemy.exc import IntegrityError
+
+from redditrepostsleuth.core.celery.helpers.repost_image import save_image_repost_results
+from redditrepostsleuth.core.db.databasemodels import Post
+from redditrepostsleuth.core.model.search.image_search_results import ImageSearchResults
+from redditrepostsleuth.core.model.search.image_search_match import ImageSearchMatch
+
+
+class TestRepostImage(TestCase):
+
+    def _get_uowm(self):
+        uow = MagicMock()
+        uow.__enter__.return_value = uow
+        uowm = MagicMock()
+        uowm.start.return_value = uow
+        return uowm, uow
+
+    def _get_result(self, post_id, matches=True):
+        result = ImageSearchResults('', MagicMock(), checked_post=Post(post_id=post_id, url=f'{post_id}.jpg'))
+        if matches:
+            result.matches = [ImageSearchMatch('', 1, Post(post_id='old', url='old.jpg'), 1, 0.1, 64)]
+        return result
+
+    def test_save_image_repost_results_single_transaction(self):
+        uowm, uow = self._get_uowm()
+        results = [self._get_result('1'), self._get_result('2', matches=False)]
+        self.assertEqual([], save_image_repost_results(results, uowm))
+        uow.commit.assert_called_once()
+        self.assertEqual(2, uow.posts.update.call_count)
+        self.assertEqual(1, uow.image_repost.add.call_count)
+        self.assertTrue(all(r.checked_post.checked_repost for r in results))
+
+    def test_save_image_repost_results_falls_back_to_single(self):
+        uowm, uow = self._get_uowm()
+        uow.commit.side_effect = [IntegrityError('', '', ''), None, IntegrityError('', '', '')]
+        results = [self._get_result('1'), self._get_result('2')]
+        save_image_repost_results(results, uowm)
+        self.assertEqual(3, uow.commit.call_count)
+        self.assertEqual(2, uow.rollback.call_count)
+        self.assertEqual(4, uow.image_repost.add.call_count)
@@ -0,0 +1,45 @@
+from datetime import datetime
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from sqlalchemy.dialects import mysql
+
+from redditrepostsleuth.core.db.databasemodels import Post
+from redditrepostsleuth.core.db.repository.link_url_stats_repo import LinkUrlStatsRepo
+
+
+class TestLinkUrlStatsRepo(TestCase):
+
+    def test_add_shares_aggregates_batch(self):
+        session = MagicMock()
+        repo = LinkUrlStatsRepo(session)
+        r = repo.add_shares([
+            Post(post_id='b', url_hash='aaa', created_at=datetime(2020, 1, 2)),
+            Post(post_id='a', url_hash='aaa', created_at=datetime(2020, 1, 1)),
+            Post(post_id='c', url_hash='aaa', created_at=datetime(2020, 1, 3)),
+            Post(post_id='d', url_hash='bbb', created_at=datetime(2020, 1, 1)),
+            Post(post_id='e', url_hash=None),
+        ])
+        self.assertEqual(2, r)
+        session.execute.assert_called_once()
+        params = session.execute.call_args[0][0].compile(dialect=mysql.dialect()).params
+        self.assertEqual('a', params['first_post_id_m0'])
+        self.assertEqual('c', params['last_post_id_m0'])
+        self.assertEqual(3, params['share_count_m0'])
+        self.assertEqual(1, params['share_count_m1'])
+
+    def test_add_shares_sorted_by_url_hash(self):
+        session = MagicMock()
+        LinkUrlStatsRepo(session).add_shares([
+            Post(post_id='a', url_hash='ccc', created_at=datetime(2020, 1, 1)),
+            Post(post_id='b', url_hash='aaa', created_at=datetime(2020, 1, 1)),
+            Post(post_id='c', url_hash='bbb', created_at=datetime(2020, 1, 1)),
+        ])
+        params = session.execute.call_args[0][0].compile(dialect=mysql.dialect()).params
+        self.assertEqual(['aaa', 'bbb', 'ccc'], [params[f'url_hash_m{i}'] for i in range(3)])
+
+    def test_add_shares_no_links_no_query(self):
+        session = MagicMock()
+        repo = LinkUrlStatsRepo(session)
+        self.assertEqual(0, repo.add_shares([Post(post_id='a')]))
+        session.execute.assert_not_called()
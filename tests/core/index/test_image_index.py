@@ -0,0 +1,80 @@
+import random
+from unittest import TestCase
+
+from distance import hamming
+
+from redditrepostsleuth.core.index.linear_image_index import LinearImageIndex
+from redditrepostsleuth.core.index.mih_image_index import MultiIndexHashImageIndex
+
+HEX_CHARS = '0123456789abcdef'
+
+
+def get_synthetic_corpus(clusters: int = 20, cluster_size: int = 10, noise: int = 500, seed: int = 1):
+    """
+    Build a corpus of random hashes with clusters of near duplicates
+    :return: List of (id, hash) and the cluster centers
+    """
+    rand = random.Random(seed)
+    corpus = []
+    centers = []
+    for _ in range(clusters):
+        center = ''.join(rand.choice(HEX_CHARS) for _ in range(64))
+        centers.append(center)
+        for _ in range(cluster_size):
+            near = list(center)
+            for pos in rand.sample(range(64), rand.randint(0, 12)):
+                near[pos] = rand.choice(HEX_CHARS)
+            corpus.append(''.join(near))
+    for _ in range(noise):
+        corpus.append(''.join(rand.choice(HEX_CHARS) for _ in range(64)))
+    return list(enumerate(corpus, start=1)), centers
+
+
+def brute_force(corpus, target, max_distance):
+    return sorted(i for i, h in corpus if hamming(target, h) <= max_distance)
+
+
+class TestImageIndex(TestCase):
+
+    def _build(self, index_class, corpus):
+        index = index_class()
+        index.build([i for i, _ in corpus], [h for _, h in corpus])
+        return index
+
+    def test_linear_search_matches_brute_force(self):
+        corpus, centers = get_synthetic_corpus()
+        index = self._build(LinearImageIndex, corpus)
+        for center in centers:
+            r = index.search(center, 8)
+            self.assertEqual(brute_force(corpus, center, 8), sorted(i for i, _ in r))
+
+    def test_mih_search_matches_brute_force(self):
+        corpus, centers = get_synthetic_corpus()
+        index = self._build(MultiIndexHashImageIndex, corpus)
+        for distance in (0, 5, 16, 20, 40):
+            for center in centers:
+                r = index.search(center, distance)
+                self.assertEqual(brute_force(corpus, center, distance), sorted(i for i, _ in r))
+
+    def test_mih_search_sorted_by_distance_and_limited(self):
+        corpus, centers = get_synthetic_corpus()
+        index = self._build(MultiIndexHashImageIndex, corpus)
+        r = index.search(centers[0], 12, max_results=3)
+        self.assertEqual(3, len(r))
+        self.assertEqual(sorted(d for _, d in r), [d for _, d in r])
+        for match_id, distance in r:
+            self.assertEqual(hamming(centers[0], corpus[match_id - 1][1]), distance)
+
+    def test_search_wrong_hash_length_returns_empty(self):
+        corpus, _ = get_synthetic_corpus(clusters=1, noise=0)
+        index = self._build(MultiIndexHashImageIndex, corpus)
+        self.assertEqual([], index.search('abc', 5))
+
+    def test_search_empty_index(self):
+        index = self._build(MultiIndexHashImageIndex, [])
+        self.assertEqual([], index.search('a' * 64, 5))
+        self.assertEqual(0, len(index))
+
+    def test_build_mismatched_ids_hashes(self):
+        index = LinearImageIndex()
+        self.assertRaises(ValueError, index.build, [1, 2], ['a' * 64])
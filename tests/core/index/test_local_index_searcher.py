@@ -0,0 +1,106 @@
+from datetime import datetime, timedelta
+from time import sleep
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from redditrepostsleuth.core.index.linear_image_index import LinearImageIndex
+from redditrepostsleuth.core.index.local_index_searcher import LocalIndexSearcher
+from redditrepostsleuth.core.model.image_index_api_result import ImageIndexApiResult
+
+
+class TestLocalIndexSearcher(TestCase):
+
+    def _get_searcher(self, historical_rows, current_rows, background=False, **config):
+        def page(rows):
+            # Rows are (id, hex hash).  Rows with odd IDs are returned with the binary hash like backfilled rows
+            rows = [(r[0], bytes.fromhex(r[1]) if r[1] and r[0] % 2 else None, r[1]) for r in rows]
+
+            def _page(limit=None, id=0):
+                return [r for r in rows if r[0] > id][:limit]
+            return _page
+        uow = MagicMock()
+        uow.image_post.find_all_images_with_binary_hash.side_effect = page(historical_rows)
+        uow.image_post_current.find_all_images_with_binary_hash.side_effect = page(current_rows)
+        uow.__enter__.return_value = uow
+        uowm = MagicMock()
+        uowm.start.return_value = uow
+        settings = {'image_index_engine': 'mih', 'index_historical_max_age': None, 'index_current_max_age': None}
+        settings.update(config)
+        return LocalIndexSearcher(uowm, MagicMock(**settings), page_size=2, background=background)
+
+    def test_search_returns_api_result(self):
+        target = 'a' * 64
+        searcher = self._get_searcher(
+            [(1, target), (2, 'b' * 64), (3, 'a' * 60 + 'bbbb'), (4, None), (6, 'a' * 62 + 'cc'), (8, 'abc')],
+            [(10, 'a' * 63 + 'b')]
+        )
+        r = searcher.search(target, 5, max_matches=10)
+        self.assertIsInstance(r, ImageIndexApiResult)
+        self.assertEqual([1, 6, 3], [m['id'] for m in r.historical_matches])
+        self.assertEqual(0, r.historical_matches[0]['distance'])
+        self.assertEqual(2 / 64, r.historical_matches[1]['distance'])
+        self.assertEqual(4 / 64, r.historical_matches[2]['distance'])
+        self.assertEqual([10], [m['id'] for m in r.current_matches])
+        self.assertEqual(5, r.total_searched)
+        self.assertTrue(r.used_historical_index)
+        self.assertTrue(r.used_current_index)
+
+    def test_search_reuses_index_until_expired(self):
+        searcher = self._get_searcher([(1, 'a' * 64)], [], index_current_max_age=60)
+        searcher.search('a' * 64, 1)
+        historical, current = searcher.historical_index, searcher.current_index
+        searcher.search('a' * 64, 1)
+        self.assertIs(historical, searcher.historical_index)
+        self.assertIs(current, searcher.current_index)
+        current.built_at = datetime.utcnow() - timedelta(seconds=61)
+        searcher.search('a' * 64, 1)
+        self.assertIs(historical, searcher.historical_index)
+        self.assertIsNot(current, searcher.current_index)
+
+    def test_search_calls_on_current_rebuild(self):
+        searcher = self._get_searcher([(1, 'a' * 64)], [], index_current_max_age=60)
+        searcher.on_current_rebuild = MagicMock()
+        searcher.search('a' * 64, 1)
+        searcher.on_current_rebuild.assert_not_called()
+        searcher.current_index.built_at = datetime.utcnow() - timedelta(seconds=61)
+        searcher.search('a' * 64, 1)
+        searcher.on_current_rebuild.assert_called_once()
+
+    def test_search_rebuilds_in_background(self):
+        searcher = self._get_searcher([(1, 'a' * 64)], [], background=True, index_current_max_age=60)
+        searcher.on_current_rebuild = MagicMock()
+        searcher.search('a' * 64, 1)
+        current = searcher.current_index
+        current.built_at = datetime.utcnow() - timedelta(seconds=61)
+        r = searcher.search('a' * 64, 1)
+        self.assertEqual([1], [m['id'] for m in r.historical_matches])
+        for _ in range(100):
+            if not searcher._rebuilding:
+                break
+            sleep(0.01)
+        self.assertIsNot(current, searcher.current_index)
+        searcher.on_current_rebuild.assert_called_once()
+
+    def test_rebuild_failure_keeps_old_index(self):
+        searcher = self._get_searcher([(1, 'a' * 64)], [], index_current_max_age=60)
+        searcher.search('a' * 64, 1)
+        current = searcher.current_index
+        current.built_at = datetime.utcnow() - timedelta(seconds=61)
+        searcher._build_index = MagicMock(side_effect=Exception('ouch'))
+        searcher.search('a' * 64, 1)
+        self.assertIs(current, searcher.current_index)
+
+    def test_start_loads_indexes(self):
+        searcher = self._get_searcher([(1, 'a' * 64)], [(2, 'b' * 64)])
+        searcher.start()
+        self.assertEqual(1, len(searcher.historical_index))
+        self.assertEqual(1, len(searcher.current_index))
+        self.assertIsNotNone(searcher.meme_index)
+
+    def test__is_expired_no_index(self):
+        self.assertTrue(LocalIndexSearcher._is_expired(None, None))
+
+    def test__is_expired_no_max_age(self):
+        index = LinearImageIndex()
+        index.build([], [])
+        self.assertFalse(LocalIndexSearcher._is_expired(index, None))
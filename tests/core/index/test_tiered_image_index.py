@@ -0,0 +1,135 @@
+from datetime import datetime, timedelta
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from redditrepostsleuth.core.index.mih_image_index import MultiIndexHashImageIndex
+from redditrepostsleuth.core.index.tiered_image_index import TieredImageIndex
+from redditrepostsleuth.core.index.tiered_index_searcher import TieredIndexSearcher
+
+
+class FakeTable:
+    def __init__(self, rows=None):
+        self.rows = rows or []
+
+    def load(self, last_id):
+        rows = [r for r in self.rows if r[0] > last_id]
+        return [r[0] for r in rows], [bytes.fromhex(r[1]) for r in rows], rows[-1][0] if rows else last_id
+
+
+class TestTieredImageIndex(TestCase):
+
+    def _get_index(self, rows, **kwargs):
+        table = FakeTable(rows)
+        return table, TieredImageIndex('test', MultiIndexHashImageIndex, table.load, 64, **kwargs)
+
+    def test_search_includes_hot_rows(self):
+        table, index = self._get_index([(1, 'a' * 64)])
+        index.load()
+        table.rows.append((2, 'a' * 63 + 'b'))
+        self.assertEqual(1, index.refresh())
+        self.assertEqual([(1, 0), (2, 1)], index.search('a' * 64, 2))
+        self.assertEqual(2, len(index))
+        self.assertEqual(0, index.refresh())
+
+    def test_refresh_swaps_generation(self):
+        table, index = self._get_index([(1, 'a' * 64)])
+        index.load()
+        generation = index.generation
+        table.rows.append((2, 'b' * 64))
+        index.refresh()
+        self.assertEqual(generation.number + 1, index.generation.number)
+        self.assertEqual(2, index.generation.last_id)
+
+    def test_compact(self):
+        table, index = self._get_index([(1, 'a' * 64)], compact_size=2)
+        index.load()
+        table.rows += [(2, 'a' * 63 + 'b'), (3, 'c' * 64)]
+        index.refresh()
+        self.assertTrue(index.compact())
+        self.assertEqual(2, len(index.generation.segments))
+        self.assertEqual(0, len(index.generation.hot))
+        self.assertEqual([(1, 0), (2, 1)], index.search('a' * 64, 2))
+        self.assertFalse(index.compact())
+
+    def test_compact_merges_segments(self):
+        table, index = self._get_index([(1, 'a' * 64)], compact_size=1, max_segments=2)
+        index.load()
+        for i in range(2, 5):
+            table.rows.append((i, 'a' * 63 + str(i)))
+            index.refresh()
+            index.compact()
+        self.assertEqual(2, len(index.generation.segments))
+        self.assertEqual([1, 2, 3, 4], [r[0] for r in index.search('a' * 64, 1)])
+
+    def test_load_keeps_newer_hot_rows(self):
+        table, index = self._get_index([(1, 'a' * 64)])
+        index.load()
+        table.rows.append((2, 'b' * 64))
+        index.refresh()
+        table.rows.pop()
+        index.load()
+        self.assertEqual([(2, 0)], index.search('b' * 64, 0))
+        self.assertEqual(1, len(index.generation.hot))
+
+    def test_search_max_results(self):
+        table, index = self._get_index([(1, 'a' * 64), (2, 'a' * 63 + 'b')])
+        index.load()
+        table.rows.append((3, 'a' * 62 + 'bb'))
+        index.refresh()
+        self.assertEqual([(1, 0), (2, 1)], index.search('a' * 64, 5, max_results=2))
+
+
+class TestTieredIndexSearcher(TestCase):
+
+    def _get_searcher(self, historical, current, **config):
+        uow = MagicMock()
+        uow.image_post.find_all_images_with_binary_hash.side_effect = \
+            lambda limit=None, id=0: [(r[0], bytes.fromhex(r[1]), r[1]) for r in historical if r[0] > id][:limit]
+        uow.image_post_current.find_all_images_with_binary_hash.side_effect = \
+            lambda limit=None, id=0: [(r[0], bytes.fromhex(r[1]), r[1]) for r in current if r[0] > id][:limit]
+        uow.__enter__.return_value = uow
+        uowm = MagicMock()
+        uowm.start.return_value = uow
+        settings = {
+            'image_index_engine': 'mih',
+            'image_index_hot_refresh': 0,
+            'image_index_compact_size': 2,
+            'index_historical_max_age': None,
+            'index_current_max_age': 60
+        }
+        settings.update(config)
+        return TieredIndexSearcher(uowm, MagicMock(**settings), page_size=2, background=False)
+
+    def test_search_picks_up_new_rows(self):
+        historical, current = [(1, 'a' * 64)], []
+        searcher = self._get_searcher(historical, current)
+        self.assertEqual([1], [m['id'] for m in searcher.search('a' * 64, 1).historical_matches])
+        current.append((5, 'a' * 63 + 'b'))
+        r = searcher.search('a' * 64, 1)
+        self.assertEqual([5], [m['id'] for m in r.current_matches])
+        self.assertEqual(2, r.total_searched)
+
+    def test_current_reload_calls_on_current_rebuild(self):
+        searcher = self._get_searcher([(1, 'a' * 64)], [(1, 'a' * 64)])
+        searcher.on_current_rebuild = MagicMock()
+        searcher.search('a' * 64, 1)
+        searcher.on_current_rebuild.assert_not_called()
+        searcher.current_index.generation.built_at = datetime.utcnow() - timedelta(seconds=61)
+        searcher.search('a' * 64, 1)
+        searcher.on_current_rebuild.assert_called_once()
+
+    def test_compaction_does_not_call_on_current_rebuild(self):
+        searcher = self._get_searcher([(1, 'a' * 64)], [(1, 'a' * 64)])
+        searcher.on_current_rebuild = MagicMock()
+        searcher.search('a' * 64, 1)
+        searcher.current_index.refresh = MagicMock()
+        searcher.current_index.compact = MagicMock(return_value=True)
+        searcher.maintain()
+        searcher.current_index.compact.assert_called_once()
+        searcher.on_current_rebuild.assert_not_called()
+
+    def test_start_loads_indexes(self):
+        searcher = self._get_searcher([(1, 'a' * 64)], [(2, 'b' * 64)])
+        searcher.start()
+        self.assertEqual(1, len(searcher.historical_index))
+        self.assertEqual(1, len(searcher.current_index))
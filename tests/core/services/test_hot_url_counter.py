@@ -0,0 +1,121 @@
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from redis.exceptions import RedisError
+
+from redditrepostsleuth.core.services.hot_url_counter import HotUrlCounter, get_hot_url_counter, ZADD_MAX_SCRIPT
+
+
+class FakeRedis:
+    def __init__(self):
+        self.counters = {}
+        self.sorted_sets = {}
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def execute_command(self, *args):
+        assert args[0] == 'BITFIELD'
+        args = list(args[2:])
+        results = []
+        while args:
+            op = args.pop(0)
+            if op == 'OVERFLOW':
+                args.pop(0)
+            elif op == 'INCRBY':
+                _, position, count = args.pop(0), args.pop(0), args.pop(0)
+                self.counters[position] = min(self.counters.get(position, 0) + count, 2 ** 32 - 1)
+                results.append(self.counters[position])
+            elif op == 'GET':
+                _, position = args.pop(0), args.pop(0)
+                results.append(self.counters.get(position, 0))
+        return results
+
+    def eval(self, script, numkeys, *args):
+        assert script == ZADD_MAX_SCRIPT
+        sorted_set = self.sorted_sets.setdefault(args[0], {})
+        for score, member in zip(args[1::2], args[2::2]):
+            if member not in sorted_set or score > sorted_set[member]:
+                sorted_set[member] = score
+
+    def zremrangebyrank(self, name, start, end):
+        ranked = sorted(self.sorted_sets.get(name, {}).items(), key=lambda x: x[1])
+        for member, _ in ranked[start:len(ranked) + end + 1]:
+            del self.sorted_sets[name][member]
+
+    def zscore(self, name, member):
+        return self.sorted_sets.get(name, {}).get(member)
+
+    def zrevrange(self, name, start, end, withscores=False):
+        ranked = sorted(self.sorted_sets.get(name, {}).items(), key=lambda x: x[1], reverse=True)
+        return ranked[start:end + 1]
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.commands.append((name, args, kwargs))
+
+    def execute(self):
+        return [getattr(self.redis, name)(*args, **kwargs) for name, args, kwargs in self.commands]
+
+
+class TestHotUrlCounter(TestCase):
+
+    def test_add_counts_repeats(self):
+        counter = HotUrlCounter(FakeRedis(), width=1024)
+        counter.add(['aaa', 'aaa', 'bbb'])
+        counter.add(['aaa', None])
+        self.assertEqual(3, counter.estimate('aaa'))
+        self.assertEqual(1, counter.estimate('bbb'))
+        self.assertEqual(0, counter.estimate('ccc'))
+
+    def test_get_hot_over_threshold(self):
+        counter = HotUrlCounter(FakeRedis(), width=1024, hot_threshold=3)
+        counter.add(['aaa'] * 3 + ['bbb'] * 2)
+        self.assertEqual({'aaa'}, counter.get_hot(['aaa', 'bbb', 'ccc', None]))
+        self.assertTrue(counter.is_hot('aaa'))
+        self.assertFalse(counter.is_hot('bbb'))
+
+    def test_top_set_trimmed_to_top_k(self):
+        counter = HotUrlCounter(FakeRedis(), width=1024, top_k=2)
+        counter.add(['aaa'] * 5 + ['bbb'] * 3 + ['ccc'])
+        self.assertEqual([('aaa', 5), ('bbb', 3)], counter.top())
+
+    def test_mark_hot(self):
+        counter = HotUrlCounter(FakeRedis(), width=1024, hot_threshold=10000)
+        counter.mark_hot('aaa', 12000)
+        self.assertTrue(counter.is_hot('aaa'))
+
+    def test_add_keeps_mark_hot_count(self):
+        counter = HotUrlCounter(FakeRedis(), width=1024, hot_threshold=10000)
+        counter.mark_hot('aaa', 12000)
+        counter.add(['aaa'])
+        self.assertTrue(counter.is_hot('aaa'))
+        self.assertEqual([('aaa', 12000)], counter.top())
+
+    def test_mark_hot_does_not_lower_count(self):
+        counter = HotUrlCounter(FakeRedis(), width=1024)
+        counter.add(['aaa'] * 5)
+        counter.mark_hot('aaa', 2)
+        self.assertEqual([('aaa', 5)], counter.top())
+
+    def test_positions_one_per_row(self):
+        counter = HotUrlCounter(FakeRedis(), width=1024, depth=4)
+        positions = counter._positions('aaa')
+        self.assertEqual(4, len(positions))
+        for row, position in enumerate(positions):
+            self.assertTrue(row * 1024 <= position < (row + 1) * 1024)
+
+    def test_redis_error_not_hot(self):
+        redis_client = MagicMock()
+        redis_client.pipeline.return_value.execute.side_effect = RedisError('ouch')
+        counter = HotUrlCounter(redis_client)
+        counter.add(['aaa'])
+        self.assertEqual(set(), counter.get_hot(['aaa']))
+
+    def test_get_hot_url_counter_disabled(self):
+        self.assertIsNone(get_hot_url_counter(MagicMock(hot_url_counter=False)))
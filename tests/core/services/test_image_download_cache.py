@@ -0,0 +1,105 @@
+import os
+import tempfile
+from io import BytesIO
+from time import time
+from unittest import TestCase, mock
+from unittest.mock import MagicMock
+from urllib.error import HTTPError
+
+from redditrepostsleuth.core.services.image_download_cache import ImageDownloadCache
+from redditrepostsleuth.core.util.imagehashing import download_image
+
+
+class TestImageDownloadCache(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache = ImageDownloadCache(self.tmp_dir.name, revalidate_after=60)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_get_miss(self):
+        self.assertIsNone(self.cache.get('http://example.com/a.jpg'))
+
+    def test_set_get(self):
+        self.cache.set('http://example.com/a.jpg', b'abc', etag='"1"', last_modified='Mon')
+        r = self.cache.get('http://example.com/a.jpg')
+        self.assertEqual(b'abc', r.data)
+        self.assertEqual('"1"', r.etag)
+        self.assertEqual('Mon', r.last_modified)
+        self.assertTrue(r.fresh)
+
+    def test_set_same_content_shares_blob(self):
+        d1 = self.cache.set('http://example.com/a.jpg', b'abc')
+        d2 = self.cache.set('http://example.com/b.jpg', b'abc')
+        self.assertEqual(d1, d2)
+        self.cache.set_hashes('http://example.com/a.jpg', 'hashes', {'dhash_h': 'aa'})
+        self.assertEqual({'dhash_h': 'aa'}, self.cache.get_hashes('http://example.com/b.jpg', 'hashes'))
+
+    def test_get_stale(self):
+        self.cache.set('http://example.com/a.jpg', b'abc')
+        self.cache.revalidate_after = 0
+        self.assertFalse(self.cache.get('http://example.com/a.jpg').fresh)
+        self.assertFalse(self.cache.is_fresh('http://example.com/a.jpg'))
+        self.assertIsNone(self.cache.get_hashes('http://example.com/a.jpg', 'hashes'))
+
+    def test_mark_validated(self):
+        self.cache.set('http://example.com/a.jpg', b'abc')
+        meta = self.cache._read_meta('http://example.com/a.jpg')
+        meta['validated_at'] = time() - 120
+        self.cache._write_meta('http://example.com/a.jpg', meta)
+        self.assertFalse(self.cache.is_fresh('http://example.com/a.jpg'))
+        self.cache.mark_validated('http://example.com/a.jpg')
+        self.assertTrue(self.cache.is_fresh('http://example.com/a.jpg'))
+
+    def test_evict_removes_least_recently_used(self):
+        self.cache.set('http://example.com/a.jpg', b'a' * 6)
+        self.cache.set('http://example.com/b.jpg', b'b' * 6)
+        old = time() - 100
+        os.utime(self.cache._blob_path(self.cache._read_meta('http://example.com/a.jpg')['digest']), (old, old))
+        self.cache.max_size = 10
+        self.cache.evict()
+        self.assertIsNone(self.cache.get('http://example.com/a.jpg'))
+        self.assertIsNone(self.cache._read_meta('http://example.com/a.jpg'))
+        self.assertEqual(b'b' * 6, self.cache.get('http://example.com/b.jpg').data)
+        self.assertEqual(6, self.cache._update_size())
+
+    def test_set_evicts_when_over_max_size(self):
+        self.cache.max_size = 10
+        self.cache.set('http://example.com/a.jpg', b'a' * 6)
+        self.cache.set('http://example.com/c.jpg', b'a' * 6)
+        self.assertEqual(6, self.cache._update_size())
+        old = time() - 100
+        os.utime(self.cache._blob_path(self.cache._read_meta('http://example.com/a.jpg')['digest']), (old, old))
+        self.cache.set('http://example.com/b.jpg', b'b' * 6)
+        self.assertIsNone(self.cache._read_meta('http://example.com/a.jpg'))
+        self.assertIsNone(self.cache._read_meta('http://example.com/c.jpg'))
+        self.assertEqual(b'b' * 6, self.cache.get('http://example.com/b.jpg').data)
+        self.assertEqual(1, len(os.listdir(os.path.join(self.tmp_dir.name, 'urls'))))
+
+    def test_size_counted_on_startup(self):
+        self.cache.set('http://example.com/a.jpg', b'a' * 6)
+        os.remove(self.cache._size_path)
+        cache = ImageDownloadCache(self.tmp_dir.name)
+        self.assertEqual(6, cache._update_size())
+
+    def _response(self, data, headers=None):
+        return MagicMock(read=MagicMock(return_value=data), headers=headers or {})
+
+    def test_download_image_uses_fresh_cache(self):
+        with mock.patch('redditrepostsleuth.core.util.imagehashing.get_image_download_cache', return_value=self.cache), \
+                mock.patch('redditrepostsleuth.core.util.imagehashing.request.urlopen') as urlopen:
+            urlopen.return_value = self._response(b'abc', {'ETag': '"1"'})
+            self.assertEqual(b'abc', download_image('http://example.com/a.jpg'))
+            self.assertEqual(b'abc', download_image('http://example.com/a.jpg'))
+            urlopen.assert_called_once()
+
+    def test_download_image_revalidates_stale(self):
+        self.cache.set('http://example.com/a.jpg', b'abc', etag='"1"')
+        self.cache.revalidate_after = 0
+        with mock.patch('redditrepostsleuth.core.util.imagehashing.get_image_download_cache', return_value=self.cache), \
+                mock.patch('redditrepostsleuth.core.util.imagehashing.request.urlopen') as urlopen:
+            urlopen.side_effect = HTTPError('http://example.com/a.jpg', 304, 'Not Modified', {}, BytesIO())
+            self.assertEqual(b'abc', download_image('http://example.com/a.jpg'))
+            self.assertEqual('"1"', urlopen.call_args[0][0].get_header('If-none-match'))
@@ -0,0 +1,105 @@
+from unittest import TestCase, mock
+from unittest.mock import MagicMock
+
+from redditrepostsleuth.core.db.databasemodels import Post
+from redditrepostsleuth.core.services.ingest_scheduler import IngestScheduler, IngestLane, PRIORITY_LANE, \
+    FIREHOSE_LANE
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def lrange(self, key, start, end):
+        self.commands.append(lambda: self.redis.lists.get(key, [])[start:end + 1])
+
+    def ltrim(self, key, start, end):
+        def trim():
+            self.redis.lists[key] = self.redis.lists.get(key, [])[start:]
+            return True
+        self.commands.append(trim)
+
+    def execute(self):
+        return [command() for command in self.commands]
+
+
+class FakeRedis:
+    def __init__(self):
+        self.lists = {}
+
+    def rpush(self, key, *values):
+        self.lists.setdefault(key, []).extend(values)
+
+    def llen(self, key):
+        return len(self.lists.get(key, []))
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+def get_posts(prefix, count):
+    return [Post(post_id=f'{prefix}{i}') for i in range(count)]
+
+
+class TestIngestScheduler(TestCase):
+
+    def setUp(self):
+        self.lanes = [
+            IngestLane(PRIORITY_LANE, 2, 'postingest_priority', False),
+            IngestLane(FIREHOSE_LANE, 1, 'postingest', True),
+        ]
+        self.scheduler = IngestScheduler(FakeRedis(), lanes=self.lanes, quantum=2)
+
+    def _sent(self, send_batch):
+        return [(c[0][0].name, [p.post_id for p in c[0][1]]) for c in send_batch.call_args_list]
+
+    def test_submit_unknown_lane(self):
+        with self.assertRaises(ValueError):
+            self.scheduler.submit(get_posts('a', 1), 'bulk')
+
+    def test_dispatch_weighted(self):
+        self.scheduler.submit(get_posts('f', 10), FIREHOSE_LANE)
+        self.scheduler.submit(get_posts('p', 10), PRIORITY_LANE)
+        send_batch = MagicMock()
+        self.assertEqual(6, self.scheduler.dispatch(send_batch))
+        self.assertEqual(
+            [(PRIORITY_LANE, ['p0', 'p1']), (PRIORITY_LANE, ['p2', 'p3']), (FIREHOSE_LANE, ['f0', 'f1'])],
+            self._sent(send_batch)
+        )
+        self.assertEqual(6, self.scheduler.depth(PRIORITY_LANE))
+        self.assertEqual(8, self.scheduler.depth(FIREHOSE_LANE))
+
+    def test_dispatch_firehose_not_starved(self):
+        self.scheduler.submit(get_posts('f', 2), FIREHOSE_LANE)
+        self.scheduler.submit(get_posts('p', 100), PRIORITY_LANE)
+        send_batch = MagicMock()
+        self.scheduler.dispatch(send_batch)
+        self.assertEqual(0, self.scheduler.depth(FIREHOSE_LANE))
+
+    def test_dispatch_throttle_skips_throttled_lanes(self):
+        self.scheduler.submit(get_posts('f', 2), FIREHOSE_LANE)
+        self.scheduler.submit(get_posts('p', 1), PRIORITY_LANE)
+        send_batch = MagicMock()
+        self.assertEqual(1, self.scheduler.dispatch(send_batch, throttle=True))
+        self.assertEqual([(PRIORITY_LANE, ['p0'])], self._sent(send_batch))
+        self.assertEqual(2, self.scheduler.depth(FIREHOSE_LANE))
+
+    def test_dispatch_idle_lane_does_not_bank_credit(self):
+        send_batch = MagicMock()
+        self.scheduler.dispatch(send_batch)
+        self.scheduler.dispatch(send_batch)
+        self.scheduler.submit(get_posts('p', 10), PRIORITY_LANE)
+        self.assertEqual(4, self.scheduler.dispatch(send_batch))
+
+    def test_flush_metrics(self):
+        event_logger = MagicMock()
+        scheduler = IngestScheduler(FakeRedis(), lanes=self.lanes, quantum=2, event_logger=event_logger)
+        with mock.patch('redditrepostsleuth.core.services.ingest_scheduler.time', side_effect=[100, 103, 103]):
+            scheduler.submit(get_posts('p', 1), PRIORITY_LANE)
+            scheduler.dispatch(MagicMock())
+        scheduler.flush_metrics()
+        events = {c[0][0].lane: c[0][0] for c in event_logger.save_event.call_args_list}
+        self.assertEqual(1, events[PRIORITY_LANE].dispatched)
+        self.assertEqual(3, events[PRIORITY_LANE].max_lag)
+        self.assertEqual(0, events[FIREHOSE_LANE].dispatched)
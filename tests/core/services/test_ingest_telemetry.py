@@ -0,0 +1,71 @@
+from datetime import datetime, timedelta
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from redditrepostsleuth.core.db.databasemodels import Post
+from redditrepostsleuth.core.services.ingest_telemetry import IngestTelemetry
+
+
+class TestIngestTelemetry(TestCase):
+
+    def _get_events(self, event_logger):
+        return [c[0][0] for c in event_logger.save_event.call_args_list]
+
+    def test_record_saved_lag_per_source(self):
+        event_logger = MagicMock()
+        telemetry = IngestTelemetry(event_logger, flush_interval=1000)
+        now = datetime.utcnow()
+        telemetry.record_saved([
+            Post(post_id='1', ingested_from='praw', created_at=now - timedelta(seconds=30)),
+            Post(post_id='2', ingested_from='praw', created_at=now - timedelta(seconds=30)),
+            Post(post_id='3', ingested_from='pushshift', created_at=now - timedelta(hours=2)),
+        ])
+        telemetry.flush()
+        events = {e.source: e for e in self._get_events(event_logger)}
+        self.assertEqual(2, events['praw'].count)
+        self.assertAlmostEqual(30, events['praw'].timings['lag']['p50'], delta=1)
+        self.assertAlmostEqual(7200, events['pushshift'].timings['lag']['max'], delta=2)
+
+    def test_record_queue_wait(self):
+        event_logger = MagicMock()
+        telemetry = IngestTelemetry(event_logger, flush_interval=1000)
+        telemetry.record_queue_wait([Post(ingested_from='praw'), Post(ingested_from='praw')], 2.5)
+        telemetry.flush()
+        event = self._get_events(event_logger)[0]
+        self.assertEqual(0, event.count)
+        self.assertEqual(1, event.timings['queue_wait']['count'])
+        self.assertAlmostEqual(2.5, event.timings['queue_wait']['p50'], delta=0.05)
+
+    def test_record_hash_failure_by_domain(self):
+        event_logger = MagicMock()
+        telemetry = IngestTelemetry(event_logger, flush_interval=1000)
+        telemetry.record_hash_failure('https://i.redd.it/a.jpg')
+        telemetry.record_hash_failure('https://i.redd.it/b.jpg')
+        telemetry.record_hash_failure('https://I.IMGUR.com/c.jpg')
+        telemetry.flush()
+        failures = {e.domain: e.count for e in self._get_events(event_logger)}
+        self.assertEqual({'i.redd.it': 2, 'i.imgur.com': 1}, failures)
+
+    def test_flush_resets(self):
+        event_logger = MagicMock()
+        telemetry = IngestTelemetry(event_logger, flush_interval=1000)
+        telemetry.record_saved([Post(ingested_from='praw', created_at=datetime.utcnow())])
+        telemetry.flush()
+        telemetry.flush()
+        self.assertEqual(1, event_logger.save_event.call_count)
+
+    def test_record_saved_flushes_on_interval(self):
+        event_logger = MagicMock()
+        telemetry = IngestTelemetry(event_logger, flush_interval=0)
+        telemetry.record_saved([Post(ingested_from='praw', created_at=datetime.utcnow())])
+        event_logger.save_event.assert_called_once()
+
+    def test_influx_event(self):
+        event_logger = MagicMock()
+        telemetry = IngestTelemetry(event_logger, flush_interval=1000)
+        telemetry.record_saved([Post(ingested_from='praw', created_at=datetime.utcnow())])
+        telemetry.flush()
+        event = self._get_events(event_logger)[0].get_influx_event()[0]
+        self.assertEqual('praw', event['tags']['source'])
+        self.assertEqual(1, event['fields']['count'])
+        self.assertIn('lag_p99', event['fields'])
@@ -0,0 +1,102 @@
+from unittest import TestCase, mock
+from unittest.mock import MagicMock
+
+from redis.exceptions import RedisError
+
+from redditrepostsleuth.core.services.post_deduplicator import PostDeduplicator
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def setbit(self, key, offset, value):
+        self.commands.append(('setbit', key, offset, value))
+
+    def getbit(self, key, offset):
+        self.commands.append(('getbit', key, offset))
+
+    def expire(self, key, seconds):
+        self.commands.append(('expire', key, seconds))
+
+    def execute(self):
+        results = []
+        for command in self.commands:
+            bits = self.redis.keys.setdefault(command[1], set())
+            if command[0] == 'setbit':
+                results.append(1 if command[2] in bits else 0)
+                bits.add(command[2])
+            elif command[0] == 'getbit':
+                results.append(1 if command[2] in bits else 0)
+            else:
+                results.append(True)
+        return results
+
+
+class FakeRedis:
+    def __init__(self):
+        self.keys = {}
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class TestPostDeduplicator(TestCase):
+
+    def test_filter_new_local(self):
+        dedup = PostDeduplicator(max_local=10)
+        self.assertEqual(['a', 'b'], dedup.filter_new(['a', 'b', 'a']))
+        self.assertEqual(['c'], dedup.filter_new(['b', 'c']))
+
+    def test_local_evicts_oldest(self):
+        dedup = PostDeduplicator(max_local=2)
+        dedup.filter_new(['a', 'b'])
+        dedup.filter_new(['a'])
+        dedup.filter_new(['c'])
+        self.assertFalse(dedup.is_new('a'))
+        self.assertTrue(dedup.is_new('b'))
+
+    def test_shared_between_instances(self):
+        redis = FakeRedis()
+        one = PostDeduplicator(redis_client=redis, capacity=1000)
+        two = PostDeduplicator(redis_client=redis, capacity=1000)
+        self.assertEqual(['a', 'b'], one.filter_new(['a', 'b']))
+        self.assertEqual(['c'], two.filter_new(['a', 'c']))
+
+    def test_shared_checks_previous_bucket(self):
+        redis = FakeRedis()
+        with mock.patch('redditrepostsleuth.core.services.post_deduplicator.time', return_value=3600 * 10):
+            PostDeduplicator(redis_client=redis, capacity=1000).filter_new(['a'])
+        with mock.patch('redditrepostsleuth.core.services.post_deduplicator.time', return_value=3600 * 11):
+            self.assertEqual([], PostDeduplicator(redis_client=redis, capacity=1000).filter_new(['a']))
+        with mock.patch('redditrepostsleuth.core.services.post_deduplicator.time', return_value=3600 * 13):
+            self.assertEqual(['a'], PostDeduplicator(redis_client=redis, capacity=1000).filter_new(['a']))
+
+    def test_shared_redis_error_uses_local(self):
+        redis = MagicMock()
+        redis.pipeline.return_value.execute.side_effect = RedisError('down')
+        dedup = PostDeduplicator(redis_client=redis)
+        self.assertEqual(['a'], dedup.filter_new(['a']))
+        self.assertEqual([], dedup.filter_new(['a']))
+
+    def test_filter_new_without_mark(self):
+        dedup = PostDeduplicator(max_local=10)
+        self.assertEqual(['a', 'b'], dedup.filter_new(['a', 'b', 'a'], mark=False))
+        self.assertEqual(['a', 'b'], dedup.filter_new(['a', 'b'], mark=False))
+        dedup.mark_seen(['a'])
+        self.assertEqual(['b'], dedup.filter_new(['a', 'b'], mark=False))
+
+    def test_shared_without_mark(self):
+        redis = FakeRedis()
+        one = PostDeduplicator(redis_client=redis, capacity=1000)
+        two = PostDeduplicator(redis_client=redis, capacity=1000)
+        self.assertEqual(['a'], one.filter_new(['a'], mark=False))
+        self.assertEqual(['a'], two.filter_new(['a'], mark=False))
+        one.mark_seen(['a'])
+        self.assertEqual([], two.filter_new(['a'], mark=False))
+
+    def test_filter_size(self):
+        dedup = PostDeduplicator(capacity=500000, error_rate=0.0001)
+        self.assertEqual(13, dedup.hash_count)
+        self.assertLess(dedup.bits / 8, 1.5 * 1024 * 1024)
@@ -0,0 +1,75 @@
+from unittest import TestCase, mock
+from unittest.mock import MagicMock
+
+from prawcore import PrawcoreException
+
+from redditrepostsleuth.core.services.post_type_resolver import PostTypeResolver
+
+
+class FakeSubmission:
+    def __init__(self, post_id, **kwargs):
+        self.id = post_id
+        self.__dict__.update(kwargs)
+
+
+def get_submission(post_id, **kwargs):
+    submission = {'id': post_id, 'url': f'https://example.com/{post_id}'}
+    submission.update(kwargs)
+    return submission
+
+
+class TestPostTypeResolver(TestCase):
+
+    def test_resolve_local_no_reddit(self):
+        reddit = MagicMock()
+        resolver = PostTypeResolver(reddit)
+        result = resolver.resolve([
+            get_submission('a', is_self=True),
+            get_submission('b', post_hint='link'),
+            get_submission('c', url='https://i.redd.it/c.jpg')
+        ])
+        self.assertEqual({'a': 'text', 'b': 'link', 'c': 'image'}, result)
+        reddit.info.assert_not_called()
+
+    def test_resolve_batches_reddit_lookups(self):
+        reddit = MagicMock()
+        reddit.info.side_effect = lambda fullnames: [
+            FakeSubmission(f[3:], post_hint='hosted:video') for f in fullnames if f != 't3_5'
+        ]
+        resolver = PostTypeResolver(reddit)
+        submissions = [get_submission(str(i)) for i in range(250)]
+        submissions[6]['is_video'] = True
+        submissions[5]['is_video'] = True
+        result = resolver.resolve(submissions)
+        self.assertEqual(3, reddit.info.call_count)
+        self.assertEqual(100, len(reddit.info.call_args_list[0][1]['fullnames']))
+        self.assertEqual('hosted:video', result['0'])
+        self.assertEqual('video', result['5'])
+        self.assertEqual(250, len(result))
+
+    def test_resolve_uses_cache(self):
+        reddit = MagicMock()
+        reddit.info.return_value = []
+        resolver = PostTypeResolver(reddit)
+        resolver.resolve([get_submission('a')])
+        self.assertEqual({'a': None}, resolver.resolve([get_submission('a')]))
+        self.assertEqual(1, reddit.info.call_count)
+
+    def test_resolve_cache_expires(self):
+        reddit = MagicMock()
+        reddit.info.return_value = [FakeSubmission('a', post_hint='link')]
+        resolver = PostTypeResolver(reddit, ttl=10)
+        with mock.patch('redditrepostsleuth.core.services.post_type_resolver.time', return_value=100):
+            resolver.resolve([get_submission('a')])
+        with mock.patch('redditrepostsleuth.core.services.post_type_resolver.time', return_value=111):
+            resolver.resolve([get_submission('a')])
+        self.assertEqual(2, reddit.info.call_count)
+
+    def test_resolve_reddit_error_not_cached(self):
+        reddit = MagicMock()
+        reddit.info.side_effect = PrawcoreException()
+        resolver = PostTypeResolver(reddit)
+        self.assertEqual({'a': 'video'}, resolver.resolve([get_submission('a', is_video=True)]))
+        reddit.info.side_effect = None
+        reddit.info.return_value = [FakeSubmission('a', post_hint='hosted:video')]
+        self.assertEqual({'a': 'hosted:video'}, resolver.resolve([get_submission('a', is_video=True)]))
@@ -0,0 +1,72 @@
+from time import perf_counter, sleep
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from redditrepostsleuth.core.model.image_search_times import ImageSearchTimes
+from redditrepostsleuth.core.services.search_latency_recorder import SearchLatencyRecorder
+
+
+class TestSearchLatencyRecorder(TestCase):
+
+    def test_record_snapshot(self):
+        recorder = SearchLatencyRecorder(MagicMock(), flush_interval=600)
+        recorder.record('summons', {'total_search_time': .5, 'meme_filter_time': 0})
+        recorder.record('summons', {'total_search_time': .1})
+        recorder.record('api', {'total_search_time': .2})
+        r = recorder.snapshot()
+        self.assertEqual({'summons', 'api'}, set(r.keys()))
+        self.assertEqual(['total_search_time'], list(r['summons'].keys()))
+        self.assertEqual(2, r['summons']['total_search_time']['count'])
+
+    def test_snapshot_reset(self):
+        recorder = SearchLatencyRecorder(MagicMock(), flush_interval=600)
+        recorder.record('summons', {'total_search_time': .5})
+        recorder.snapshot(reset=True)
+        self.assertEqual({}, recorder.snapshot())
+
+    def test_record_flushes_when_due(self):
+        event_logger = MagicMock()
+        recorder = SearchLatencyRecorder(event_logger, flush_interval=0)
+        recorder.record('summons', {'total_search_time': .5})
+        event_logger.save_event.assert_called_once()
+        event = event_logger.save_event.call_args[0][0].get_influx_event()[0]
+        self.assertEqual('summons', event['tags']['source'])
+        self.assertEqual(1, event['fields']['total_search_time_count'])
+        self.assertEqual({}, recorder.snapshot())
+
+    def test_flush_includes_cache_counts(self):
+        event_logger = MagicMock()
+        recorder = SearchLatencyRecorder(event_logger, flush_interval=600)
+        recorder.record('summons', {'total_search_time': .5}, cache_hit=True)
+        recorder.record('summons', {'total_search_time': .5}, cache_hit=False)
+        recorder.record('summons', {'total_search_time': .5}, cache_hit=True)
+        recorder.record('api', {'total_search_time': .5})
+        recorder.flush()
+        events = {
+            e['tags']['source']: e['fields']
+            for e in [c[0][0].get_influx_event()[0] for c in event_logger.save_event.call_args_list]
+        }
+        self.assertEqual(2, events['summons']['search_cache_hit'])
+        self.assertEqual(1, events['summons']['search_cache_miss'])
+        self.assertNotIn('search_cache_hit', events['api'])
+        event_logger.reset_mock()
+        recorder.flush()
+        event_logger.save_event.assert_not_called()
+
+    def test_flush_thread_flushes_without_new_records(self):
+        event_logger = MagicMock()
+        recorder = SearchLatencyRecorder(event_logger, flush_interval=0.01)
+        recorder._last_flush = perf_counter()
+        recorder.record('summons', {'total_search_time': .5})
+        for _ in range(100):
+            if event_logger.save_event.called:
+                break
+            sleep(0.01)
+        event_logger.save_event.assert_called_once()
+
+    def test_search_times_stop_timer(self):
+        search_times = ImageSearchTimes()
+        search_times.start_timer('meme_filter_time')
+        search_times.stop_timer('meme_filter_time')
+        self.assertGreaterEqual(search_times.meme_filter_time, 0)
+        search_times.stop_timer('meme_filter_time')
@@ -0,0 +1,118 @@
+from unittest import TestCase, mock
+from unittest.mock import MagicMock
+
+from redis.exceptions import ConnectionError
+
+from redditrepostsleuth.core.model.image_search_settings import ImageSearchSettings
+from redditrepostsleuth.core.services.search_result_cache import SearchResultCache, GENERATION_KEY, \
+    GENERATION_OWNER_KEY, get_search_result_cache, EXTERNAL_INDEX_MAX_TTL
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None, nx=False):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    def incr(self, key):
+        self.data[key] = int(self.data.get(key, 0)) + 1
+        return self.data[key]
+
+
+class TestSearchResultCache(TestCase):
+
+    def test_build_key_same_settings_same_key(self):
+        settings1 = ImageSearchSettings(90, .077, same_sub=True)
+        settings2 = ImageSearchSettings(90, .077, same_sub=True)
+        self.assertEqual(
+            SearchResultCache.build_key('abc', settings1, post_id='1'),
+            SearchResultCache.build_key('abc', settings2, post_id='1')
+        )
+
+    def test_build_key_different_settings_different_key(self):
+        self.assertNotEqual(
+            SearchResultCache.build_key('abc', ImageSearchSettings(90, .077)),
+            SearchResultCache.build_key('abc', ImageSearchSettings(80, .077))
+        )
+        self.assertNotEqual(
+            SearchResultCache.build_key('abc', ImageSearchSettings(90, .077), post_id='1'),
+            SearchResultCache.build_key('abc', ImageSearchSettings(90, .077), post_id='2')
+        )
+
+    def test_set_get(self):
+        cache = SearchResultCache(FakeRedis())
+        cache.set('key', {'matches': [1, 2]})
+        self.assertEqual({'matches': [1, 2]}, cache.get('key'))
+        self.assertIsNone(cache.get('other'))
+        self.assertEqual(1, cache.hits)
+        self.assertEqual(1, cache.misses)
+
+    def test_get_returns_copy(self):
+        cache = SearchResultCache(FakeRedis())
+        cache.set('key', {'matches': [1, 2]})
+        cache.get('key')['matches'].append(3)
+        self.assertEqual({'matches': [1, 2]}, cache.get('key'))
+
+    def test_get_from_redis_when_not_local(self):
+        redis = FakeRedis()
+        SearchResultCache(redis).set('key', {'matches': [1]})
+        self.assertEqual({'matches': [1]}, SearchResultCache(redis).get('key'))
+
+    def test_local_lru_evicts_oldest(self):
+        cache = SearchResultCache(FakeRedis(), local_size=2)
+        cache.set('a', {})
+        cache.set('b', {})
+        cache.get('a')
+        cache.set('c', {})
+        self.assertEqual(['search_cache:0:a', 'search_cache:0:c'], list(cache._local.keys()))
+
+    def test_invalidate(self):
+        redis = FakeRedis()
+        cache = SearchResultCache(redis)
+        other_worker = SearchResultCache(redis, generation_refresh=0)
+        cache.set('key', {'matches': [1]})
+        self.assertIsNotNone(other_worker.get('key'))
+        cache.invalidate()
+        self.assertEqual(1, redis.data[GENERATION_KEY])
+        self.assertIsNone(cache.get('key'))
+        self.assertIsNone(other_worker.get('key'))
+
+    def test_advance_generation_once_per_interval(self):
+        redis = FakeRedis()
+        workers = [SearchResultCache(redis, generation_refresh=0) for _ in range(3)]
+        workers[0].set('key', {'matches': [1]})
+        self.assertEqual([True, False, False], [w.advance_generation(60) for w in workers])
+        self.assertEqual(1, redis.data[GENERATION_KEY])
+        self.assertIsNone(workers[1].get('key'))
+        del redis.data[GENERATION_OWNER_KEY]
+        self.assertTrue(workers[2].advance_generation(60))
+        self.assertEqual(2, redis.data[GENERATION_KEY])
+
+    def test_advance_generation_redis_down(self):
+        redis = MagicMock()
+        redis.set.side_effect = ConnectionError('Down')
+        self.assertFalse(SearchResultCache(redis).advance_generation(60))
+        redis.incr.assert_not_called()
+
+    def test_redis_down_is_a_miss(self):
+        redis = MagicMock()
+        redis.get.side_effect = ConnectionError('Down')
+        redis.set.side_effect = ConnectionError('Down')
+        cache = SearchResultCache(redis)
+        cache.set('key', {'matches': [1]})
+        self.assertIsNone(cache.get('key'))
+        self.assertEqual(1, cache.misses)
+
+    def test_get_search_result_cache_caps_ttl_for_index_api(self):
+        with mock.patch('redditrepostsleuth.core.services.search_result_cache.get_redis_client'):
+            cache = get_search_result_cache(MagicMock(search_cache_ttl=600, image_index_engine=None, search_cache_local_size=None))
+            self.assertEqual(EXTERNAL_INDEX_MAX_TTL, cache.ttl)
+            cache = get_search_result_cache(MagicMock(search_cache_ttl=600, image_index_engine='mih', search_cache_local_size=None))
+            self.assertEqual(600, cache.ttl)
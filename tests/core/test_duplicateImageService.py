@@ -1,4 +1,5 @@
 import json
+from datetime import datetime
 from types import SimpleNamespace
 from unittest import TestCase, mock
 from unittest.mock import MagicMock, Mock
@@ -8,7 +9,9 @@ from redditrepostsleuth.core.db.databasemodels import Post
 from redditrepostsleuth.core.services.duplicateimageservice import DuplicateImageService
 from redditrepostsleuth.core.exception import NoIndexException
 from redditrepostsleuth.core.model.image_index_api_result import ImageIndexApiResult
+from redditrepostsleuth.core.model.image_search_settings import ImageSearchSettings
 from redditrepostsleuth.core.model.search.image_search_match import ImageSearchMatch
+from redditrepostsleuth.core.model.search.image_search_results import ImageSearchResults
 
 
 
@@ -132,6 +135,58 @@ class TestDuplicateImageService(TestCase):
         historical_repo.get_by_id.assert_called()
         self.assertIsNone(r)
 
+    def test__get_posts_from_index_ids_historical_single_query(self):
+        historical_repo = MagicMock()
+        historical_repo.get_posts_by_ids.return_value = [(1, Post(id=10)), (2, Post(id=20))]
+        uow = MagicMock()
+        uowm = MagicMock()
+        type(uow).image_post = mock.PropertyMock(return_value=historical_repo)
+        uow.__enter__.return_value = uow
+        uowm.start.return_value = uow
+        dup_svc = DuplicateImageService(uowm, Mock(), Mock(), config=MagicMock())
+        r = dup_svc._get_posts_from_index_ids([1, 2])
+        historical_repo.get_posts_by_ids.assert_called_once_with([1, 2])
+        self.assertEqual(10, r[1].id)
+        self.assertEqual(20, r[2].id)
+
+    def test__get_posts_from_index_ids_current(self):
+        current_repo = MagicMock()
+        current_repo.get_posts_by_ids.return_value = [(1, Post(id=10))]
+        uow = MagicMock()
+        uowm = MagicMock()
+        type(uow).image_post_current = mock.PropertyMock(return_value=current_repo)
+        uow.__enter__.return_value = uow
+        uowm.start.return_value = uow
+        dup_svc = DuplicateImageService(uowm, Mock(), Mock(), config=MagicMock())
+        r = dup_svc._get_posts_from_index_ids([1], historical_index=False)
+        current_repo.get_posts_by_ids.assert_called_once_with([1])
+        self.assertEqual(10, r[1].id)
+
+    def test__get_posts_from_index_ids_empty_no_query(self):
+        uowm = MagicMock()
+        dup_svc = DuplicateImageService(uowm, Mock(), Mock(), config=MagicMock())
+        self.assertEqual({}, dup_svc._get_posts_from_index_ids([]))
+        uowm.start.assert_not_called()
+
+    def test__build_search_results_skip_missing_and_no_dhash(self):
+        dhash = '40bec6703e3f3c2b0fc491a1c0c16cff273f00c00c020ff91b6807cc060c0014'
+        with mock.patch.object(DuplicateImageService, '_get_posts_from_index_ids') as get_posts:
+            get_posts.return_value = {
+                1: Post(id=10, post_id='abc', dhash_h=dhash),
+                2: Post(id=20, post_id='def')
+            }
+            dup_svc = DuplicateImageService(Mock(), Mock(), Mock(), config=MagicMock())
+            r = dup_svc._build_search_results(
+                [{'id': 1, 'distance': .1}, {'id': 2, 'distance': .2}, {'id': 3, 'distance': .3}],
+                'test.com',
+                dhash
+            )
+            get_posts.assert_called_once_with([1, 2, 3], historical_index=True)
+            self.assertEqual(1, len(r))
+            self.assertEqual(1, r[0].index_match_id)
+            self.assertEqual(10, r[0].post.id)
+            self.assertEqual(0, r[0].hamming_distance)
+
     def test__get_image_search_match_from_index_result_valid_post(self):
         with mock.patch.object(DuplicateImageService, '_get_post_from_index_id') as dup:
             dup.return_value = Post(id=456, dhash_h='40bec6703e3f3c2b0fc491a1c0c16cff273f00c00c020ff91b6807cc060c0014')
@@ -178,3 +233,167 @@ class TestDuplicateImageService(TestCase):
         r = dup_svc._remove_duplicates(matches)
         self.assertEqual(2, len(r))
 
+    def test__final_meme_filter_batch_scores_matches(self):
+        dup_svc = DuplicateImageService(MagicMock(), Mock(), Mock(), config=MagicMock(default_meme_filter_hash_size=32))
+        matches = [
+            ImageSearchMatch('test.com', 1, Post(id=1, post_id='1', url='1.com'), 10, .5, 64),
+            ImageSearchMatch('test.com', 2, Post(id=2, post_id='2', url='2.com'), 10, .5, 64),
+            ImageSearchMatch('test.com', 3, Post(id=3, post_id='3', url='3.com'), 10, .5, 64),
+            ImageSearchMatch('test.com', 4, Post(id=4, post_id='4', url='4.com'), 10, .5, 64),
+        ]
+        meme_hashes = {'1.com': 'a' * 256, '2.com': 'a' * 250 + 'b' * 6, '3.com': None, '4.com': 'a' * 254 + 'bb'}
+        dup_svc._get_meme_hash = MagicMock(side_effect=lambda url: meme_hashes[url])
+        r = dup_svc._final_meme_filter('a' * 256, matches, 4)
+        self.assertEqual([1, 4], [m.index_match_id for m in r])
+        self.assertEqual([0, 2], [m.hamming_distance for m in r])
+        self.assertEqual(256, r[0].hash_size)
+
+    def test__get_meme_hashes_uses_stored_hash(self):
+        uowm = MagicMock()
+        dup_svc = DuplicateImageService(uowm, Mock(), Mock(), config=MagicMock(default_meme_filter_hash_size=32))
+        dup_svc._get_meme_hash = MagicMock()
+        matches = [ImageSearchMatch('test.com', 1, Post(id=1, post_id='1', url='1.com', dhash_meme='a' * 256), 10, .5, 64)]
+        r = dup_svc._get_meme_hashes(matches)
+        self.assertEqual({1: 'a' * 256}, r)
+        dup_svc._get_meme_hash.assert_not_called()
+        uowm.start.assert_not_called()
+
+    def test__get_meme_hashes_backfills_missing_and_wrong_size(self):
+        uowm = MagicMock()
+        uow = MagicMock()
+        uowm.start.return_value.__enter__.return_value = uow
+        dup_svc = DuplicateImageService(uowm, Mock(), Mock(), config=MagicMock(default_meme_filter_hash_size=32))
+        dup_svc._get_meme_hash = MagicMock(return_value='b' * 256)
+        matches = [
+            ImageSearchMatch('test.com', 1, Post(id=1, post_id='1', url='1.com', dhash_meme='a' * 64), 10, .5, 64),
+            ImageSearchMatch('test.com', 2, Post(id=2, post_id='2', url='2.com'), 10, .5, 64),
+        ]
+        r = dup_svc._get_meme_hashes(matches)
+        self.assertEqual({1: 'b' * 256, 2: 'b' * 256}, r)
+        self.assertEqual('b' * 256, matches[1].post.dhash_meme)
+        uow.posts.update_meme_hashes.assert_called_once_with({1: 'b' * 256, 2: 'b' * 256})
+        uow.commit.assert_called_once()
+
+    def test_check_image_search_cache_hit(self):
+        search_cache = MagicMock()
+        search_cache.get.return_value = {
+            'matches': [ImageSearchMatch('test.com', 1, Post(id=1, post_id='1', created_at=datetime.utcnow()), 0, .1, 64)],
+            'closest_match': None,
+            'meme_template': None,
+            'meme_hash': None,
+            'total_searched': 100,
+            'target_match_percent': 90,
+            'used_current_index': True,
+            'used_historical_index': True
+        }
+        event_logger = MagicMock()
+        dup_svc = DuplicateImageService(MagicMock(), event_logger, Mock(), config=MagicMock(), search_cache=search_cache)
+        dup_svc._get_matches = MagicMock()
+        post = Post(post_id='abc', dhash_h='a' * 64, subreddit='test')
+        r = dup_svc.check_image('test.com', post=post, search_settings=ImageSearchSettings(90, .077))
+        dup_svc._get_matches.assert_not_called()
+        search_cache.set.assert_not_called()
+        self.assertEqual(1, len(r.matches))
+        self.assertEqual(100, r.total_searched)
+        self.assertTrue(event_logger.save_event.call_args[0][0].cache_hit)
+
+    def test_check_image_search_cache_miss_sets_result(self):
+        search_cache = MagicMock()
+        search_cache.get.return_value = None
+        dup_svc = DuplicateImageService(MagicMock(), MagicMock(), Mock(), config=MagicMock(), search_cache=search_cache)
+        dup_svc._get_matches = MagicMock(return_value=ImageIndexApiResult(
+            current_matches=[],
+            historical_matches=[],
+            index_search_time=1,
+            total_searched=10,
+            used_current_index=True,
+            used_historical_index=True,
+            target_result={}
+        ))
+        dup_svc._filter_results_for_reposts = MagicMock(side_effect=lambda x, sort_by=None: x)
+        post = Post(post_id='abc', dhash_h='a' * 64, subreddit='test')
+        dup_svc.check_image('test.com', post=post, search_settings=ImageSearchSettings(90, .077))
+        dup_svc._get_matches.assert_called_once()
+        cached = search_cache.set.call_args[0][1]
+        self.assertEqual(10, cached['total_searched'])
+        self.assertEqual([], cached['matches'])
+
+    def test__log_search_time_uses_latency_recorder(self):
+        event_logger = MagicMock()
+        latency_recorder = MagicMock()
+        dup_svc = DuplicateImageService(MagicMock(), event_logger, Mock(), config=MagicMock(), latency_recorder=latency_recorder)
+        search_results = MagicMock()
+        search_results.search_times.to_dict.return_value = {'total_search_time': 1.2}
+        dup_svc._log_search_time(search_results, 'summons', cache_hit=True)
+        latency_recorder.record.assert_called_once_with('summons', {'total_search_time': 1.2}, cache_hit=True)
+        event_logger.save_event.assert_not_called()
+
+    def test__get_matches_batch_single_request(self):
+        res = {
+            'current_matches': [],
+            'historical_matches': [{'id': 1, 'distance': .234}],
+            'index_search_time': 1.234,
+            'total_searched': 100,
+            'used_current_index': True,
+            'used_historical_index': True,
+            'target_result': {}
+        }
+        searches = [
+            ImageSearchResults('a.com', ImageSearchSettings(90, .077, max_matches=75), checked_post=Post(dhash_h='a' * 64)),
+            ImageSearchResults('b.com', ImageSearchSettings(100, .077, max_matches=75), checked_post=Post(dhash_h='b' * 64)),
+        ]
+        with mock.patch('redditrepostsleuth.core.services.duplicateimageservice.requests.post') as mock_post:
+            dup_svc = DuplicateImageService(Mock(), Mock(), Mock(), config=MagicMock(index_api='http://good.com'))
+            mock_post.return_value = SimpleNamespace(**{'text': json.dumps([res, res]), 'status_code': 200})
+            r = dup_svc._get_matches_batch(searches)
+            mock_post.assert_called_once()
+            sent = mock_post.call_args[1]['json']['searches']
+            self.assertEqual(['a' * 64, 'b' * 64], [s['hash'] for s in sent])
+            self.assertEqual([6, 0], [int(s['h_filter']) for s in sent])
+            self.assertEqual(2, len(r))
+            self.assertIsInstance(r[0], ImageIndexApiResult)
+
+    def test__get_matches_batch_wrong_result_count(self):
+        searches = [ImageSearchResults('a.com', ImageSearchSettings(90, .077), checked_post=Post(dhash_h='a' * 64))]
+        with mock.patch('redditrepostsleuth.core.services.duplicateimageservice.requests.post') as mock_post:
+            dup_svc = DuplicateImageService(Mock(), Mock(), Mock(), config=MagicMock(index_api='http://good.com'))
+            mock_post.return_value = SimpleNamespace(**{'text': json.dumps([]), 'status_code': 200})
+            self.assertRaises(NoIndexException, dup_svc._get_matches_batch, searches)
+
+    def test__get_matches_batch_no_batch_endpoint_falls_back(self):
+        searches = [
+            ImageSearchResults('a.com', ImageSearchSettings(90, .077), checked_post=Post(dhash_h='a' * 64)),
+            ImageSearchResults('b.com', ImageSearchSettings(90, .077), checked_post=Post(dhash_h='b' * 64)),
+        ]
+        with mock.patch('redditrepostsleuth.core.services.duplicateimageservice.requests.post') as mock_post:
+            dup_svc = DuplicateImageService(Mock(), Mock(), Mock(), config=MagicMock(index_api='http://good.com'))
+            dup_svc._get_matches = MagicMock(return_value='result')
+            mock_post.return_value = SimpleNamespace(**{'status_code': 404})
+            self.assertEqual(['result', 'result'], dup_svc._get_matches_batch(searches))
+            self.assertEqual(2, dup_svc._get_matches.call_count)
+
+    def test_check_images_hydrates_once_and_logs_once(self):
+        uow = MagicMock()
+        uowm = MagicMock()
+        uowm.start.return_value.__enter__.return_value = uow
+        dup_svc = DuplicateImageService(uowm, MagicMock(), Mock(), config=MagicMock())
+        dup_svc._get_matches_batch = MagicMock(return_value=[
+            ImageIndexApiResult([{'id': 2, 'distance': .1}], [{'id': 1, 'distance': .1}], 1, 10, True, True, {}),
+            ImageIndexApiResult([], [{'id': 1, 'distance': .1}], 1, 10, True, True, {}),
+        ])
+        match_post = Post(id=5, post_id='xyz', dhash_h='a' * 64, created_at=datetime.utcnow())
+        dup_svc._get_posts_from_index_ids = MagicMock(side_effect=lambda ids, historical_index=True: {i: match_post for i in ids})
+        dup_svc._filter_results_for_reposts = MagicMock(side_effect=lambda x, sort_by=None: x)
+        posts = [
+            Post(post_id='abc', url='a.com', dhash_h='a' * 64, subreddit='test'),
+            Post(post_id='def', url='b.com', dhash_h='a' * 64, subreddit='test'),
+        ]
+        r = dup_svc.check_images(posts, search_settings=ImageSearchSettings(90, .077, meme_filter=False))
+        dup_svc._get_matches_batch.assert_called_once()
+        self.assertEqual(2, dup_svc._get_posts_from_index_ids.call_count)
+        self.assertEqual([[1]], [c[0][0] for c in dup_svc._get_posts_from_index_ids.call_args_list if c[1].get('historical_index', True)])
+        self.assertEqual(['abc', 'def'], [s.checked_post.post_id for s in r])
+        self.assertEqual(1, len(r[0].matches))
+        self.assertEqual(2, uow.image_search.add.call_count)
+        uow.commit.assert_called_once()
+        self.assertIsNotNone(r[1].logged_search)
@@ -1,5 +1,27 @@
 from unittest import TestCase
 
+from redditrepostsleuth.core.db.databasemodels import Post
+from redditrepostsleuth.core.util.objectmapping import post_to_image_post, post_to_image_post_current
+
 
 class Test(TestCase):
-    pass
\ No newline at end of file
+
+    def test_post_binary_hashes_set_with_hex(self):
+        post = Post(dhash_h='ab' * 32, dhash_v='cd' * 32)
+        post.ahash = 'ef' * 32
+        self.assertEqual(bytes.fromhex('ab' * 32), post.dhash_h_bin)
+        self.assertEqual(bytes.fromhex('cd' * 32), post.dhash_v_bin)
+        self.assertEqual(bytes.fromhex('ef' * 32), post.ahash_bin)
+
+    def test_post_binary_hash_invalid_hex(self):
+        post = Post(dhash_h='xyz')
+        self.assertIsNone(post.dhash_h_bin)
+        post.dhash_h = None
+        self.assertIsNone(post.dhash_h_bin)
+
+    def test_post_to_image_post_binary_hashes(self):
+        post = Post(post_id='abc', dhash_h='ab' * 32, dhash_v='cd' * 32)
+        image_post = post_to_image_post(post)
+        image_post_current = post_to_image_post_current(post)
+        self.assertEqual(bytes.fromhex('ab' * 32), image_post.dhash_h_bin)
+        self.assertEqual(bytes.fromhex('cd' * 32), image_post_current.dhash_v_bin)
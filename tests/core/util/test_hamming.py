@@ -0,0 +1,54 @@
+import random
+from unittest import TestCase
+
+from distance import hamming
+
+from redditrepostsleuth.core.util.hamming import hamming_distance, hamming_distances_from_hex, hashes_to_matrix, bytes_to_matrix, \
+    hex_to_words
+
+
+def random_hash(rand: random.Random, length: int) -> str:
+    return ''.join(rand.choice('0123456789abcdef') for _ in range(length))
+
+
+class TestHamming(TestCase):
+
+    def test_hamming_distance_matches_distance_lib(self):
+        rand = random.Random(1)
+        for length in (16, 20, 64, 256):
+            for _ in range(50):
+                h1, h2 = random_hash(rand, length), random_hash(rand, length)
+                self.assertEqual(hamming(h1, h2), hamming_distance(h1, h2))
+
+    def test_hamming_distance_same_hash(self):
+        self.assertEqual(0, hamming_distance('f' * 64, 'f' * 64))
+
+    def test_hamming_distance_unequal_length(self):
+        self.assertRaises(ValueError, hamming_distance, 'aa', 'aaa')
+
+    def test_hamming_distances_from_hex_matches_distance_lib(self):
+        rand = random.Random(2)
+        target = random_hash(rand, 64)
+        hashes = [random_hash(rand, 64) for _ in range(1000)]
+        self.assertEqual([hamming(target, h) for h in hashes], hamming_distances_from_hex(target, hashes))
+
+    def test_hamming_distances_from_hex_empty(self):
+        self.assertEqual([], hamming_distances_from_hex('a' * 64, []))
+
+    def test_hamming_distances_from_hex_unequal_length(self):
+        self.assertRaises(ValueError, hamming_distances_from_hex, 'a' * 64, ['a' * 64, 'a' * 32])
+
+    def test_hex_to_words(self):
+        self.assertEqual([0x0123456789abcdef, 0xffffffffffffffff], hex_to_words('0123456789abcdef' + 'f' * 16).tolist())
+
+    def test_hashes_to_matrix_shape(self):
+        self.assertEqual((3, 4), hashes_to_matrix(['a' * 64] * 3).shape)
+
+    def test_bytes_to_matrix_matches_hex(self):
+        rand = random.Random(3)
+        hashes = [random_hash(rand, 64) for _ in range(10)]
+        raw = b''.join(bytes.fromhex(h) for h in hashes)
+        self.assertEqual(hashes_to_matrix(hashes).tolist(), bytes_to_matrix(raw, 10).tolist())
+
+    def test_bytes_to_matrix_empty(self):
+        self.assertEqual((0, 0), bytes_to_matrix(b'', 0).shape)
@@ -0,0 +1,74 @@
+from io import BytesIO
+from unittest import TestCase, mock
+from unittest.mock import MagicMock
+from urllib.error import HTTPError
+
+import imagehash
+import numpy as np
+from PIL import Image
+
+from redditrepostsleuth.core.exception import ImageRemovedException, InvalidImageUrlException, \
+    ImageConversioinException
+from redditrepostsleuth.core.util.imagehashing import get_image_hashes_from_img, download_image, get_image_hashes
+
+
+def get_test_images():
+    rand = np.random.RandomState(1)
+    noise = Image.fromarray(rand.randint(0, 256, (480, 640, 3), dtype=np.uint8), 'RGB')
+    gradient = Image.fromarray(np.tile(np.arange(256, dtype=np.uint8), (100, 1)), 'L')
+    rgba = Image.fromarray(rand.randint(0, 256, (123, 77, 4), dtype=np.uint8), 'RGBA')
+    palette = noise.convert('P')
+    flat = Image.new('RGB', (50, 50), (120, 120, 120))
+    return [noise, gradient, rgba, palette, flat]
+
+
+class TestImageHashing(TestCase):
+
+    def test_get_image_hashes_from_img_matches_imagehash(self):
+        for img in get_test_images():
+            for hash_size in (16, 8, 5):
+                r = get_image_hashes_from_img(img, hash_size=hash_size)
+                self.assertEqual(str(imagehash.dhash(img, hash_size=hash_size)), r['dhash_h'])
+                self.assertEqual(str(imagehash.dhash_vertical(img, hash_size=hash_size)), r['dhash_v'])
+                self.assertEqual(str(imagehash.average_hash(img, hash_size=hash_size)), r['ahash'])
+
+    def test_get_image_hashes_from_img_meme_hash(self):
+        for img in get_test_images():
+            r = get_image_hashes_from_img(img, hash_size=16, meme_hash_size=32)
+            self.assertEqual(str(imagehash.dhash(img, hash_size=32)), r['dhash_meme'])
+
+    def test_get_image_hashes_from_img_no_meme_hash(self):
+        r = get_image_hashes_from_img(get_test_images()[0])
+        self.assertNotIn('dhash_meme', r)
+
+    def test_get_image_hashes_from_img_bad_hash_size(self):
+        self.assertRaises(ValueError, get_image_hashes_from_img, get_test_images()[0], hash_size=1)
+
+    def _http_error(self, code):
+        return HTTPError('http://example.com/a.jpg', code, 'Error', {}, BytesIO())
+
+    def test_download_image_raise_for_status_404(self):
+        with mock.patch('redditrepostsleuth.core.util.imagehashing.request.urlopen', side_effect=self._http_error(404)):
+            with self.assertRaises(ImageRemovedException):
+                download_image('http://example.com/a.jpg', raise_for_status=True)
+
+    def test_download_image_raise_for_status_403(self):
+        with mock.patch('redditrepostsleuth.core.util.imagehashing.request.urlopen', side_effect=self._http_error(403)):
+            with self.assertRaises(InvalidImageUrlException):
+                download_image('http://example.com/a.jpg', raise_for_status=True)
+
+    def test_download_image_status_default(self):
+        with mock.patch('redditrepostsleuth.core.util.imagehashing.request.urlopen', side_effect=self._http_error(404)):
+            with self.assertRaises(ImageConversioinException):
+                download_image('http://example.com/a.jpg')
+
+    def test_get_image_hashes_single_request(self):
+        out = BytesIO()
+        get_test_images()[0].save(out, format='PNG')
+        response = MagicMock()
+        response.read.return_value = out.getvalue()
+        with mock.patch('redditrepostsleuth.core.util.imagehashing.request.urlopen', return_value=response) as urlopen:
+            hashes = get_image_hashes('http://example.com/a.jpg', meme_hash_size=8)
+        urlopen.assert_called_once()
+        self.assertEqual(str(imagehash.dhash(get_test_images()[0], hash_size=16)), hashes['dhash_h'])
+        self.assertIn('dhash_meme', hashes)
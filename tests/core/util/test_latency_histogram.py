@@ -0,0 +1,43 @@
+from unittest import TestCase
+
+import numpy as np
+
+from redditrepostsleuth.core.util.latency_histogram import LatencyHistogram
+
+
+class TestLatencyHistogram(TestCase):
+
+    def test_percentile_within_precision(self):
+        values = np.random.RandomState(1).lognormal(-5, 1.5, 10000)
+        histogram = LatencyHistogram()
+        for v in values:
+            histogram.record(v)
+        for p in (50, 95, 99):
+            exact = np.percentile(values, p)
+            self.assertLess(abs(histogram.percentile(p) - exact) / exact, 0.02)
+
+    def test_percentile_empty(self):
+        self.assertEqual(0.0, LatencyHistogram().percentile(99))
+
+    def test_small_values_exact(self):
+        histogram = LatencyHistogram()
+        for us in (1, 2, 3, 100):
+            histogram.record(us / 1000000)
+        self.assertEqual(2 / 1000000, histogram.percentile(50))
+        self.assertEqual(100 / 1000000, histogram.percentile(100))
+
+    def test_merge(self):
+        one, two = LatencyHistogram(), LatencyHistogram()
+        one.record(.001)
+        two.record(.5)
+        one.merge(two)
+        self.assertEqual(2, len(one))
+        self.assertEqual(.5, one.max / 1000000)
+
+    def test_summary(self):
+        histogram = LatencyHistogram()
+        histogram.record(.25)
+        r = histogram.summary()
+        self.assertEqual(1, r['count'])
+        self.assertEqual(.25, r['max'])
+        self.assertEqual({'count', 'max', 'p50', 'p95', 'p99'}, set(r.keys()))
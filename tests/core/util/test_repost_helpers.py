@@ -1,13 +1,15 @@
 from unittest import TestCase, mock
-from unittest.mock import Mock
+from unittest.mock import Mock, MagicMock
 
 from redditrepostsleuth.core.db.databasemodels import Post
 from redditrepostsleuth.core.model.repostmatch import RepostMatch
 from datetime import datetime
 
 from redditrepostsleuth.core.model.search.search_match import SearchMatch
+from redditrepostsleuth.core.db.databasemodels import LinkUrlStats
+from redditrepostsleuth.core.model.search_settings import SearchSettings
 from redditrepostsleuth.core.util.repost_helpers import sort_reposts, get_first_active_match, get_closest_image_match, \
-    filter_search_results
+    filter_search_results, get_link_reposts
 from tests.core.helpers import get_image_search_results_multi_match
 
 
@@ -35,7 +37,7 @@ class TestHelpers(TestCase):
                 return Mock(status_code=400)
             else:
                 return Mock(status_code=200)
-        with mock.patch('redditrepostsleuth.core.util.repost_helpers.requests.head') as mock_head:
+        with mock.patch('redditrepostsleuth.core.util.url_liveness.requests.Session.head') as mock_head:
             mock_head.side_effect = get_dummy_res
             matches = [
                 SearchMatch('www.dummy.com', Post(id=1, url='www.bad.com')),
@@ -53,3 +55,47 @@ class TestHelpers(TestCase):
         search_results.matches[2].hamming_distance = 25
         r = get_closest_image_match(search_results.matches, check_url=False)
         self.assertEqual(2, r.post.id)
+
+    def _get_uowm(self, url_stats, posts):
+        uow = MagicMock()
+        uow.link_url_stats.get_by_url_hash.return_value = url_stats
+        uow.posts.find_all_by_url_hash.side_effect = lambda url_hash, limit=None: posts[:limit]
+        uow.posts.get_by_post_id.side_effect = lambda post_id: next(p for p in posts if p.post_id == post_id)
+        uowm = MagicMock()
+        uowm.start.return_value.__enter__.return_value = uow
+        return uowm, uow
+
+    def test_get_link_reposts_only_share_skips_posts(self):
+        uowm, uow = self._get_uowm(LinkUrlStats(share_count=1, first_post_id='abc'), [])
+        r = get_link_reposts('www.test.com', uowm, SearchSettings(), post=Post(post_id='abc'), use_url_stats=True)
+        uow.posts.find_all_by_url_hash.assert_not_called()
+        self.assertEqual([], r.matches)
+
+    def test_get_link_reposts_stats_not_ready_loads_all(self):
+        posts = [Post(post_id='abc'), Post(post_id='def')]
+        uowm, uow = self._get_uowm(LinkUrlStats(share_count=1, first_post_id='abc'), posts)
+        r = get_link_reposts('www.test.com', uowm, SearchSettings(), post=Post(post_id='abc'), max_matches=1)
+        uow.link_url_stats.get_by_url_hash.assert_not_called()
+        self.assertEqual(2, len(r.matches))
+        self.assertIsNone(r.total_matches)
+
+    def test_get_link_reposts_no_stats_loads_all(self):
+        posts = [Post(post_id=str(i)) for i in range(5)]
+        uowm, uow = self._get_uowm(None, posts)
+        r = get_link_reposts('www.test.com', uowm, SearchSettings(), post=Post(post_id='abc'), max_matches=2, use_url_stats=True)
+        self.assertEqual(5, len(r.matches))
+        self.assertIsNone(r.total_matches)
+
+    def test_get_link_reposts_over_max_loads_oldest_and_newest(self):
+        posts = [Post(post_id=str(i)) for i in range(5)]
+        uowm, uow = self._get_uowm(LinkUrlStats(share_count=5, first_post_id='0', last_post_id='4'), posts)
+        r = get_link_reposts('www.test.com', uowm, SearchSettings(), post=Post(post_id='4'), max_matches=2, use_url_stats=True)
+        self.assertEqual(['0', '1', '4'], [m.post.post_id for m in r.matches])
+        self.assertEqual(4, r.total_matches)
+
+    def test_get_link_reposts_same_sub_ignores_max(self):
+        posts = [Post(post_id=str(i)) for i in range(5)]
+        uowm, uow = self._get_uowm(LinkUrlStats(share_count=5, first_post_id='0', last_post_id='4'), posts)
+        r = get_link_reposts('www.test.com', uowm, SearchSettings(same_sub=True), post=Post(post_id='4'), max_matches=2, use_url_stats=True)
+        self.assertEqual(5, len(r.matches))
+        self.assertIsNone(r.total_matches)
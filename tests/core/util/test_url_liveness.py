@@ -0,0 +1,57 @@
+from time import sleep
+from unittest import TestCase, mock
+from unittest.mock import Mock
+
+from requests.exceptions import ConnectionError
+
+from redditrepostsleuth.core.util.url_liveness import UrlLivenessChecker
+
+
+def get_dummy_res(url, **kwargs):
+    if 'slow' in url:
+        sleep(.2)
+    if 'error' in url:
+        raise ConnectionError('Failed')
+    if 'bad' in url:
+        return Mock(status_code=404)
+    return Mock(status_code=200)
+
+
+class TestUrlLivenessChecker(TestCase):
+
+    def test_is_alive(self):
+        checker = UrlLivenessChecker()
+        with mock.patch('redditrepostsleuth.core.util.url_liveness.requests.Session.head') as mock_head:
+            mock_head.side_effect = get_dummy_res
+            self.assertTrue(checker.is_alive('http://good.com/1.jpg'))
+            self.assertFalse(checker.is_alive('http://bad.com/1.jpg'))
+            self.assertFalse(checker.is_alive('http://error.com/1.jpg'))
+
+    def test_first_alive_keeps_rank_order(self):
+        checker = UrlLivenessChecker()
+        urls = ['http://bad.com/1', 'http://error.com/2', 'http://slow.com/3', 'http://good.com/4']
+        with mock.patch('redditrepostsleuth.core.util.url_liveness.requests.Session.head') as mock_head:
+            mock_head.side_effect = get_dummy_res
+            self.assertEqual('http://slow.com/3', checker.first_alive(urls, lambda x: x))
+
+    def test_first_alive_none_alive(self):
+        checker = UrlLivenessChecker()
+        with mock.patch('redditrepostsleuth.core.util.url_liveness.requests.Session.head') as mock_head:
+            mock_head.side_effect = get_dummy_res
+            self.assertIsNone(checker.first_alive(['http://bad.com/1', 'http://error.com/2'], lambda x: x))
+
+    def test_first_alive_empty(self):
+        self.assertIsNone(UrlLivenessChecker().first_alive([], lambda x: x))
+
+    def test_first_alive_out_of_time(self):
+        checker = UrlLivenessChecker(max_wait=.05)
+        with mock.patch('redditrepostsleuth.core.util.url_liveness.requests.Session.head') as mock_head:
+            mock_head.side_effect = get_dummy_res
+            self.assertIsNone(checker.first_alive(['http://slow.com/1', 'http://good.com/2'], lambda x: x))
+
+    def test_filter_alive_preserves_order(self):
+        checker = UrlLivenessChecker()
+        urls = ['http://slow.com/1', 'http://bad.com/2', 'http://good.com/3', 'http://error.com/4']
+        with mock.patch('redditrepostsleuth.core.util.url_liveness.requests.Session.head') as mock_head:
+            mock_head.side_effect = get_dummy_res
+            self.assertEqual(['http://slow.com/1', 'http://good.com/3'], checker.filter_alive(urls, lambda x: x))
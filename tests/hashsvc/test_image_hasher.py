@@ -0,0 +1,76 @@
+import json
+from io import BytesIO
+from unittest import TestCase
+from unittest.mock import Mock
+
+import imagehash
+from falcon import HTTPBadRequest
+from PIL import Image
+
+from redditrepostsleuth.core.exception import ImageConversioinException
+from redditrepostsleuth.hashsvc.fixture_image_server import FixtureImageServer, generate_fixture_images
+from redditrepostsleuth.hashsvc.hash_endpoint import ImageHashEndpoint
+from redditrepostsleuth.hashsvc.image_hasher import ImageHasher
+
+
+class TestImageHasher(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = FixtureImageServer(generate_fixture_images(count=3, size=100))
+        cls.server.start()
+        cls.hasher = ImageHasher(hash_workers=2, max_downloads=2)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.hasher.shutdown()
+        cls.server.stop()
+
+    def _expected(self, path):
+        img = Image.open(BytesIO(self.server.images[path]))
+        return {
+            'dhash_h': str(imagehash.dhash(img, hash_size=16)),
+            'dhash_v': str(imagehash.dhash_vertical(img, hash_size=16)),
+            'ahash': str(imagehash.average_hash(img, hash_size=16)),
+        }
+
+    def test_hash_url(self):
+        r = self.hasher.hash_url(f'{self.server.base_url}/0.jpg')
+        self.assertEqual(self._expected('/0.jpg'), r)
+
+    def test_hash_url_missing_image(self):
+        self.assertRaises(ImageConversioinException, self.hasher.hash_url, f'{self.server.base_url}/missing.jpg')
+
+    def test_hash_urls(self):
+        urls = [f'{self.server.base_url}/1.jpg', f'{self.server.base_url}/missing.jpg', f'{self.server.base_url}/2.jpg']
+        r = self.hasher.hash_urls(urls)
+        self.assertEqual({'url': urls[0], **self._expected('/1.jpg')}, r[0])
+        self.assertEqual(urls[1], r[1]['url'])
+        self.assertIn('error', r[1])
+        self.assertEqual({'url': urls[2], **self._expected('/2.jpg')}, r[2])
+
+    def test_hash_urls_malformed_url(self):
+        urls = ['not a url', f'{self.server.base_url}/1.jpg']
+        r = self.hasher.hash_urls(urls)
+        self.assertEqual('not a url', r[0]['url'])
+        self.assertIn('error', r[0])
+        self.assertEqual({'url': urls[1], **self._expected('/1.jpg')}, r[1])
+
+    def test_hash_url_malformed_url(self):
+        self.assertRaises(ImageConversioinException, self.hasher.hash_url, 'not a url')
+
+    def test_endpoint_on_get(self):
+        endpoint = ImageHashEndpoint(self.hasher)
+        resp = Mock()
+        endpoint.on_get(Mock(get_param=Mock(return_value=f'{self.server.base_url}/0.jpg')), resp)
+        self.assertEqual(self._expected('/0.jpg'), json.loads(resp.body))
+
+    def test_endpoint_on_get_bad_image(self):
+        endpoint = ImageHashEndpoint(self.hasher)
+        req = Mock(get_param=Mock(return_value=f'{self.server.base_url}/missing.jpg'))
+        self.assertRaises(HTTPBadRequest, endpoint.on_get, req, Mock())
+
+    def test_endpoint_on_post_batch_invalid(self):
+        endpoint = ImageHashEndpoint(self.hasher)
+        req = Mock(bounded_stream=BytesIO(json.dumps({'url': 'test.com'}).encode()))
+        self.assertRaises(HTTPBadRequest, endpoint.on_post_batch, req, Mock())
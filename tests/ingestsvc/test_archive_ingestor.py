@@ -0,0 +1,124 @@
+import bz2
+import json
+import os
+import tempfile
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from redis.exceptions import RedisError
+
+from redditrepostsleuth.ingestsvc.archive_ingestor import ArchiveIngestor, parse_archive_lines, QueueBackpressure, \
+    open_archive, read_line_chunks
+
+
+def get_submission(post_id, created_utc=1560000000, **kwargs):
+    submission = {
+        'id': post_id,
+        'url': f'https://i.redd.it/{post_id}.jpg',
+        'created_utc': created_utc,
+        'subreddit': 'test',
+        'title': 'test'
+    }
+    submission.update(kwargs)
+    return submission
+
+
+def write_archive(path, submissions, opener=open):
+    with opener(path, 'wb') as f:
+        for submission in submissions:
+            f.write(json.dumps(submission).encode('utf-8') + b'\n')
+
+
+class TestArchiveIngestor(TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_parse_archive_lines_filters(self):
+        lines = [
+            json.dumps(get_submission('a')).encode('utf-8'),
+            json.dumps(get_submission('b', is_self=True)).encode('utf-8'),
+            json.dumps(get_submission('c', created_utc=100)).encode('utf-8'),
+            json.dumps(get_submission('d', post_hint='link')).encode('utf-8'),
+            b'{bad json',
+        ]
+        posts = parse_archive_lines(lines, post_types=['image'], after=1000)
+        self.assertEqual(['a'], [p.post_id for p in posts])
+        self.assertEqual('image', posts[0].post_type)
+
+    def test_read_line_chunks_offsets(self):
+        path = os.path.join(self.dir.name, 'dump.ndjson')
+        with open(path, 'wb') as f:
+            f.write(b'aa\nbbb\ncccc\n')
+        with open_archive(path) as stream:
+            chunks = list(read_line_chunks(stream, 2))
+        self.assertEqual([([b'aa\n', b'bbb\n'], 7), ([b'cccc\n'], 12)], chunks)
+
+    def test_ingest_bz2_batches(self):
+        path = os.path.join(self.dir.name, 'dump.bz2')
+        write_archive(path, [get_submission(str(i)) for i in range(5)], opener=bz2.open)
+        send_batch = MagicMock()
+        ingestor = ArchiveIngestor(send_batch, workers=1, batch_size=2)
+        self.assertEqual(5, ingestor.ingest(path))
+        self.assertEqual([2, 2, 1], [len(c[0][0]) for c in send_batch.call_args_list])
+
+    def test_ingest_resumes_from_checkpoint(self):
+        path = os.path.join(self.dir.name, 'dump.bz2')
+        checkpoint = os.path.join(self.dir.name, 'dump.checkpoint')
+        write_archive(path, [get_submission(str(i)) for i in range(5)], opener=bz2.open)
+        send_batch = MagicMock(side_effect=[None, Exception('crash')])
+        ingestor = ArchiveIngestor(send_batch, workers=1, batch_size=2, checkpoint_path=checkpoint)
+        with self.assertRaises(Exception):
+            ingestor.ingest(path)
+
+        send_batch = MagicMock()
+        ingestor = ArchiveIngestor(send_batch, workers=1, batch_size=2, checkpoint_path=checkpoint)
+        self.assertEqual(3, ingestor.ingest(path))
+        sent = [p.post_id for c in send_batch.call_args_list for p in c[0][0]]
+        self.assertEqual(['2', '3', '4'], sent)
+
+    def test_ingest_ignores_checkpoint_for_other_file(self):
+        path = os.path.join(self.dir.name, 'dump.ndjson')
+        checkpoint = os.path.join(self.dir.name, 'dump.checkpoint')
+        write_archive(path, [get_submission('a')])
+        with open(checkpoint, 'w') as f:
+            json.dump({'path': '/other', 'offset': 1000}, f)
+        ingestor = ArchiveIngestor(MagicMock(), workers=1, checkpoint_path=checkpoint)
+        self.assertEqual(1, ingestor.ingest(path))
+
+    def test_ingest_with_pool(self):
+        path = os.path.join(self.dir.name, 'dump.ndjson')
+        write_archive(path, [get_submission(str(i)) for i in range(20)])
+        send_batch = MagicMock()
+        ingestor = ArchiveIngestor(send_batch, workers=2, batch_size=3)
+        self.assertEqual(20, ingestor.ingest(path))
+        sent = [p.post_id for c in send_batch.call_args_list for p in c[0][0]]
+        self.assertEqual([str(i) for i in range(20)], sent)
+
+    def test_ingest_waits_on_backpressure(self):
+        path = os.path.join(self.dir.name, 'dump.ndjson')
+        write_archive(path, [get_submission('a'), get_submission('b')])
+        backpressure = MagicMock()
+        ingestor = ArchiveIngestor(MagicMock(), backpressure=backpressure, workers=1, batch_size=1)
+        ingestor.ingest(path)
+        self.assertEqual(2, backpressure.wait.call_count)
+
+
+class TestQueueBackpressure(TestCase):
+
+    def test_wait_sleeps_until_drained(self):
+        redis = MagicMock()
+        redis.pipeline.return_value.execute.side_effect = [[60, 50], [10, 5]]
+        backpressure = QueueBackpressure(redis, ['one', 'two'], 100, poll_interval=0)
+        backpressure.wait()
+        self.assertEqual(2, redis.pipeline.return_value.execute.call_count)
+
+    def test_wait_redis_error_returns(self):
+        redis = MagicMock()
+        redis.pipeline.return_value.execute.side_effect = RedisError('down')
+        backpressure = QueueBackpressure(redis, ['one'], 100, poll_interval=0)
+        backpressure.wait()
+        self.assertIsNone(backpressure.get_depth())
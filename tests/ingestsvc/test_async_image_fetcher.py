@@ -0,0 +1,139 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from unittest import TestCase, mock
+
+from PIL import Image
+
+from redditrepostsleuth.core.db.databasemodels import Post
+from redditrepostsleuth.core.exception import ImageRemovedException, InvalidImageUrlException
+from redditrepostsleuth.ingestsvc.async_image_fetcher import AsyncImageFetcher, AsyncIngestPipeline
+
+
+class FakeContent:
+    def __init__(self, data):
+        self.data = data
+
+    async def iter_chunked(self, size):
+        for i in range(0, len(self.data), size):
+            yield self.data[i:i + size]
+
+
+class FakeResponse:
+    def __init__(self, status=200, data=b'', content_length=None):
+        self.status = status
+        self.content = FakeContent(data)
+        self.content_length = content_length
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+
+class FakeSession:
+    def __init__(self, responses, delay=0):
+        self.responses = responses
+        self.delay = delay
+        self.active = {}
+        self.max_active = {}
+
+    def get(self, url):
+        session = self
+        host = url.split('/')[2]
+
+        class Request:
+            async def __aenter__(self):
+                session.active[host] = session.active.get(host, 0) + 1
+                session.max_active[host] = max(session.max_active.get(host, 0), session.active[host])
+                await asyncio.sleep(session.delay)
+                return session.responses[url]
+
+            async def __aexit__(self, *args):
+                session.active[host] -= 1
+
+        return Request()
+
+    async def close(self):
+        pass
+
+
+def get_image_bytes():
+    out = BytesIO()
+    Image.new('RGB', (32, 32), color=(200, 10, 10)).save(out, format='PNG')
+    return out.getvalue()
+
+
+class TestAsyncImageFetcher(TestCase):
+
+    def test_fetch_success(self):
+        session = FakeSession({'http://i.redd.it/a.jpg': FakeResponse(data=b'x' * 200000)})
+        fetcher = AsyncImageFetcher(session=session)
+        self.assertEqual(b'x' * 200000, asyncio.run(fetcher.fetch('http://i.redd.it/a.jpg')))
+
+    def test_fetch_404(self):
+        fetcher = AsyncImageFetcher(session=FakeSession({'http://i.redd.it/a.jpg': FakeResponse(status=404)}))
+        with self.assertRaises(ImageRemovedException):
+            asyncio.run(fetcher.fetch('http://i.redd.it/a.jpg'))
+
+    def test_fetch_bad_status(self):
+        fetcher = AsyncImageFetcher(session=FakeSession({'http://i.redd.it/a.jpg': FakeResponse(status=403)}))
+        with self.assertRaises(InvalidImageUrlException):
+            asyncio.run(fetcher.fetch('http://i.redd.it/a.jpg'))
+
+    def test_fetch_too_large_content_length(self):
+        response = FakeResponse(data=b'x', content_length=101)
+        fetcher = AsyncImageFetcher(max_size=100, session=FakeSession({'http://i.redd.it/a.jpg': response}))
+        with self.assertRaises(InvalidImageUrlException):
+            asyncio.run(fetcher.fetch('http://i.redd.it/a.jpg'))
+
+    def test_fetch_too_large_body(self):
+        response = FakeResponse(data=b'x' * 101)
+        fetcher = AsyncImageFetcher(max_size=100, session=FakeSession({'http://i.redd.it/a.jpg': response}))
+        with self.assertRaises(InvalidImageUrlException):
+            asyncio.run(fetcher.fetch('http://i.redd.it/a.jpg'))
+
+    def test_fetch_host_limits(self):
+        urls = [f'http://i.imgur.com/{i}.jpg' for i in range(6)] + [f'http://other.com/{i}.jpg' for i in range(6)]
+        session = FakeSession({url: FakeResponse(data=b'x') for url in urls}, delay=0.01)
+        fetcher = AsyncImageFetcher(host_limits={'imgur.com': 2}, default_host_limit=3, session=session)
+
+        async def fetch_all():
+            return await asyncio.gather(*[fetcher.fetch(url) for url in urls])
+
+        asyncio.run(fetch_all())
+        self.assertEqual(2, session.max_active['i.imgur.com'])
+        self.assertEqual(3, session.max_active['other.com'])
+
+
+class TestAsyncIngestPipeline(TestCase):
+
+    def test_prepare_posts(self):
+        session = FakeSession({
+            'http://i.redd.it/a.png': FakeResponse(data=get_image_bytes()),
+            'http://i.redd.it/b.png': FakeResponse(status=404),
+        })
+        pipeline = AsyncIngestPipeline(fetcher=AsyncImageFetcher(session=session), hash_workers=1, meme_hash_size=8)
+        posts = [
+            Post(post_id='a', post_type='image', url='http://i.redd.it/a.png'),
+            Post(post_id='b', post_type='image', url='http://i.redd.it/b.png'),
+            Post(post_id='c', post_type='link', url='http://test.com'),
+        ]
+        try:
+            with mock.patch('redditrepostsleuth.ingestsvc.async_image_fetcher.ProcessPoolExecutor') as pool:
+                pool.return_value = ThreadPoolExecutor(max_workers=1)
+                prepared = pipeline.prepare_posts(posts)
+        finally:
+            pipeline.shutdown()
+
+        self.assertEqual(['a', 'c'], [p[0].post_id for p in prepared])
+        post, image_post, image_post_current = prepared[0]
+        self.assertEqual(64, len(post.dhash_h))
+        self.assertEqual(16, len(post.dhash_meme))
+        self.assertEqual(post.dhash_h, image_post.dhash_h)
+        self.assertIsNone(prepared[1][1])
+        self.assertIsNotNone(prepared[1][0].url_hash)
+
+    def test_prepare_posts_empty(self):
+        self.assertEqual([], AsyncIngestPipeline().prepare_posts([]))
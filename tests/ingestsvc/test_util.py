@@ -0,0 +1,134 @@
+from datetime import datetime
+from unittest import TestCase, mock
+from unittest.mock import MagicMock
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import IntegrityError
+
+from redditrepostsleuth.core.db.databasemodels import Post, RedditImagePost, RedditImagePostCurrent
+from redditrepostsleuth.core.db.uow.sqlalchemyunitofworkmanager import SqlAlchemyUnitOfWorkManager
+from redditrepostsleuth.core.exception import ImageConversioinException, ImageRemovedException
+from redditrepostsleuth.ingestsvc.util import prepare_post, save_prepared_posts, pre_process_posts, \
+    get_new_pushshift_posts, process_image_post
+
+
+class TestIngestUtil(TestCase):
+
+    def _get_uowm(self):
+        uow = MagicMock()
+        uow.__enter__.return_value = uow
+        uowm = MagicMock()
+        uowm.start.return_value = uow
+        return uowm, uow
+
+    def test_prepare_post_link(self):
+        post, image_post, image_post_current = prepare_post(Post(post_id='1', post_type='link', url='http://test.com'), None)
+        self.assertEqual('1aa0d4413384d91bc0d452f03b505298', post.url_hash)
+        self.assertIsNone(image_post)
+
+    def test_prepare_post_image_failure(self):
+        with mock.patch('redditrepostsleuth.ingestsvc.util.process_image_post', side_effect=ImageConversioinException('bad')):
+            self.assertIsNone(prepare_post(Post(post_id='1', post_type='image', url='http://test.com'), None))
+
+    def test_save_prepared_posts_bulk(self):
+        uowm, uow = self._get_uowm()
+        prepared = [
+            (Post(post_id='1'), RedditImagePost(post_id='1'), RedditImagePostCurrent(post_id='1')),
+            (Post(post_id='2'), None, None)
+        ]
+        r = save_prepared_posts(prepared, uowm)
+        self.assertEqual(['1', '2'], [p.post_id for p in r])
+        self.assertEqual(2, len(uow.posts.bulk_save.call_args[0][0]))
+        self.assertEqual(1, len(uow.image_post.bulk_save.call_args[0][0]))
+        uow.commit.assert_called_once()
+
+    def test_save_prepared_posts_bulk_sets_ids(self):
+        engine = create_engine('sqlite://')
+        # Only the model's MySQL specific collation needs to be faked to create the table
+        event.listen(
+            engine,
+            'connect',
+            lambda conn, _: conn.create_collation('utf8mb4_general_ci', lambda a, b: (a > b) - (a < b))
+        )
+        Post.__table__.create(engine)
+        prepared = [
+            (Post(post_id=str(i), url='http://test.com', author='test', subreddit='test', title='test',
+                  ingested_at=datetime.utcnow(), last_deleted_check=datetime.utcnow()), None, None)
+            for i in range(3)
+        ]
+        r = save_prepared_posts(prepared, SqlAlchemyUnitOfWorkManager(engine))
+        self.assertEqual([1, 2, 3], [p.id for p in r])
+
+    def test_save_prepared_posts_falls_back_to_single(self):
+        uowm, uow = self._get_uowm()
+        commits = [IntegrityError('', '', ''), None, IntegrityError('', '', '')]
+        uow.commit.side_effect = commits
+        prepared = [(Post(post_id='1'), None, None), (Post(post_id='2'), None, None)]
+        r = save_prepared_posts(prepared, uowm)
+        self.assertEqual(['1'], [p.post_id for p in r])
+        self.assertEqual(2, uow.posts.add.call_count)
+        uow.rollback.assert_called_once()
+
+    def test_pre_process_posts_skips_failed(self):
+        uowm, uow = self._get_uowm()
+        posts = [Post(post_id='1', post_type='link', url='http://test.com'), Post(post_id='2', post_type='image', url='http://test.com/1.jpg')]
+        with mock.patch('redditrepostsleuth.ingestsvc.util.process_image_post', side_effect=ImageConversioinException('bad')):
+            r = pre_process_posts(posts, uowm, None)
+        self.assertEqual(['1'], [p.post_id for p in r])
+
+    def test_pre_process_posts_unexpected_error_only_drops_post(self):
+        uowm, uow = self._get_uowm()
+        telemetry = MagicMock()
+        posts = [
+            Post(post_id='1', post_type='link', url='http://test.com'),
+            Post(post_id='2', post_type='image', url='http://test.com/1.jpg'),
+            Post(post_id='3', post_type='link', url='http://test.com/3')
+        ]
+        with mock.patch('redditrepostsleuth.ingestsvc.util.process_image_post', side_effect=OSError('image file is truncated')):
+            r = pre_process_posts(posts, uowm, None, telemetry=telemetry)
+        self.assertEqual(['1', '3'], [p.post_id for p in r])
+        self.assertEqual(2, len(uow.posts.bulk_save.call_args[0][0]))
+        telemetry.record_hash_failure.assert_called_once_with('http://test.com/1.jpg')
+
+    def test_get_new_pushshift_posts_keeps_unresolved_type(self):
+        uowm, uow = self._get_uowm()
+        uow.posts.get_existing_post_ids.return_value = []
+        resolver = MagicMock()
+        resolver.resolve.return_value = {'1': None}
+        submissions = [{'id': '1', 'url': 'https://example.com/1', 'created_utc': 1560000000}]
+        with mock.patch('redditrepostsleuth.core.util.objectmapping.get_post_type_pushshift') as get_post_type:
+            posts = get_new_pushshift_posts(submissions, uowm, resolver=resolver)
+        self.assertIsNone(posts[0].post_type)
+        get_post_type.assert_not_called()
+
+    def test_get_new_pushshift_posts(self):
+        uowm, uow = self._get_uowm()
+        uow.posts.get_existing_post_ids.return_value = ['2']
+        submissions = [
+            {'id': str(i), 'url': f'https://i.redd.it/{i}.jpg', 'created_utc': 1560000000} for i in [1, 2, 3, 1]
+        ]
+        resolver = MagicMock()
+        resolver.resolve.return_value = {'1': 'image', '3': 'image'}
+        posts = get_new_pushshift_posts(submissions, uowm, resolver=resolver)
+        self.assertEqual(['1', '3'], [p.post_id for p in posts])
+        self.assertEqual(['1', '3'], [s['id'] for s in resolver.resolve.call_args[0][0]])
+        uow.posts.get_existing_post_ids.assert_called_once_with(['1', '2', '3', '1'])
+        uow.posts.get_by_post_id.assert_not_called()
+
+    def test_process_image_post_single_request(self):
+        post = Post(post_id='1', post_type='image', url='http://i.redd.it/a.jpg')
+        with mock.patch('redditrepostsleuth.ingestsvc.util.set_image_hashes') as set_image_hashes:
+            set_image_hashes.side_effect = lambda p, **kwargs: setattr(p, 'dhash_h', 'abc') or p
+            post, image_post, image_post_current = process_image_post(post, None)
+        set_image_hashes.assert_called_once_with(post, meme_hash_size=None, raise_for_status=True)
+        self.assertEqual('abc', image_post.dhash_h)
+
+    def test_prepare_post_records_hash_failure(self):
+        telemetry = MagicMock()
+        with mock.patch('redditrepostsleuth.ingestsvc.util.process_image_post', side_effect=ImageConversioinException('bad')):
+            prepare_post(Post(post_id='1', post_type='image', url='http://i.redd.it/a.jpg'), None, telemetry=telemetry)
+        telemetry.record_hash_failure.assert_called_once_with('http://i.redd.it/a.jpg')
+
+    def test_prepare_post_image_removed(self):
+        with mock.patch('redditrepostsleuth.ingestsvc.util.set_image_hashes', side_effect=ImageRemovedException('gone')):
+            self.assertIsNone(prepare_post(Post(post_id='1', post_type='image', url='http://i.redd.it/a.jpg'), None))
@@ -0,0 +1,22 @@
+from sqlalchemy import func
+
+from redditrepostsleuth.core.config import Config
+from redditrepostsleuth.core.db.databasemodels import Post, RedditImagePost, RedditImagePostCurrent
+from redditrepostsleuth.core.db.db_utils import get_db_engine
+from redditrepostsleuth.core.db.uow.sqlalchemyunitofworkmanager import SqlAlchemyUnitOfWorkManager
+
+# Fill the binary hash columns for rows saved before we started dual writing them
+config = Config('../sleuth_config.json')
+uowm = SqlAlchemyUnitOfWorkManager(get_db_engine(config=config))
+batch_size = 50000
+
+for model, repo_name in [(RedditImagePostCurrent, 'image_post_current'), (RedditImagePost, 'image_post'), (Post, 'posts')]:
+    with uowm.start() as uow:
+        max_id = uow.session.query(func.max(model.id)).scalar() or 0
+    start_id = 0
+    while start_id <= max_id:
+        with uowm.start() as uow:
+            updated = getattr(uow, repo_name).backfill_binary_hashes(start_id, start_id + batch_size)
+            uow.commit()
+        print(f'{model.__tablename__}: Updated {updated} rows from ID {start_id} to {start_id + batch_size}')
+        start_id += batch_size
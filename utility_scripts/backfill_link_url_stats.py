@@ -0,0 +1,20 @@
+from redditrepostsleuth.core.config import Config
+from redditrepostsleuth.core.db.db_utils import get_db_engine
+from redditrepostsleuth.core.db.uow.sqlalchemyunitofworkmanager import SqlAlchemyUnitOfWorkManager
+
+# Build link_url_stats from link posts saved before ingest started maintaining it.
+# Set stop_id to the first reddit_post ID saved after the ingest update was deployed so nothing is counted twice.
+# Searches don't trust link_url_stats until link_url_stats_ready is set in the config, so set it once this finishes
+config = Config('../sleuth_config.json')
+uowm = SqlAlchemyUnitOfWorkManager(get_db_engine(config=config))
+batch_size = 50000
+stop_id = 0
+
+start_id = 0
+while start_id < stop_id:
+    end_id = min(start_id + batch_size, stop_id)
+    with uowm.start() as uow:
+        updated = uow.link_url_stats.backfill(start_id, end_id)
+        uow.commit()
+    print(f'Updated {updated} URLs from post ID {start_id} to {end_id}')
+    start_id = end_id
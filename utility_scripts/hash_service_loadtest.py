@@ -0,0 +1,37 @@
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+
+import requests
+
+from redditrepostsleuth.hashsvc.fixture_image_server import FixtureImageServer, generate_fixture_images
+
+# Load test a running hash service with images from a local fixture server
+# Usage: python hash_service_loadtest.py http://localhost:7778 [requests] [concurrency]
+hash_api = sys.argv[1] if len(sys.argv) > 1 else 'http://localhost:7778'
+total_requests = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+concurrency = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+
+server = FixtureImageServer(generate_fixture_images(), port=8899)
+server.start()
+urls = [f'{server.base_url}{path}' for path in server.images.keys()]
+
+
+def hash_image(i):
+    r = requests.get(f'{hash_api}/hash', params={'url': urls[i % len(urls)]})
+    return r.status_code
+
+
+start = perf_counter()
+with ThreadPoolExecutor(max_workers=concurrency) as executor:
+    statuses = list(executor.map(hash_image, range(total_requests)))
+single_time = perf_counter() - start
+print(f'Single: {total_requests} requests in {round(single_time, 2)}s - {round(total_requests / single_time, 2)}/s - Errors: {len([s for s in statuses if s != 200])}')
+
+start = perf_counter()
+batch_urls = [urls[i % len(urls)] for i in range(total_requests)]
+r = requests.post(f'{hash_api}/hash/batch', json=batch_urls)
+batch_time = perf_counter() - start
+print(f'Batch: {total_requests} images in {round(batch_time, 2)}s - {round(total_requests / batch_time, 2)}/s - Status: {r.status_code}')
+
+server.stop()